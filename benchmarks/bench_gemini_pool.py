@@ -0,0 +1,91 @@
+"""
+Cold spawn vs warm pool time-to-first-token for the Gemini CLI.
+
+Measures the time from handing a prompt to a process until its first line
+of stdout, for a freshly spawned process and for a standby process taken
+from GeminiProcessPool.
+
+    python benchmarks/bench_gemini_pool.py --runs 5
+    python benchmarks/bench_gemini_pool.py --stub-startup 2.0   # no gemini needed
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gemini_client import GeminiClient
+from src.gemini_pool import GeminiProcessPool
+
+# Stand-in CLI: pays a fixed startup cost, then answers the prompt read from stdin
+STUB_SOURCE = (
+    "import sys, time; time.sleep(float(sys.argv[1])); "
+    "prompt = sys.stdin.read(); print('{\"setups\": []} ' + str(len(prompt)), flush=True)"
+)
+
+
+def time_to_first_token(pool: GeminiProcessPool, prompt: str) -> float:
+    start = time.perf_counter()
+    process, _ = pool.acquire()
+    process.stdin.write(prompt)
+    process.stdin.close()
+    process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.stdout.read()
+    process.stderr.read()
+    process.wait()
+    return elapsed
+
+
+def run(cmd, env, cwd, prompt: str, runs: int, settle: float) -> dict:
+    cold_pool = GeminiProcessPool(cmd, env=env, cwd=cwd, size=0)
+    cold = [time_to_first_token(cold_pool, prompt) for _ in range(runs)]
+
+    warm_pool = GeminiProcessPool(cmd, env=env, cwd=cwd, size=1)
+    warm = []
+    try:
+        for _ in range(runs):
+            warm_pool.fill()
+            time.sleep(settle)  # Idle time between jobs lets the standby finish starting
+            warm.append(time_to_first_token(warm_pool, prompt))
+    finally:
+        warm_pool.close()
+
+    return {"cold": cold, "warm": warm, "warm_hits": warm_pool.warm_hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--settle", type=float, default=None,
+                        help="Seconds between jobs (default: startup + 1 with the stub, 10 with gemini)")
+    parser.add_argument("--prompt", default="prompts/user-prompt.md", help="Prompt file sent to each process")
+    parser.add_argument("--stub-startup", type=float, default=None,
+                        help="Benchmark a stand-in process with this startup delay instead of gemini")
+    args = parser.parse_args()
+
+    client = GeminiClient(user_prompt_path=args.prompt)
+    if args.stub_startup is not None:
+        cmd, env, cwd = [sys.executable, "-c", STUB_SOURCE, str(args.stub_startup)], None, None
+        settle = args.settle if args.settle is not None else args.stub_startup + 1
+    else:
+        pool = client._get_pool()
+        if pool is None:
+            sys.exit("gemini executable not found (use --stub-startup to benchmark without it)")
+        cmd, env, cwd = pool.cmd, pool.env, pool.cwd
+        settle = args.settle if args.settle is not None else 10.0
+
+    prompt = client._read_file(client.project_root / args.prompt) or "Reply with an empty JSON object."
+    result = run(cmd, env, cwd, prompt, args.runs, settle)
+
+    for name in ("cold", "warm"):
+        samples = result[name]
+        print(f"{name:>5}: median {statistics.median(samples):7.3f}s  "
+              f"min {min(samples):7.3f}s  max {max(samples):7.3f}s  (n={len(samples)})")
+    print(f"warm hits: {result['warm_hits']}/{args.runs}")
+
+
+if __name__ == "__main__":
+    main()
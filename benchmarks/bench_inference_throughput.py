@@ -0,0 +1,138 @@
+"""
+Inference pipeline throughput against the fake Gemini CLI.
+
+Runs manual inference jobs back to back through src.inference.run_inference
+(the executor's code path: CLI call, streamed parse, add_setups, dashboard
+events) with GEMINI_CLI pointed at src.fake_gemini. Reports jobs per minute,
+job latency, how long until the job's first setup was published to the
+dashboard event stream, event delivery lag to a reader, and /api/inference
+render time.
+
+    python benchmarks/bench_inference_throughput.py --jobs 300
+    python benchmarks/bench_inference_throughput.py --latency lognormal:0.5:0.4 --pool 4 --strategy all
+    python benchmarks/bench_inference_throughput.py --transcripts data/transcripts --failure-rate 0.05
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.events import event_bus
+from src.gemini_client import GEMINI_CLI_ENV, GeminiClient
+from src.inference import InferenceJob, JobPriority, run_inference
+from src.state import InferenceStatus, app_state
+from src.web_server import app
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+def dashboard_reader(stop: threading.Event, first_setup: dict, lags: list):
+    """Follows the event stream like an open dashboard, noting when each setup event arrives."""
+    seq = event_bus.seq
+    while not stop.is_set():
+        events = event_bus.wait(seq, timeout=0.5)
+        if events is None:
+            seq = event_bus.seq
+            continue
+        now = time.time()
+        for event in events:
+            seq = event.seq
+            if event.type == "setup":
+                lags.append(now - event.published_at)
+                first_setup.setdefault("at", event.published_at)
+
+
+def run(client: GeminiClient, jobs: int, strategy: str) -> dict:
+    first_setup, lags = {}, []
+    stop = threading.Event()
+    reader = threading.Thread(target=dashboard_reader, args=(stop, first_setup, lags), daemon=True)
+    reader.start()
+    dashboard = app.test_client()
+    rng = random.Random(1)
+    price = 5000.0
+
+    durations, to_dashboard, renders, failed = [], [], [], 0
+    started = time.perf_counter()
+    try:
+        for _ in range(jobs):
+            price += rng.choice((-1.0, -0.25, 0.25, 1.0))
+            app_state.set_price(price)
+            first_setup.clear()
+            job_started = time.time()
+            with contextlib.redirect_stdout(io.StringIO()):  # the client echoes CLI output
+                run_inference(client, InferenceJob(JobPriority.MANUAL, strategy=strategy))
+            durations.append(time.time() - job_started)
+            time.sleep(0.005)  # let the reader catch up before the next job resets the marker
+            if "at" in first_setup:
+                to_dashboard.append(first_setup["at"] - job_started)
+            if app_state.inference.status != InferenceStatus.COMPLETE:
+                failed += 1
+            render_started = time.perf_counter()
+            dashboard.get("/api/inference")
+            renders.append(time.perf_counter() - render_started)
+            # Keep the book at a steady size instead of growing with every job
+            app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+    finally:
+        stop.set()
+        reader.join()
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "durations": durations, "to_dashboard": to_dashboard, "lags": lags,
+            "renders": renders, "failed": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--strategy", default="main", help="main, alt or all")
+    parser.add_argument("--pool", type=int, default=2, help="Warm standby fake CLI processes")
+    parser.add_argument("--latency", default="lognormal:0.1:0.3", help="Fake CLI latency spec (see src.fake_gemini)")
+    parser.add_argument("--transcripts", default=None, help="Replay transcripts from this directory")
+    parser.add_argument("--stderr-lines", type=int, default=3)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ[GEMINI_CLI_ENV] = f'"{sys.executable}" -m src.fake_gemini'
+    os.environ.update({
+        "FAKE_GEMINI_LATENCY": args.latency,
+        "FAKE_GEMINI_STDERR_LINES": str(args.stderr_lines),
+        "FAKE_GEMINI_FAILURE_RATE": str(args.failure_rate),
+        # Hangs would only measure the inference timeout
+        "FAKE_GEMINI_FAILURE_MODES": "exit,truncate,garbage",
+        "FAKE_GEMINI_SEED": str(args.seed),
+    })
+    if args.transcripts:
+        os.environ["FAKE_GEMINI_TRANSCRIPTS"] = os.path.abspath(args.transcripts)
+    logging.basicConfig(level=logging.CRITICAL)
+
+    client = GeminiClient(user_prompt_path="prompts/user-prompt.md", pool_size=args.pool)
+    client.start_pool()
+    try:
+        result = run(client, args.jobs, args.strategy)
+    finally:
+        client.close()
+
+    elapsed, durations = result["elapsed"], result["durations"]
+    print(f"jobs:          {len(durations)} in {elapsed:.1f}s  ({60 * len(durations) / elapsed:.0f}/min, "
+          f"{result['failed']} failed)")
+    for name, samples in (("job", durations), ("to dashboard", result["to_dashboard"]),
+                          ("event lag", result["lags"]), ("render", result["renders"])):
+        if samples:
+            print(f"{name + ':':<14} p50 {statistics.median(samples) * 1000:7.1f}ms  "
+                  f"p95 {percentile(samples, 0.95) * 1000:7.1f}ms  max {max(samples) * 1000:7.1f}ms  (n={len(samples)})")
+    print(f"pool:          {client.pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
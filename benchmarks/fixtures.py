@@ -0,0 +1,29 @@
+"""
+Setup factories shared by the tests and the benchmarks.
+"""
+from src.models import TradeSetup, EntryRule, StopLossRule, TargetRule
+
+
+def make_setup(setup_id, direction, entry, stop, targets, symbol="@ES"):
+    return TradeSetup(
+        id=setup_id,
+        symbol=symbol,
+        direction=direction,
+        entry=EntryRule(price=entry, condition="test"),
+        stop_loss=StopLossRule(price=stop),
+        targets=[TargetRule(price=t) for t in targets],
+        rules_text="test rules"
+    )
+
+
+def random_setups(rng, n, base=5000.0):
+    """n setups with entries within 40 points of `base`, 0-2 targets each; deterministic for a seeded rng."""
+    setups = []
+    for i in range(n):
+        direction = rng.choice(["LONG", "SHORT"])
+        entry = round((base + rng.uniform(-40, 40)) * 4) / 4
+        risk = rng.choice([2.0, 4.25, 6.0, 10.0])
+        sign = 1 if direction == "LONG" else -1
+        targets = [entry + sign * risk * m for m in rng.sample([1.0, 1.5, 2.0, 3.0], rng.randint(0, 2))]
+        setups.append(make_setup(f"s{i}", direction, entry, entry - sign * risk, targets))
+    return setups
@@ -0,0 +1,207 @@
+"""
+/api/status latency under concurrent pollers while the monitor loop runs.
+
+Starts the web server in-process, fills TradeManager with setups and keeps
+update_setups running on a random-walk price (like the monitor loop), then
+has N keep-alive clients poll /api/status from separate worker processes (so
+client work doesn't share the server's GIL). Reports request latency
+percentiles and how long each monitor pass took with the load on.
+
+With --sse N, N more clients hold /api/events streams open for the whole run,
+like open dashboards. In production mode each stream occupies a worker, so
+streams beyond the server's cap are turned away (503) and polling must still
+be served by the reserved workers.
+
+    python benchmarks/load_status.py --clients 200 --duration 10
+    python benchmarks/load_status.py --mode dev      # Flask development server, for comparison
+    python benchmarks/load_status.py --interval 0    # saturate: clients poll back to back
+    python benchmarks/load_status.py --no-etag       # always download the full body
+    python benchmarks/load_status.py --sse 50        # 50 open dashboards' event streams as well
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.state import app_state
+from src.web_server import DEFAULT_WEB_THREADS, run_web_server
+from benchmarks.fixtures import random_setups
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def monitor(stop: threading.Event, interval: float, passes: list):
+    """Stand-in for the daemon loop: one update_setups pass per tick on a random walk."""
+    price = 5000.0
+    rng = random.Random(1)
+    while not stop.is_set():
+        price += rng.choice((-0.25, 0.0, 0.25))
+        start = time.perf_counter()
+        app_state.set_price(price)
+        app_state.trade_manager.update_setups(price)
+        passes.append(time.perf_counter() - start)
+        stop.wait(interval)
+
+
+def poller(url: str, deadline: float, interval: float, etag: bool, latencies: list, errors: list):
+    session = requests.Session()
+    headers = {}
+    time.sleep(random.uniform(0, interval))  # spread clients over the poll period
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - start)
+        if etag and response.status_code == 200:
+            headers["If-None-Match"] = response.headers.get("ETag", "")
+        time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+def event_stream(url: str, deadline: float, outcomes: list):
+    """Hold one /api/events stream open until the deadline; records "open", "rejected" or "error"."""
+    try:
+        response = requests.get(url, stream=True, timeout=(5, 1))
+    except requests.RequestException:
+        outcomes.append("error")
+        return
+    outcomes.append("open" if response.status_code == 200 else "rejected")
+    if response.status_code == 200:
+        chunks = response.iter_content(chunk_size=None)
+        while time.time() < deadline:
+            try:
+                next(chunks)
+            except requests.exceptions.ConnectionError:
+                continue  # read timeout between events
+            except (StopIteration, requests.RequestException):
+                break
+    response.close()
+
+
+def stream_process(url: str, streams: int, deadline: float, results):
+    outcomes = []
+    threads = [threading.Thread(target=event_stream, args=(url, deadline, outcomes)) for _ in range(streams)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(outcomes)
+
+
+def client_process(url: str, clients: int, deadline: float, interval: float, etag: bool, results):
+    latencies, errors = [], []
+    threads = [threading.Thread(target=poller, args=(url, deadline, interval, etag, latencies, errors))
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((latencies, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between polls per client, like the dashboard (0 = as fast as possible)")
+    parser.add_argument("--mode", choices=("production", "dev"), default="production")
+    parser.add_argument("--threads", type=int, default=DEFAULT_WEB_THREADS)
+    parser.add_argument("--setups", type=int, default=200, help="Setups in TradeManager")
+    parser.add_argument("--tick", type=float, default=0.05, help="Seconds between monitor passes")
+    parser.add_argument("--processes", type=int, default=4, help="Client worker processes")
+    parser.add_argument("--no-etag", dest="etag", action="store_false")
+    parser.add_argument("--sse", type=int, default=0, help="Clients holding /api/events streams open")
+    args = parser.parse_args()
+
+    app_state.trade_manager.add_setups(random_setups(random.Random(0), args.setups))
+    port = free_port()
+    threading.Thread(target=run_web_server, daemon=True,
+                     kwargs={"port": port, "mode": args.mode, "threads": args.threads, "host": "127.0.0.1"}).start()
+    url = f"http://127.0.0.1:{port}/api/status"
+    for _ in range(50):
+        try:
+            requests.get(url, timeout=1)
+            break
+        except requests.RequestException:
+            time.sleep(0.1)
+
+    # Monitor passes without HTTP load, for reference
+    stop = threading.Event()
+    idle_passes = []
+    idle_monitor = threading.Thread(target=monitor, args=(stop, args.tick, idle_passes))
+    idle_monitor.start()
+    time.sleep(min(2.0, args.duration))
+    stop.set()
+    idle_monitor.join()
+
+    stop = threading.Event()
+    passes, latencies, errors = [], [], []
+    ctx = multiprocessing.get_context("spawn")  # don't fork the running server's threads
+    results = ctx.Queue()
+    stream_results = ctx.Queue()
+    deadline = time.time() + args.duration
+    streamer = None
+    if args.sse:
+        # Streams connect first, like dashboards already open when the pollers arrive
+        streamer = ctx.Process(target=stream_process,
+                               args=(url.replace("/api/status", "/api/events"), args.sse, deadline, stream_results))
+        streamer.start()
+    per_process = [args.clients // args.processes + (i < args.clients % args.processes) for i in range(args.processes)]
+    workers = [ctx.Process(target=client_process, args=(url, n, deadline, args.interval, args.etag, results))
+               for n in per_process if n]
+    for w in workers:
+        w.start()
+    monitor_thread = threading.Thread(target=monitor, args=(stop, args.tick, passes))
+    monitor_thread.start()
+    for _ in workers:
+        worker_latencies, worker_errors = results.get()
+        latencies += worker_latencies
+        errors += worker_errors
+    stop.set()
+    monitor_thread.join()
+    for w in workers:
+        w.join()
+    outcomes = []
+    if streamer:
+        outcomes = stream_results.get()
+        streamer.join()
+
+    if not latencies:
+        sys.exit(f"no successful requests ({len(errors)} errors)")
+    ms = [x * 1000 for x in latencies]
+    print(f"server: {args.mode} ({args.threads} threads), {args.clients} clients every {args.interval:g}s, "
+          f"{args.setups} setups, etag {'on' if args.etag else 'off'}")
+    if args.sse:
+        print(f"/api/events: {outcomes.count('open')} streams open, {outcomes.count('rejected')} turned away (503), "
+              f"{outcomes.count('error')} errors")
+    print(f"/api/status: {len(ms) / args.duration:8.0f} req/s  p50 {percentile(ms, 0.50):7.2f}ms  "
+          f"p95 {percentile(ms, 0.95):7.2f}ms  p99 {percentile(ms, 0.99):7.2f}ms  errors {len(errors)}")
+    for name, samples in (("idle", idle_passes), ("loaded", passes)):
+        samples = [x * 1000 for x in samples]
+        print(f"monitor pass ({name:>6}): median {statistics.median(samples):6.2f}ms  "
+              f"p99 {percentile(samples, 0.99):6.2f}ms  (n={len(samples)})")
+
+
+if __name__ == "__main__":
+    main()
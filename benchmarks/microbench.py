@@ -0,0 +1,332 @@
+"""
+Micro-benchmarks for the daemon's hot paths, with JSON baselines.
+
+Times each case in-process (best of several repeats of a calibrated loop) and
+optionally compares against a saved baseline, exiting non-zero when any case
+got slower than the threshold allows.
+
+    python benchmarks/microbench.py                                  # run and print
+    python benchmarks/microbench.py --save benchmarks/baseline.json  # record a baseline
+    python benchmarks/microbench.py --compare benchmarks/baseline.json --threshold 0.25
+    python benchmarks/microbench.py --filter update_setups --quick   # subset, smaller sizes
+
+Baselines are only comparable on the machine (and Python) that recorded them;
+their "machine" block says where that was, and --compare refuses a baseline
+from another Python version or processor (override with --allow-mismatch).
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.executor import inference_executor
+from src.inference import _parse_response
+from src.state import DaemonState
+from src.stream_parser import SetupStreamParser
+from src.trade_manager import TradeManager
+from src.trendlines import TrendlineCache, proximity_of
+from src.triggers import TrendlineTrigger
+from benchmarks.fixtures import random_setups
+
+SETUP_COUNTS = (10, 100, 1_000, 10_000, 100_000)
+QUICK_SETUP_COUNTS = (10, 100, 1_000)
+LINE_COUNTS = (10, 1_000, 10_000)
+QUICK_LINE_COUNTS = (10, 1_000)
+
+DEFAULT_THRESHOLD = 0.25
+
+# Trendline geometry is served as of this time
+T0 = 1_710_252_000.0
+
+
+@dataclass
+class Case:
+    """`setup()` builds the fixture and returns the function to time (called with no arguments)."""
+    name: str
+    setup: Callable[[], Callable[[], object]]
+
+
+def measure(fn: Callable[[], object], repeats: int = 7, min_repeat_seconds: float = 0.1) -> dict:
+    """
+    Per-call time in microseconds: best and median of `repeats` loops of a calibrated size.
+    Like timeit, the garbage collector is off while timing, so earlier cases' garbage
+    doesn't land in a later case's numbers.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(fn, repeats, min_repeat_seconds)
+    finally:
+        gc.enable()
+
+
+def _measure(fn: Callable[[], object], repeats: int, min_repeat_seconds: float) -> dict:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_repeat_seconds or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_repeat_seconds / elapsed) + 1))
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    samples.sort()
+    return {"best_us": round(samples[0], 3), "median_us": round(samples[len(samples) // 2], 3), "loops": loops}
+
+
+def _manager(n: int) -> TradeManager:
+    manager = TradeManager()
+    manager.add_setups(random_setups(random.Random(n), n))
+    return manager
+
+
+def update_setups_case(n: int) -> Case:
+    def setup():
+        manager = _manager(n)
+        # A price wobbling around 5000: after the first passes, most calls cross no level
+        prices = [5000.0 + 0.25 * (i % 5 - 2) for i in range(100)]
+        for price in prices:
+            manager.update_setups(price)
+        state = {"i": 0}
+
+        def run():
+            state["i"] += 1
+            manager.update_setups(prices[state["i"] % len(prices)])
+        return run
+    return Case(f"update_setups[{n}]", setup)
+
+
+def get_active_setups_case(n: int) -> Case:
+    def setup():
+        return _manager(n).get_active_setups
+    return Case(f"get_active_setups[{n}]", setup)
+
+
+def snapshot_cases(n: int) -> List[Case]:
+    def state_with_setups() -> DaemonState:
+        state = DaemonState()
+        state.trade_manager.add_setups(random_setups(random.Random(n), n))
+        state.set_price(5000.0)
+        return state
+
+    def json_after_change(name: str):
+        def setup():
+            state = state_with_setups()
+            build = state.get_snapshot_json if name == "status" else state.get_inference_json
+
+            def run():
+                state.touch()  # force re-serialization, as after any setup change
+                return build()
+            return run
+        return setup
+
+    return [
+        Case(f"get_snapshot[{n}]", lambda: state_with_setups().get_snapshot),
+        Case(f"get_inference_snapshot[{n}]", lambda: state_with_setups().get_inference_snapshot),
+        Case(f"get_snapshot_json[{n}]", json_after_change("status")),
+        Case(f"get_inference_json[{n}]", json_after_change("inference")),
+    ]
+
+
+def llm_output(setups: int, prose_chars: int) -> str:
+    """A CLI answer: some prose, then a fenced JSON block with `setups` setups."""
+    rng = random.Random(setups)
+    body = {
+        "inference_time": "10:30",
+        "inference_price": 5000.25,
+        "market_overview": "Balanced auction above the overnight high. " * max(1, prose_chars // 400),
+        "setups": [{
+            "id": f"s{i}",
+            "direction": "LONG" if i % 2 else "SHORT",
+            "entry": {"price": 5000 + rng.uniform(-40, 40), "condition": "5m close beyond the level"},
+            "stop_loss": {"price": 4990.0},
+            "targets": [{"price": 5010.0}, {"price": 5020.0}],
+            "rules_text": "Enter on a retest; cancel if the opening range breaks the other way. " * 3,
+        } for i in range(setups)],
+    }
+    prose = ("The market opened inside value. " * (prose_chars // 32)).strip()
+    return f"{prose}\n\n```json\n{json.dumps(body, indent=2)}\n```\n"
+
+
+def parse_cases() -> List[Case]:
+    cases = []
+    for label, setups, prose in (("small", 2, 2_000), ("large", 500, 200_000)):
+        text = llm_output(setups, prose)
+        lines = text.splitlines(keepends=True)
+
+        def stream(lines=lines):
+            parser = SetupStreamParser(lambda setup: None)
+            for line in lines:
+                parser.feed(line)
+            return parser
+
+        cases.append(Case(f"parse_response[{label}]", lambda text=text: lambda: _parse_response(text)))
+        cases.append(Case(f"stream_parser[{label}]", lambda stream=stream: stream))
+    return cases
+
+
+def trendline_payload(n: int, price: float = 5000.0) -> dict:
+    """A /trendlines response with n lines per timeframe and their price_relations."""
+    rng = random.Random(n)
+    timeframes = {}
+    for tf in (5, 15):
+        lines, relations = [], []
+        for i in range(n):
+            kind = "support" if i % 2 else "resistance"
+            anchor_price = round((price + rng.uniform(-50, 50)) * 4) / 4
+            slope = round(rng.uniform(-1, 1), 3)
+            lines.append({"type": kind, "slope": slope, "anchor": {"time": T0 - 3600 - 60 * i, "price": anchor_price},
+                          "touch_count": rng.randint(2, 6), "score": round(rng.random(), 2)})
+            line_price = anchor_price + slope * (3600 + 60 * i) / (tf * 60)
+            relations.append({"type": kind, "line_price": round(line_price, 2),
+                              "distance": round(price - line_price, 2),
+                              "proximity": proximity_of(price - line_price) or "far"})
+        timeframes[f"{tf}min"] = {"trendlines": lines, "price_relations": relations}
+    return {"timeframes": timeframes}
+
+
+def trendline_cases(n: int) -> List[Case]:
+    payload = trendline_payload(n)
+
+    def cache() -> TrendlineCache:
+        cache = TrendlineCache(fetcher=lambda **kwargs: payload, clock=lambda: T0)
+        cache.refresh()
+        return cache
+
+    def trigger_setup():
+        trigger = TrendlineTrigger(cache=cache())
+        prices = [5000.0 + 0.25 * (i % 41 - 20) for i in range(200)]
+        state = {"i": 0}
+
+        def run():
+            state["i"] += 1
+            return trigger.check(prices[state["i"] % len(prices)])
+        return run
+
+    return [
+        Case(f"trendline_refresh[{n}]", lambda: cache().refresh),
+        Case(f"trendline_relations[{n}]", lambda: lambda c=cache(): c.relations(5000.0)),
+        Case(f"trendline_trigger_check[{n}]", trigger_setup),
+    ]
+
+
+def build_cases(quick: bool = False) -> List[Case]:
+    setups = QUICK_SETUP_COUNTS if quick else SETUP_COUNTS
+    lines = QUICK_LINE_COUNTS if quick else LINE_COUNTS
+    cases = [update_setups_case(n) for n in setups]
+    cases += [get_active_setups_case(n) for n in setups]
+    cases += [case for n in setups if n <= 10_000 for case in snapshot_cases(n)]
+    cases += parse_cases()
+    cases += [case for n in lines for case in trendline_cases(n)]
+    return cases
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Names of the cases whose best time exceeds the baseline's by more than `threshold` (a fraction)."""
+    return [name for name, result in results.items()
+            if name in baseline and result["best_us"] > baseline[name]["best_us"] * (1 + threshold)]
+
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+
+def machine_mismatch(recorded: dict, current: dict) -> List[str]:
+    """Differences that make timings incomparable: Python minor version and processor."""
+    problems = []
+    minor = lambda version: ".".join(str(version).split(".")[:2])
+    if minor(recorded.get("python", "")) != minor(current["python"]):
+        problems.append(f"python {recorded.get('python')} vs {current['python']}")
+    if recorded.get("processor") != current["processor"]:
+        problems.append(f"processor {recorded.get('processor')} vs {current['processor']}")
+    return problems
+
+
+def run_cases(cases: List[Case], baseline: Dict[str, dict], threshold: float, repeats: int) -> Dict[str, dict]:
+    """Measure and print each case, with its ratio to the baseline when there is one."""
+    logging.disable(logging.INFO)  # setup transitions log at INFO
+    # Trigger checks submit jobs; keep the executor's worker from picking them up
+    inline = inference_executor.inline
+    inference_executor.set_inline(True)
+    results = {}
+    try:
+        for case in cases:
+            # Trigger checks merge into the pending job; start every case from an empty queue
+            inference_executor._pending.clear()
+            result = measure(case.setup(), repeats=repeats)
+            results[case.name] = result
+            line = f"{case.name:<34} best {result['best_us']:12.2f}us  median {result['median_us']:12.2f}us"
+            if case.name in baseline:
+                ratio = result["best_us"] / baseline[case.name]["best_us"]
+                flag = "  REGRESSION" if ratio > 1 + threshold else ""
+                line += f"  {ratio:5.2f}x baseline{flag}"
+            print(line, flush=True)
+    finally:
+        inference_executor._pending.clear()
+        inference_executor.set_inline(inline)
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest sizes")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown as a fraction of the baseline (0.25 = 25%%)")
+    parser.add_argument("--allow-mismatch", action="store_true",
+                        help="Compare even if the baseline was recorded on another Python or processor")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        problems = machine_mismatch(saved.get("machine", {}), machine())
+        if problems:
+            print(f"baseline {args.compare} was recorded elsewhere ({'; '.join(problems)})")
+            if not args.allow_mismatch:
+                print("record a baseline here with --save, or pass --allow-mismatch")
+                return 2
+        baseline = saved["results"]
+
+    cases = [case for case in build_cases(args.quick) if not args.filter or args.filter in case.name]
+    results = run_cases(cases, baseline, args.threshold, args.repeats)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine(), "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"saved {len(results)} results to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} ({len(set(results) & set(baseline))} cases compared)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+"""
+Vectorized historical backtester.
+Runs TradeSetup lists through the same MONITORING -> CLOSE_TO_ENTRY -> TRADING ->
+PROFIT / STOP_LOSS semantics as TradeManager, over NumPy bar arrays read from a
+local file. Each setup is resolved with O(log n) first-passage searches instead of
+a per-price loop, so 100k setups over 1M bars finish in minutes.
+
+Usage:
+    python -m src.backtest bars.csv setups.json [--order nearest] [--max-age 30] [--out results.json]
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.intrabar import (
+    DEFAULT_ORDER, ORDERS, CODE_STATUS, bar_points, setup_arrays,
+    MONITORING, CLOSE_TO_ENTRY, TRADING, PROFIT, STOP_LOSS, CANCELED, NEW,
+)
+from src.bar_store import Bars
+from src.models import LLMResponse, TradeSetup
+from src.setup_book import CLOSE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Bars per block in the first-passage index; bounds per-query gathers to 2 blocks
+BLOCK_SIZE = 64
+
+# Setups resolved per vectorized pass (bounds temporary memory)
+CHUNK_SIZE = 20_000
+
+
+def load_bars(path) -> Bars:
+    """
+    Read bars from a local file.
+
+    Supported formats:
+        .npz  — arrays named time, open, high, low, close
+        .csv  — header row with time (or timestamp), open, high, low, close; time as
+                epoch seconds is fastest, ISO-8601 strings are also accepted
+        .json — list of data-service bar dicts (as returned by GET /bars/{ticker})
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npz":
+        data = np.load(path)
+        return Bars(*(np.asarray(data[k], dtype=float) for k in ("time", "open", "high", "low", "close")))
+    if suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return Bars.from_dicts(json.load(f))
+    if suffix == ".csv":
+        with open(path, "r", encoding="utf-8") as f:
+            header = [h.strip().lower() for h in next(csv.reader(f))]
+        time_col = next(i for i, h in enumerate(header) if h in ("time", "timestamp", "datetime"))
+        cols = [header.index(k) for k in ("open", "high", "low", "close")]
+        try:
+            table = np.loadtxt(path, delimiter=",", skiprows=1, usecols=[time_col] + cols, ndmin=2)
+        except ValueError:
+            # Non-numeric timestamps — slower row-by-row parse
+            with open(path, "r", encoding="utf-8") as f:
+                rows = [{k.strip().lower(): v for k, v in row.items()} for row in csv.DictReader(f)]
+            return Bars.from_dicts(rows)
+        order = np.argsort(table[:, 0], kind="stable")
+        table = table[order]
+        return Bars(table[:, 0], table[:, 1], table[:, 2], table[:, 3], table[:, 4])
+    raise ValueError(f"Unsupported bar file format: {path.suffix}")
+
+
+class _BlockIndex:
+    """
+    First-passage and range-min queries over a float array, vectorized across queries.
+    Values are grouped into blocks of BLOCK_SIZE; a sparse table over block minima
+    finds the first qualifying block in O(log n), then one block is scanned.
+    """
+
+    def __init__(self, values: np.ndarray):
+        n = len(values)
+        self.n = n
+        n_blocks = max(1, -(-n // BLOCK_SIZE))
+        padded = np.full(n_blocks * BLOCK_SIZE, np.inf)
+        padded[:n] = values
+        self.values = padded
+        blocks = padded.reshape(n_blocks, BLOCK_SIZE).min(axis=1)
+
+        # Sparse table table[k, i] = min(blocks[i:i+2^k]). Blocks are padded with +inf to
+        # twice the next power of two, so every window starting below `size` is in range.
+        levels = max(1, int(np.ceil(np.log2(n_blocks))) + 1)
+        size = 1 << (levels - 1)
+        width = 2 * size
+        table = np.full((levels, width), np.inf)
+        table[0, :n_blocks] = blocks
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            table[k, :width - half] = np.minimum(table[k - 1, :width - half], table[k - 1, half:])
+        self.table = table
+        self.n_blocks = n_blocks
+        self.size = size
+        self._offsets = np.arange(BLOCK_SIZE)
+
+    def _first_block(self, start_block: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """First block index >= start_block whose minimum is <= x (n_blocks if none)."""
+        pos = start_block.copy()
+        for k in range(self.table.shape[0] - 1, -1, -1):
+            step = 1 << k
+            in_range = pos < self.size
+            m = self.table[k, np.minimum(pos, self.size - 1)]
+            pos = pos + np.where(in_range & (m > x), step, 0)
+        return np.minimum(pos, self.n_blocks)
+
+    def _scan_block(self, block: np.ndarray, lower: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """First index in the given block, >= lower, with value <= x (-1 if none)."""
+        idx = block[:, None] * BLOCK_SIZE + self._offsets
+        safe = np.minimum(idx, len(self.values) - 1)
+        hit = (self.values[safe] <= x[:, None]) & (idx >= lower[:, None]) & (block[:, None] < self.n_blocks)
+        return np.where(hit.any(axis=1), idx[np.arange(len(block)), hit.argmax(axis=1)], -1)
+
+    def first_le(self, start: np.ndarray, end: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """First index i in [start, end) with values[i] <= x; returns end if none."""
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        x = np.asarray(x, dtype=float)
+        result = np.asarray(end).copy()
+        if start.size == 0:
+            return result
+
+        sb = start // BLOCK_SIZE
+        found = self._scan_block(sb, start, x)
+        todo = found < 0
+        if todo.any():
+            nb = self._first_block(sb[todo] + 1, x[todo])
+            found[todo] = self._scan_block(nb, np.zeros_like(nb), x[todo])
+        ok = (found >= 0) & (found < end) & (start < end)
+        result[ok] = found[ok]
+        return result
+
+    def range_min(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """min(values[lo:hi]) per query; +inf for empty ranges."""
+        lo = np.asarray(lo, dtype=np.int64)
+        hi = np.asarray(hi, dtype=np.int64)
+        result = np.full(lo.shape, np.inf)
+        nonempty = hi > lo
+        if not nonempty.any():
+            return result
+        lo, hi = lo[nonempty], hi[nonempty]
+        lb, rb = lo // BLOCK_SIZE, (hi - 1) // BLOCK_SIZE
+
+        def partial(block, a, b):
+            idx = block[:, None] * BLOCK_SIZE + self._offsets
+            mask = (idx >= a[:, None]) & (idx < b[:, None])
+            return np.where(mask, self.values[np.minimum(idx, len(self.values) - 1)], np.inf).min(axis=1)
+
+        out = np.minimum(partial(lb, lo, hi), partial(rb, lo, hi))
+        count = rb - lb - 1
+        full = count > 0
+        if full.any():
+            c = count[full]
+            k = np.floor(np.log2(c)).astype(np.int64)
+            left = lb[full] + 1
+            right = rb[full] - (1 << k)
+            out[full] = np.minimum(out[full], np.minimum(self.table[k, left], self.table[k, right]))
+        result[nonempty] = out
+        return result
+
+
+class _Market:
+    """Bar arrays plus first-passage indexes, oriented so every setup can be treated as LONG."""
+
+    def __init__(self, bars: Bars, points: np.ndarray, mirrored: bool):
+        sign = -1.0 if mirrored else 1.0
+        # Mirroring (p -> -p) turns a SHORT into a LONG: highs become lows and vice versa
+        self.points = points * sign
+        self.low = bars.high * sign if mirrored else bars.low
+        self.high = bars.low * sign if mirrored else bars.high
+        self.close = bars.close * sign
+        self.low_index = _BlockIndex(self.low)     # first bar with low <= x, range min of lows
+        self.high_index = _BlockIndex(-self.high)  # first bar with high >= x, range max of highs
+
+
+@dataclass
+class BacktestResult:
+    """Per-setup outcomes. Times are epoch seconds (bar open); NaN where not applicable."""
+    ids: List[str]
+    status: np.ndarray        # TradeStatus codes (see intrabar.STATUS_CODES)
+    fill_time: np.ndarray
+    fill_price: np.ndarray
+    exit_time: np.ndarray
+    exit_price: np.ndarray    # mark-to-market close for trades still open at the horizon
+    mae: np.ndarray           # maximum adverse excursion from fill, in points
+    mfe: np.ndarray           # maximum favourable excursion from fill, in points
+    r_multiple: np.ndarray    # (exit - fill) in units of planned risk |entry - stop|
+
+    def to_records(self) -> List[dict]:
+        def val(x):
+            return None if np.isnan(x) else float(x)
+
+        return [
+            {
+                "id": self.ids[i],
+                "status": CODE_STATUS[int(self.status[i])].value,
+                "fill_time": val(self.fill_time[i]),
+                "fill_price": val(self.fill_price[i]),
+                "exit_time": val(self.exit_time[i]),
+                "exit_price": val(self.exit_price[i]),
+                "mae": val(self.mae[i]),
+                "mfe": val(self.mfe[i]),
+                "r_multiple": val(self.r_multiple[i]),
+            }
+            for i in range(len(self.ids))
+        ]
+
+    def summary(self) -> dict:
+        counts = {CODE_STATUS[c].value: int(n) for c, n in zip(*np.unique(self.status, return_counts=True))}
+        closed = np.isin(self.status, (PROFIT, STOP_LOSS))
+        r = self.r_multiple[closed]
+        return {
+            "setups": len(self.ids),
+            "by_status": counts,
+            "filled": int(np.isfinite(self.fill_time).sum()),
+            "closed": int(closed.sum()),
+            "win_rate": float((self.status[closed] == PROFIT).mean()) if closed.any() else None,
+            "avg_r": float(np.nanmean(r)) if r.size and np.isfinite(r).any() else None,
+            "total_r": float(np.nansum(r)) if r.size else 0.0,
+        }
+
+
+def _resolve_long(mkt: _Market, times: np.ndarray, start, end, entry, stop, target):
+    """Resolve a chunk of (possibly mirrored) LONG setups. Prices are in the market's orientation."""
+    q = len(start)
+    rows = np.arange(q)
+    k4 = np.arange(4)
+    n = len(times)
+
+    status = np.full(q, NEW, dtype=np.int8)
+    fill_time = np.full(q, np.nan)
+    fill_price = np.full(q, np.nan)
+    exit_time = np.full(q, np.nan)
+    exit_price = np.full(q, np.nan)
+    mae = np.full(q, np.nan)
+    mfe = np.full(q, np.nan)
+
+    has_bars = end > start
+    last_close = mkt.close[np.clip(end - 1, 0, n - 1)]
+
+    # 1. Fill: first bar whose low reaches the entry, then the first point within it
+    fb = mkt.low_index.first_le(start, end, entry)
+    filled = has_bars & (fb < end)
+    fbc = np.minimum(fb, n - 1)
+    fill_pts = mkt.points[fbc]
+    fill_k = (fill_pts <= entry[:, None]).argmax(axis=1)
+    # A gap through the entry fills at the open; otherwise the limit fills at the entry
+    fpx = np.where(fill_k == 0, np.minimum(fill_pts[:, 0], entry), entry)
+
+    # 2. Exit inside the fill bar (the fill price itself is checked, as in _check_setup)
+    stop_pts = fill_pts <= stop[:, None]
+    tgt_pts = fill_pts >= target[:, None]
+    after_fill = k4[None, :] >= fill_k[:, None]
+    same_hit = (stop_pts | tgt_pts) & after_fill
+    exit_same = filled & same_hit.any(axis=1)
+    exit_k = np.where(exit_same, same_hit.argmax(axis=1), 0)
+    exit_bar = np.where(exit_same, fb, end)
+
+    # 3. Otherwise, first later bar touching stop or target
+    later = filled & ~exit_same
+    sb = mkt.low_index.first_le(np.where(later, fb + 1, end), end, stop)
+    tb = mkt.high_index.first_le(np.where(later, fb + 1, end), end, -target)
+    xb = np.minimum(sb, tb)
+    exit_later = later & (xb < end)
+    xbc = np.minimum(xb, n - 1)
+    x_pts = mkt.points[xbc]
+    later_hit = (x_pts <= stop[:, None]) | (x_pts >= target[:, None])
+    exit_k = np.where(exit_later, later_hit.argmax(axis=1), exit_k)
+    exit_bar = np.where(exit_later, xb, exit_bar)
+
+    exited = exit_same | exit_later
+    ebc = np.minimum(exit_bar, n - 1)
+    exit_pt = mkt.points[ebc, exit_k]
+    hit_target = exit_pt >= target
+    # Target wins a tie, as in _check_setup; a gap beyond the level exits at the open
+    level = np.where(hit_target, target, stop)
+    gap = exit_k == 0
+    xpx = np.where(gap, np.where(hit_target, np.maximum(exit_pt, target), np.minimum(exit_pt, stop)), level)
+
+    # 4. Excursions along the path from the fill point to the exit point (or the horizon)
+    exit_elsewhere = exited & (exit_bar != fb)
+    fill_bar_mask = after_fill & ((k4[None, :] <= exit_k[:, None]) | ~(exited & ~exit_elsewhere)[:, None])
+    exit_bar_mask = (k4[None, :] <= exit_k[:, None]) & exit_elsewhere[:, None]
+    # The exit point is capped at the exit price so excursions stop where the trade closed
+    is_exit_pt = exited[:, None] & (k4[None, :] == exit_k[:, None])
+    fill_bar_pts = np.where(is_exit_pt & ~exit_elsewhere[:, None], xpx[:, None], fill_pts)
+    exit_bar_pts = np.where(is_exit_pt, xpx[:, None], mkt.points[ebc])
+
+    inner_lo = np.where(filled, fb + 1, 0)
+    inner_hi = np.where(filled, np.where(exited, exit_bar, end), 0)
+    low_min = np.minimum.reduce([
+        mkt.low_index.range_min(inner_lo, inner_hi),
+        np.where(fill_bar_mask, fill_bar_pts, np.inf).min(axis=1),
+        np.where(exit_bar_mask, exit_bar_pts, np.inf).min(axis=1),
+    ])
+    high_max = np.maximum.reduce([
+        -mkt.high_index.range_min(inner_lo, inner_hi),
+        np.where(fill_bar_mask, fill_bar_pts, -np.inf).max(axis=1),
+        np.where(exit_bar_mask, exit_bar_pts, -np.inf).max(axis=1),
+    ])
+
+    # 5. Final status
+    near_last = np.abs(last_close - entry) <= CLOSE_THRESHOLD
+    expired = end < n
+    pending_status = np.where(expired, CANCELED, np.where(near_last, CLOSE_TO_ENTRY, MONITORING))
+    status[has_bars] = pending_status[has_bars]
+    status[filled] = TRADING
+    status[exited] = np.where(hit_target, PROFIT, STOP_LOSS)[exited]
+
+    fill_time[filled] = times[fbc][filled]
+    fill_price[filled] = fpx[filled]
+    exit_time[exited] = times[ebc][exited]
+    exit_price[filled] = np.where(exited, xpx, last_close)[filled]
+    mfe[filled] = np.maximum(0.0, high_max - fpx)[filled]
+    mae[filled] = np.maximum(0.0, fpx - low_min)[filled]
+    return status, fill_time, fill_price, exit_time, exit_price, mae, mfe
+
+
+def run_backtest_arrays(bars: Bars, created: np.ndarray, is_long: np.ndarray, entry: np.ndarray,
+                        stop: np.ndarray, target: np.ndarray, ids: Sequence[str] = None,
+                        order: str = DEFAULT_ORDER, max_age_minutes: Optional[float] = 30) -> BacktestResult:
+    """
+    Backtest setups given as column arrays.
+
+    Args:
+        bars: Historical bars (ascending time).
+        created: Setup creation time, epoch seconds. Evaluation starts at the first
+            bar opening at or after it.
+        is_long, entry, stop: Per-setup direction and levels.
+        target: First target to be reached (NaN if none).
+        order: Intrabar ordering policy (see src.intrabar.ORDERS).
+        max_age_minutes: Mirror of TradeManager.prune_backlog — setups stop being
+            evaluated this long after creation (unfilled ones end CANCELED). None = no expiry.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown intrabar order '{order}'")
+    q = len(entry)
+    ids = list(ids) if ids is not None else [str(i) for i in range(q)]
+    created = np.asarray(created, dtype=float)
+    is_long = np.asarray(is_long, dtype=bool)
+    entry = np.asarray(entry, dtype=float)
+    stop = np.asarray(stop, dtype=float)
+    target = np.asarray(target, dtype=float)
+
+    points = bar_points(bars.open, bars.high, bars.low, bars.close, order)
+    start = np.searchsorted(bars.time, created, side="left").astype(np.int64)
+    if max_age_minutes is None:
+        end = np.full(q, len(bars), dtype=np.int64)
+    else:
+        end = np.searchsorted(bars.time, created + max_age_minutes * 60, side="left").astype(np.int64)
+
+    out = {name: np.full(q, np.nan) for name in ("fill_time", "fill_price", "exit_time", "exit_price", "mae", "mfe")}
+    status = np.full(q, NEW, dtype=np.int8)
+
+    for mirrored in (False, True):
+        side = np.flatnonzero(is_long != mirrored)
+        if side.size == 0 or len(bars) == 0:
+            continue
+        mkt = _Market(bars, points, mirrored)
+        sign = -1.0 if mirrored else 1.0
+        # Targets that don't exist can never be reached
+        side_target = np.where(np.isnan(target[side]), np.inf, target[side] * sign)
+        for lo in range(0, side.size, CHUNK_SIZE):
+            sel = side[lo:lo + CHUNK_SIZE]
+            t = side_target[lo:lo + CHUNK_SIZE]
+            res = _resolve_long(mkt, bars.time, start[sel], end[sel], entry[sel] * sign, stop[sel] * sign, t)
+            status[sel] = res[0]
+            out["fill_time"][sel] = res[1]
+            out["fill_price"][sel] = res[2] * sign
+            out["exit_time"][sel] = res[3]
+            out["exit_price"][sel] = res[4] * sign
+            out["mae"][sel] = res[5]
+            out["mfe"][sel] = res[6]
+
+    risk = np.abs(entry - stop)
+    direction = np.where(is_long, 1.0, -1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_multiple = np.where(risk > 0, (out["exit_price"] - out["fill_price"]) * direction / risk, np.nan)
+
+    return BacktestResult(ids=ids, status=status, r_multiple=r_multiple, **out)
+
+
+def run_backtest(setups: Sequence[TradeSetup], bars: Bars, order: str = DEFAULT_ORDER,
+                 max_age_minutes: Optional[float] = 30) -> BacktestResult:
+    """Backtest TradeSetup objects. Each starts at its created_at as a NEW setup."""
+    _, is_long, entry, stop, target = setup_arrays(setups)
+    created = np.array([s.created_at.timestamp() for s in setups], dtype=float)
+    return run_backtest_arrays(bars, created, is_long, entry, stop, target,
+                               ids=[s.id for s in setups], order=order, max_age_minutes=max_age_minutes)
+
+
+def load_setups(path) -> List[TradeSetup]:
+    """Read setups from an LLMResponse-style JSON object or a plain list of setups."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return LLMResponse(**data).setups
+    return [TradeSetup(**s) for s in data]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest trade setups against local bar data.")
+    parser.add_argument("bars", help="Bar file (.csv, .npz or .json)")
+    parser.add_argument("setups", help="Setups JSON (LLM response or list of setups)")
+    parser.add_argument("--order", default=DEFAULT_ORDER, choices=ORDERS, help="Intrabar ordering policy")
+    parser.add_argument("--max-age", type=float, default=30, help="Minutes before a setup expires (0 = never)")
+    parser.add_argument("--out", help="Write per-setup results to this JSON file")
+    args = parser.parse_args(argv)
+
+    started = datetime.now()
+    bars = load_bars(args.bars)
+    setups = load_setups(args.setups)
+    result = run_backtest(setups, bars, order=args.order, max_age_minutes=args.max_age or None)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    summary = result.summary()
+    summary["bars"] = len(bars)
+    summary["seconds"] = round(elapsed, 3)
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result.to_records(), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Local rolling bar cache.
+Holds recent bars per (ticker, timeframe) in a preallocated NumPy ring buffer.
+After the initial backfill only the bars newer than the last stored one are
+requested from data-service, and every other module reads bars from here
+without any HTTP.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.clock import clock
+from src.market import bar_time, fetch_bars
+
+logger = logging.getLogger(__name__)
+
+# Bars kept per (ticker, timeframe); also the size of the initial backfill
+DEFAULT_CAPACITY = 2000
+
+_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+@dataclass
+class Bars:
+    """Column-oriented OHLC bars. time is the bar open in epoch seconds, ascending."""
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_dicts(cls, bars: Sequence[dict]) -> "Bars":
+        """Build from data-service style bar dicts."""
+        bars = sorted(bars, key=bar_time)
+        return cls(
+            time=np.array([bar_time(b) for b in bars], dtype=float),
+            open=np.array([b["open"] for b in bars], dtype=float),
+            high=np.array([b["high"] for b in bars], dtype=float),
+            low=np.array([b["low"] for b in bars], dtype=float),
+            close=np.array([b["close"] for b in bars], dtype=float),
+        )
+
+
+class BarRing:
+    """Fixed-capacity ring buffer of bars in time order. Not thread-safe; guarded by BarStore."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._data = np.zeros((len(_FIELDS), capacity))
+        self._head = 0   # index of the oldest bar
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def last_time(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return float(self._data[0, (self._head + self._count - 1) % self.capacity])
+
+    def upsert(self, row: Sequence[float]) -> bool:
+        """
+        Insert one bar (time, open, high, low, close, volume). A bar with the same time as
+        the newest one replaces it (the forming bar); older bars are ignored.
+        Returns True if the buffer changed.
+        """
+        last = self.last_time()
+        if last is not None and row[0] < last:
+            return False
+        if last is not None and row[0] == last:
+            idx = (self._head + self._count - 1) % self.capacity
+        elif self._count < self.capacity:
+            idx = (self._head + self._count) % self.capacity
+            self._count += 1
+        else:
+            # Full — overwrite the oldest bar
+            idx = self._head
+            self._head = (self._head + 1) % self.capacity
+        self._data[:, idx] = row
+        return True
+
+    def tail(self, count: Optional[int] = None) -> np.ndarray:
+        """Copy of the newest `count` bars (all if None), shape (fields, n), oldest first."""
+        n = self._count if count is None else max(0, min(count, self._count))
+        start = (self._head + self._count - n) % self.capacity
+        idx = (start + np.arange(n)) % self.capacity
+        return self._data[:, idx]
+
+
+class BarStore:
+    """Thread-safe collection of bar rings, refreshed incrementally from data-service."""
+
+    def __init__(self, fetcher: Callable = fetch_bars, capacity: int = DEFAULT_CAPACITY):
+        """
+        Args:
+            fetcher: Called as fetcher(ticker, timeframe, bars_back) and returns bar dicts.
+            capacity: Bars kept per (ticker, timeframe).
+        """
+        self._fetcher = fetcher
+        self.capacity = capacity
+        self._rings: Dict[Tuple[str, int], BarRing] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, ticker: str = "@ES", timeframe: int = 1) -> int:
+        """
+        Pull new bars for (ticker, timeframe). The first call backfills the full capacity;
+        later calls request just enough bars to cover the time since the newest stored bar,
+        which is re-fetched because it may still be forming. Returns bars written.
+        """
+        with self._lock:
+            ring = self._rings.get((ticker, timeframe))
+            last = ring.last_time() if ring else None
+
+        if last is None:
+            bars_back = self.capacity
+        else:
+            elapsed = max(0.0, clock.time() - last)
+            bars_back = min(self.capacity, int(elapsed // (timeframe * 60)) + 1)
+
+        rows = self._rows(self._fetcher(ticker, timeframe, bars_back))
+        # Gap between the newest stored bar and the oldest fetched one (e.g. clock skew) — widen once
+        if last is not None and rows and rows[0][0] > last + timeframe * 60 and bars_back < self.capacity:
+            missing = int((rows[0][0] - last) // (timeframe * 60))
+            rows = self._rows(self._fetcher(ticker, timeframe, min(self.capacity, bars_back + missing)))
+
+        with self._lock:
+            ring = self._rings.setdefault((ticker, timeframe), BarRing(self.capacity))
+            return sum(ring.upsert(row) for row in rows)
+
+    def apply_tick(self, price: float, timestamp: Optional[float] = None,
+                   ticker: str = "@ES", timeframe: int = 1) -> bool:
+        """
+        Fold a streamed price into the forming bar, opening a new bar at the boundary.
+        Ignored until the ring has been backfilled by refresh(); the next refresh
+        overwrites streamed bars with data-service's own OHLC and volume.
+        """
+        t = clock.time() if timestamp is None else timestamp
+        bar_open = t - t % (timeframe * 60)
+        with self._lock:
+            ring = self._rings.get((ticker, timeframe))
+            last = ring.last_time() if ring else None
+            if last is None or bar_open < last:
+                return False
+            if bar_open == last:
+                _, o, h, l, _, v = ring.tail(1)[:, 0]
+                return ring.upsert((bar_open, o, max(h, price), min(l, price), price, v))
+            return ring.upsert((bar_open, price, price, price, price, 0.0))
+
+    @staticmethod
+    def _rows(bars: List[dict]) -> List[tuple]:
+        rows = []
+        for bar in bars or []:
+            try:
+                rows.append((bar_time(bar), float(bar["open"]), float(bar["high"]), float(bar["low"]),
+                             float(bar["close"]), float(bar.get("volume", 0) or 0)))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Skipping malformed bar {bar}: {e}")
+        rows.sort(key=lambda r: r[0])
+        return rows
+
+    def _tail(self, ticker: str, timeframe: int, count: Optional[int]) -> np.ndarray:
+        with self._lock:
+            ring = self._rings.get((ticker, timeframe))
+            if ring is None:
+                return np.zeros((len(_FIELDS), 0))
+            return ring.tail(count)
+
+    def latest_close(self, ticker: str = "@ES", timeframe: int = 1) -> float:
+        """Close of the newest stored bar (0.0 if nothing is stored yet)."""
+        data = self._tail(ticker, timeframe, 1)
+        return float(data[4, -1]) if data.shape[1] else 0.0
+
+    def window(self, ticker: str = "@ES", timeframe: int = 1, count: Optional[int] = None) -> Bars:
+        """Newest `count` bars (all stored if None) as arrays."""
+        data = self._tail(ticker, timeframe, count)
+        return Bars(*(data[i].copy() for i in range(5)))
+
+    def recent_bars(self, ticker: str = "@ES", timeframe: int = 1, count: int = 1) -> List[dict]:
+        """Newest `count` bars in data-service dict format (oldest first)."""
+        data = self._tail(ticker, timeframe, count)
+        return [
+            {"timestamp": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in data.T.tolist()
+        ]
+
+
+# Global singleton
+bar_store = BarStore()
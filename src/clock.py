@@ -0,0 +1,77 @@
+"""
+Injectable time source.
+Market hours, cooldowns, setup ages, cache TTLs and the scheduler read time
+through the `clock` singleton instead of time.time()/datetime.now(), so a
+simulation can install a VirtualClock and replay a trading session in seconds
+(see src.simulate). I/O deadlines (CLI timeouts, HTTP, hedging) stay on real time.
+"""
+import threading
+import time
+from datetime import datetime, tzinfo
+from typing import Optional
+
+
+class SystemClock:
+    """Real time."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.now(tz)
+
+
+class VirtualClock(SystemClock):
+    """Time that only moves when advanced. monotonic() and time() are the same value."""
+
+    def __init__(self, start: float):
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def monotonic(self) -> float:
+        return self.time()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def set(self, t: float):
+        """Move to epoch second t. Virtual time never goes backwards."""
+        with self._lock:
+            if t < self._now:
+                raise ValueError(f"Virtual clock can't go back ({t} < {self._now})")
+            self._now = float(t)
+
+    def advance(self, seconds: float):
+        self.set(self.time() + seconds)
+
+
+class Clock:
+    """Delegates to the installed source; modules hold this object, so sources can be swapped at runtime."""
+
+    def __init__(self, source: Optional[SystemClock] = None):
+        self.source = source or SystemClock()
+
+    def install(self, source: SystemClock) -> SystemClock:
+        """Replace the time source. Returns the previous one."""
+        previous, self.source = self.source, source
+        return previous
+
+    def time(self) -> float:
+        return self.source.time()
+
+    def monotonic(self) -> float:
+        return self.source.monotonic()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return self.source.now(tz)
+
+
+# Global singleton
+clock = Clock()
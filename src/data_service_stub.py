@@ -0,0 +1,232 @@
+"""
+Local data-service stand-in.
+Serves the contracts the daemon uses (GET /bars/{ticker}, POST /trendlines,
+GET /stream/{ticker}) from src.synthetic_market, with injectable latency and
+errors, so the polling, retry, streaming and trigger paths can be load-tested
+with no market feed. Point the daemon at it with "data_service_url".
+
+Usage:
+    python -m src.data_service_stub --port 8010
+    python -m src.data_service_stub --port 8010 --latency-ms 50 --jitter-ms 20 --error-rate 0.05
+
+Fault settings can be changed while it runs (POST /stub/faults with any of the
+FaultInjector fields) and request/error counts are at GET /stub/stats.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.synthetic_market import TICK_SECONDS, SyntheticMarket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8010
+DEFAULT_THREADS = 32
+
+# Idle streams send an SSE comment this often so clients don't time out
+KEEPALIVE_SECONDS = 5.0
+
+
+class FaultInjector:
+    """Added latency and error responses for the contract routes."""
+
+    FIELDS = ("latency_ms", "jitter_ms", "error_rate", "error_statuses", "fail_next")
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_statuses: Sequence[int] = (503,), seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms / jitter_ms: Every request is delayed by latency_ms plus up to jitter_ms.
+            error_rate: Fraction of requests answered with a random status from error_statuses.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.fail_next = 0  # the next N requests fail regardless of error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        unknown = set(settings) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {', '.join(sorted(unknown))}")
+        with self._lock:
+            for name, value in settings.items():
+                setattr(self, name, list(value) if name == "error_statuses" else value)
+
+    def settings(self) -> dict:
+        with self._lock:
+            return {name: getattr(self, name) for name in self.FIELDS}
+
+    def apply(self) -> Optional[int]:
+        """Sleep for the injected latency; returns an error status to answer with, or None."""
+        with self._lock:
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000.0
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                status = self.error_statuses[0]
+            elif self.error_rate > 0 and self._rng.random() < self.error_rate:
+                status = self._rng.choice(self.error_statuses)
+            else:
+                status = None
+        if delay > 0:
+            time.sleep(delay)
+        return status
+
+
+class MarketRegistry:
+    """One SyntheticMarket per ticker, each seeded from the base seed and the ticker name."""
+
+    def __init__(self, seed: int = 0, **market_options):
+        self.seed = seed
+        self.market_options = market_options
+        self._markets: Dict[str, SyntheticMarket] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str) -> SyntheticMarket:
+        with self._lock:
+            market = self._markets.get(ticker)
+            if market is None:
+                market = SyntheticMarket(seed=self.seed + zlib.crc32(ticker.encode()), **self.market_options)
+                self._markets[ticker] = market
+            return market
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return list(self._markets)
+
+
+def create_app(markets: Optional[MarketRegistry] = None, faults: Optional[FaultInjector] = None) -> Flask:
+    markets = markets or MarketRegistry()
+    faults = faults or FaultInjector()
+    app = Flask(__name__)
+    app.config["markets"] = markets
+    app.config["faults"] = faults
+
+    counts = Counter()
+    counts_lock = threading.Lock()
+
+    def count(key: str):
+        with counts_lock:
+            counts[key] += 1
+
+    @app.before_request
+    def inject_faults():
+        if request.path.startswith("/stub/"):
+            return None
+        route = request.path.split("/")[1]
+        count(f"requests.{route}")
+        status = faults.apply()
+        if status:
+            count(f"errors.{route}")
+            return jsonify({"error": "injected fault"}), status
+        return None
+
+    @app.route("/bars/<path:ticker>")
+    def bars(ticker):
+        timeframe = request.args.get("timeframe", 1, type=int)
+        bars_back = request.args.get("bars_back", 1, type=int)
+        if timeframe < 1 or bars_back < 1:
+            return jsonify({"error": "timeframe and bars_back must be positive"}), 400
+        return jsonify(markets.get(ticker).bars(timeframe, bars_back))
+
+    @app.route("/trendlines", methods=["POST"])
+    def trendlines():
+        payload = request.get_json(silent=True) or {}
+        market = markets.get(payload.get("ticker", "@ES"))
+        try:
+            timeframes = [int(tf) for tf in payload.get("timeframes") or [payload.get("timeframe", 5)]]
+            bars_back = int(payload.get("bars_back", 200))
+        except (TypeError, ValueError):
+            return jsonify({"error": "timeframes and bars_back must be integers"}), 400
+        return jsonify({
+            "ticker": payload.get("ticker", "@ES"),
+            "timeframes": {f"{tf}min": market.trendlines(tf, bars_back) for tf in timeframes},
+        })
+
+    @app.route("/stream/<path:ticker>")
+    def stream(ticker):
+        market = markets.get(ticker)
+
+        def events():
+            yield ":connected\n\n"
+            last, quiet = None, 0.0
+            while True:
+                price, ts = market.tick()
+                if ts != last:
+                    last, quiet = ts, 0.0
+                    yield f"data: {json.dumps({'price': price, 'timestamp': ts})}\n\n"
+                elif quiet >= KEEPALIVE_SECONDS:
+                    quiet = 0.0
+                    yield ":keepalive\n\n"
+                time.sleep(TICK_SECONDS / 5)
+                quiet += TICK_SECONDS / 5
+
+        return Response(stream_with_context(events()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"})
+
+    @app.route("/stub/faults", methods=["GET", "POST"])
+    def stub_faults():
+        if request.method == "POST":
+            try:
+                faults.configure(**(request.get_json(silent=True) or {}))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify(faults.settings())
+
+    @app.route("/stub/stats")
+    def stub_stats():
+        with counts_lock:
+            snapshot = dict(counts)
+        tickers = {}
+        for ticker in markets.tickers():
+            market = markets.get(ticker)
+            price, _ = market.tick()
+            tickers[ticker] = {"price": price, "regime": market.regime(), "gaps": market.gaps, "wicks": market.wicks}
+        return jsonify({"counts": snapshot, "faults": faults.settings(), "tickers": tickers})
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Synthetic stand-in for data-service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start-price", type=float, default=5000.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, nargs="+", default=[503], help="Statuses for injected errors")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app = create_app(MarketRegistry(args.seed, start_price=args.start_price),
+                     FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, seed=args.seed))
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress is not installed — falling back to the Flask development server")
+        app.run(host=args.host, port=args.port, debug=False, use_reloader=False, threaded=True)
+    else:
+        logger.info(f"Synthetic data-service on {args.host}:{args.port} ({args.threads} threads)")
+        serve(app, host=args.host, port=args.port, threads=args.threads, ident=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Dashboard push channel.
+State changes (inference status, strategy progress, setup transitions, price
+ticks) are published once to a versioned ring buffer. Each event is serialized
+to its SSE frame at publish time, so /api/events clients only copy bytes and
+server work scales with the number of changes rather than with clients.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Events kept for clients resuming with Last-Event-ID
+RING_SIZE = 1000
+
+
+@dataclass
+class Event:
+    seq: int
+    type: str
+    frame: str  # complete SSE frame
+    published_at: float
+
+
+def sse_frame(event_type: str, data: dict, seq: Optional[int] = None) -> str:
+    head = f"id: {seq}\n" if seq is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventBus:
+    """Thread-safe ring of versioned events; readers block until something newer than their seq arrives."""
+
+    def __init__(self, capacity: int = RING_SIZE):
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._seq = 0
+
+    @property
+    def seq(self) -> int:
+        """Version of the newest event (0 before the first one)."""
+        with self._cond:
+            return self._seq
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._cond:
+            self._seq += 1
+            self._events.append(Event(self._seq, event_type, sse_frame(event_type, data, self._seq), time.time()))
+            self._cond.notify_all()
+            return self._seq
+
+    def _covers(self, seq: int) -> bool:
+        """Whether every event after `seq` is still in the ring. Caller holds the lock."""
+        oldest = self._events[0].seq if self._events else self._seq + 1
+        return 0 <= seq <= self._seq and seq >= oldest - 1
+
+    def covers(self, seq: int) -> bool:
+        with self._cond:
+            return self._covers(seq)
+
+    def wait(self, after: int, timeout: float) -> Optional[List[Event]]:
+        """
+        Events newer than `after`, blocking up to `timeout` seconds for the first one.
+        Returns [] on timeout, or None when the reader fell behind the ring and must resync.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after, timeout)
+            if not self._covers(after):
+                return None
+            return [e for e in self._events if e.seq > after]
+
+
+def publish_setup_change(kind: str, setup):
+    """TradeManager listener: forwards setup additions, transitions and removals."""
+    if kind == "removed":
+        event_bus.publish("setup_removed", {"id": setup.id})
+    else:
+        event_bus.publish("setup", setup.model_dump(mode="json"))
+
+
+# Global singleton
+event_bus = EventBus()
@@ -0,0 +1,158 @@
+"""
+Inference executor.
+The single path through which every inference runs. A dedicated worker thread
+pulls jobs from a priority queue (manual > trendline trigger > scheduled), so the
+price monitoring loop keeps its cadence while an inference is in flight.
+
+Pending requests for the same strategy are coalesced into one job with combined
+reasons, which bounds the queue to one job per strategy. Non-manual jobs that
+arrive during the cooldown wait for it to expire instead of being dropped.
+"""
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.inference import InferenceJob, JobPriority, cooldown_remaining, run_inference
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """Single-worker executor with a coalescing priority queue."""
+
+    def __init__(self, runner: Callable = run_inference, cooldown: Callable[[], float] = cooldown_remaining):
+        """
+        Args:
+            runner: Called as runner(client, job) on the worker thread.
+            cooldown: Returns seconds until non-manual jobs may run.
+        """
+        self._runner = runner
+        self._cooldown = cooldown
+        self._client = None
+        self._cond = threading.Condition()
+        # One pending job per strategy — this is where coalescing happens
+        self._pending: Dict[str, InferenceJob] = {}
+        self._running: Optional[InferenceJob] = None
+        self._thread: threading.Thread = None
+        # Inline: jobs only run when the owner calls run_ready() (used by src.simulate)
+        self.inline = False
+
+    def set_client(self, client):
+        with self._cond:
+            self._client = client
+
+    def set_inline(self, inline: bool):
+        """Switch between the worker thread and run_ready() on the caller's thread."""
+        with self._cond:
+            self.inline = inline
+            self._cond.notify_all()
+
+    def has_client(self) -> bool:
+        with self._cond:
+            return self._client is not None
+
+    def submit(self, priority: JobPriority, reason: str = None, strategy: str = "main") -> InferenceJob:
+        """
+        Queue an inference request. If a job for the same strategy is already pending,
+        the request is merged into it. Returns the pending job.
+        """
+        job = InferenceJob(priority=priority, strategy=strategy, reasons=[reason] if reason else [])
+        with self._cond:
+            self._ensure_worker()
+            existing = self._pending.get(strategy)
+            if existing:
+                existing.merge(job)
+                logger.info(f"Coalesced {priority.name.lower()} request into pending {strategy} job "
+                            f"({len(existing.reasons)} reasons)")
+                job = existing
+            else:
+                self._pending[strategy] = job
+            self._cond.notify_all()
+            return job
+
+    def pending_jobs(self) -> List[dict]:
+        """Pending jobs in the order they will run."""
+        with self._cond:
+            return [j.to_dict() for j in sorted(self._pending.values(), key=self._sort_key)]
+
+    def jobs_ahead(self, job: InferenceJob) -> Optional[int]:
+        """Jobs that will run before `job` (the running one included); 0 if it runs or runs next, None once done."""
+        with self._cond:
+            if job is self._running:
+                return 0
+            order = sorted(self._pending.values(), key=self._sort_key)
+            place = next((i for i, pending in enumerate(order) if pending is job), None)
+            if place is None:
+                return None
+            return place + (1 if self._running is not None else 0)
+
+    def is_busy(self) -> bool:
+        """True if a job is running or waiting."""
+        with self._cond:
+            return self._running is not None or bool(self._pending)
+
+    @staticmethod
+    def _sort_key(job: InferenceJob):
+        return (job.priority, job.submitted_at)
+
+    def _ensure_worker(self):
+        # Caller holds self._cond
+        if self.inline:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name="inference-executor", daemon=True)
+            self._thread.start()
+
+    def _claim(self) -> Tuple[Optional[InferenceJob], Optional[float]]:
+        """Claim the next runnable job, or return (None, seconds until one may run). Caller holds self._cond."""
+        job = min(self._pending.values(), key=self._sort_key, default=None)
+        if job is None:
+            return None, None
+        wait = 0.0 if job.priority == JobPriority.MANUAL else self._cooldown()
+        if wait > 0:
+            return None, wait
+        del self._pending[job.strategy]
+        self._running = job
+        return job, 0.0
+
+    def _next_job(self) -> InferenceJob:
+        """Block until a job is runnable, then claim it."""
+        with self._cond:
+            while True:
+                if self.inline:
+                    self._cond.wait()
+                    continue
+                job, wait = self._claim()
+                if job is not None:
+                    return job
+                # Deferred, not dropped — re-check when cooldown ends or a new job arrives
+                self._cond.wait(timeout=wait)
+
+    def _execute(self, job: InferenceJob):
+        try:
+            self._runner(self._client, job)
+        except Exception as e:
+            logger.error(f"Inference job failed: {e}")
+        finally:
+            with self._cond:
+                self._running = None
+                self._cond.notify_all()
+
+    def run_ready(self) -> int:
+        """Run every job that is runnable now on the calling thread (inline mode). Returns jobs run."""
+        count = 0
+        while True:
+            with self._cond:
+                job, _ = self._claim()
+            if job is None:
+                return count
+            self._execute(job)
+            count += 1
+
+    def _worker(self):
+        while True:
+            self._execute(self._next_job())
+
+
+# Global singleton
+inference_executor = InferenceExecutor()
@@ -0,0 +1,70 @@
+"""
+Deadline queue for setup expiry.
+A min-heap of (deadline, seq, key) entries. Rescheduling or discarding a key
+doesn't search the heap: the key's live entry is tracked separately and stale
+entries are skipped when they surface, so pop_due only does work for keys that
+are actually due.
+"""
+import heapq
+import itertools
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Rebuild the heap once stale entries outnumber live ones by this factor
+_COMPACT_RATIO = 2
+_COMPACT_MIN = 64
+
+
+class ExpiryQueue:
+    """Keys with a deadline (epoch seconds). None means the key never expires."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._live: Dict[Hashable, Tuple[float, int]] = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, key) -> bool:
+        return key in self._live
+
+    def deadline(self, key) -> Optional[float]:
+        entry = self._live.get(key)
+        return entry[0] if entry else None
+
+    def schedule(self, key, deadline: Optional[float]):
+        """Set (or move) the key's deadline. O(1) when it is unchanged, O(log n) otherwise."""
+        if deadline is None:
+            self.discard(key)
+            return
+        current = self._live.get(key)
+        if current is not None and current[0] == deadline:
+            return
+        entry = (deadline, next(self._seq), key)
+        self._live[key] = entry[:2]
+        heapq.heappush(self._heap, entry)
+        self._maybe_compact()
+
+    def discard(self, key):
+        # The heap entry goes stale and is dropped when it surfaces (or on compaction)
+        self._live.pop(key, None)
+        self._maybe_compact()
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """Remove and return the keys whose deadline is before now, earliest first."""
+        due = []
+        while self._heap and self._heap[0][0] < now:
+            deadline, seq, key = heapq.heappop(self._heap)
+            if self._live.get(key) == (deadline, seq):
+                del self._live[key]
+                due.append(key)
+        return due
+
+    def clear(self):
+        self._heap.clear()
+        self._live.clear()
+
+    def _maybe_compact(self):
+        if len(self._heap) > _COMPACT_MIN and len(self._heap) > _COMPACT_RATIO * len(self._live):
+            self._heap = [(deadline, seq, key) for key, (deadline, seq) in self._live.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,225 @@
+"""
+Record/replay stand-in for the Gemini CLI.
+GeminiClient(record_dir=...) saves every real CLI call as a JSON transcript
+(stdout/stderr lines with their offsets, exit code, duration) keyed by a hash
+of the prompt. Run as a program, this module behaves like `gemini`: it reads
+the prompt from stdin and replays the matching transcript, with a configurable
+latency distribution, stderr noise and injected failures. With no matching
+transcript it answers with stub setups around the prompt's current price.
+
+Use it in place of the real CLI through the GEMINI_CLI environment variable:
+    GEMINI_CLI="python -m src.fake_gemini" python src/main.py
+    GEMINI_CLI="python -m src.fake_gemini --transcripts data/transcripts --latency lognormal:2:0.4"
+
+Options can also be given as FAKE_GEMINI_* environment variables (see main()).
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Numbers (times, prices) change on every call; templates match with them masked out
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+FAILURE_MODES = ("exit", "hang", "truncate", "garbage")
+
+STDERR_NOISE = (
+    "Loaded cached credentials.",
+    "[DEBUG] MCP server 'trading-mcp' connected",
+    "(node:4242) [DEP0040] DeprecationWarning: The `punycode` module is deprecated.",
+    "Flushing log events to Clearcut.",
+)
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def template_key(prompt: str) -> str:
+    """Hash of the prompt with every number masked, so transcripts replay across prices and times."""
+    return prompt_key(_NUMBER.sub("#", prompt))
+
+
+def save_transcript(directory, prompt: str, stdout: Sequence[Tuple[float, str]],
+                    stderr: Sequence[Tuple[float, str]], returncode: int, duration: float,
+                    model: Optional[str] = None) -> Path:
+    """Write one call as <directory>/<prompt_key>.json. Lines are (seconds since the prompt was sent, text)."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    key = prompt_key(prompt)
+    path = directory / f"{key}.json"
+    transcript = {
+        "prompt_key": key,
+        "template_key": template_key(prompt),
+        "prompt_chars": len(prompt),
+        "model": model,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "returncode": returncode,
+        "duration": round(duration, 3),
+        "stdout": [[round(t, 3), line] for t, line in stdout],
+        "stderr": [[round(t, 3), line] for t, line in stderr],
+    }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(transcript, indent=1), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+class TranscriptStore:
+    """Transcripts in a directory, looked up by exact prompt first and then by template."""
+
+    def __init__(self, directory=None):
+        self.by_prompt: Dict[str, dict] = {}
+        self.by_template: Dict[str, List[dict]] = {}
+        if directory and Path(directory).is_dir():
+            for path in sorted(Path(directory).glob("*.json")):
+                try:
+                    transcript = json.loads(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    continue
+                self.by_prompt[transcript["prompt_key"]] = transcript
+                self.by_template.setdefault(transcript["template_key"], []).append(transcript)
+
+    def __len__(self):
+        return len(self.by_prompt)
+
+    def find(self, prompt: str, rng: random.Random) -> Optional[dict]:
+        exact = self.by_prompt.get(prompt_key(prompt))
+        if exact:
+            return exact
+        matches = self.by_template.get(template_key(prompt))
+        return rng.choice(matches) if matches else None
+
+
+def stub_response(prompt: str, tag: str, offset: float = 4.0, risk: float = 4.0) -> str:
+    """A fenced JSON answer with one long and one short setup around "Current Price: X" in the prompt."""
+    match = re.search(r"Current Price: ([\d.]+)", prompt)
+    setups = []
+    if match:
+        price = round(float(match.group(1)) * 4) / 4
+        for direction, sign in (("LONG", -1), ("SHORT", 1)):
+            entry = price + sign * offset
+            setups.append({
+                "id": f"{tag}-{direction.lower()}",
+                "direction": direction,
+                "entry": {"price": entry, "condition": f"price {'<=' if sign < 0 else '>='} {entry:.2f}"},
+                "stop_loss": {"price": entry + sign * risk},
+                "targets": [{"price": entry - sign * risk}],
+                "rules_text": "stub setup",
+            })
+    return "```json\n" + json.dumps({"market_overview": "simulated", "setups": setups}, indent=2) + "\n```\n"
+
+
+def sample_latency(spec: str, rng: random.Random) -> Optional[float]:
+    """
+    Total response time in seconds from a spec, or None to keep recorded timing:
+    "recorded", "fixed:S", "uniform:A:B" or "lognormal:MEDIAN:SIGMA".
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":")] if args else []
+    if kind == "recorded":
+        return None
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return values[0] * math.exp(rng.gauss(0.0, values[1]))
+    raise ValueError(f"Unknown latency spec '{spec}'")
+
+
+def _replay(stdout: List[Tuple[float, str]], stderr: List[Tuple[float, str]], started: float):
+    """Write both streams in offset order, sleeping until each line is due."""
+    events = sorted([(t, 0, line) for t, line in stdout] + [(t, 1, line) for t, line in stderr],
+                    key=lambda e: e[0])
+    for t, err, line in events:
+        wait = started + t - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        stream = sys.stderr if err else sys.stdout
+        stream.write(line if line.endswith("\n") else line + "\n")
+        stream.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Replay recorded Gemini CLI transcripts.")
+    parser.add_argument("--transcripts", default=env("FAKE_GEMINI_TRANSCRIPTS"), help="Transcript directory")
+    parser.add_argument("--latency", default=env("FAKE_GEMINI_LATENCY", "recorded"),
+                        help="recorded | fixed:S | uniform:A:B | lognormal:MEDIAN:SIGMA (stub answers use 0.0 for recorded)")
+    parser.add_argument("--startup", type=float, default=float(env("FAKE_GEMINI_STARTUP", 0)),
+                        help="Seconds spent 'starting' before the prompt is read")
+    parser.add_argument("--stderr-lines", type=int, default=int(env("FAKE_GEMINI_STDERR_LINES", 0)),
+                        help="Noise lines written to stderr per call")
+    parser.add_argument("--failure-rate", type=float, default=float(env("FAKE_GEMINI_FAILURE_RATE", 0)))
+    parser.add_argument("--failure-modes", default=env("FAKE_GEMINI_FAILURE_MODES", ",".join(FAILURE_MODES)),
+                        help=f"Comma-separated subset of {', '.join(FAILURE_MODES)}")
+    parser.add_argument("--fallback", choices=("stub", "error"), default=env("FAKE_GEMINI_FALLBACK", "stub"),
+                        help="Answer for prompts with no transcript")
+    parser.add_argument("--seed", type=int, default=int(env("FAKE_GEMINI_SEED")) if env("FAKE_GEMINI_SEED") else None)
+    # The real CLI's flags (--model, --yolo) are accepted and ignored
+    args, _ = parser.parse_known_args(argv)
+
+    if args.startup > 0:
+        time.sleep(args.startup)
+    prompt = sys.stdin.read()
+    started = time.monotonic()
+    # Seeded runs are deterministic per prompt, unseeded ones per process
+    rng = random.Random(f"{args.seed}:{prompt_key(prompt)}" if args.seed is not None else None)
+
+    transcript = TranscriptStore(args.transcripts).find(prompt, rng) if args.transcripts else None
+    if transcript:
+        stdout = [(t, line) for t, line in transcript["stdout"]]
+        stderr = [(t, line) for t, line in transcript["stderr"]]
+        returncode = transcript["returncode"]
+        duration = max([transcript["duration"]] + [t for t, _ in stdout + stderr])
+    elif args.fallback == "stub":
+        lines = stub_response(prompt, f"fake{rng.getrandbits(32):08x}").splitlines(keepends=True)
+        stdout = [(0.0, line) for line in lines]
+        stderr, returncode, duration = [], 0, 0.0
+    else:
+        stdout, returncode, duration = [], 1, 0.0
+        stderr = [(0.0, f"Error: no transcript for prompt {prompt_key(prompt)[:12]}")]
+
+    total = sample_latency(args.latency, rng)
+    if total is not None:
+        if duration > 0:
+            scale = total / duration
+            stdout = [(t * scale, line) for t, line in stdout]
+            stderr = [(t * scale, line) for t, line in stderr]
+        else:
+            # Spread lines evenly over the sampled latency
+            stdout = [(total * (i + 1) / len(stdout), line) for i, (_, line) in enumerate(stdout)]
+        duration = total
+
+    stderr += [(rng.uniform(0, duration), rng.choice(STDERR_NOISE)) for _ in range(args.stderr_lines)]
+
+    modes = [m for m in args.failure_modes.split(",") if m in FAILURE_MODES]
+    failure = rng.choice(modes) if modes and rng.random() < args.failure_rate else None
+    if failure == "hang":
+        _replay([], stderr, started)
+        while True:
+            time.sleep(60)
+    if failure == "exit":
+        stdout, returncode = [], 1
+        stderr.append((duration, "Error: 503 Service Unavailable (injected)"))
+    elif failure == "truncate":
+        stdout, returncode = stdout[:len(stdout) // 2], 1
+        stderr.append((duration, "Error: stream closed unexpectedly (injected)"))
+    elif failure == "garbage":
+        stdout = [(t, "".join(rng.choice("{}[]:,\"abc") for _ in range(40))) for t, _ in stdout]
+
+    _replay(stdout, stderr, started)
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
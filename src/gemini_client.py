@@ -1,12 +1,30 @@
 import subprocess
+import shlex
 import shutil
 import logging
 import os
+import re
 import threading
+import time
 from pathlib import Path
+from typing import Callable, List, Optional
+
+from src.fake_gemini import save_transcript
+from src.gemini_pool import GeminiProcessPool, kill_process_tree
+from src.metrics import current_labels, inference_tool_calls, observe_phase
 
 logger = logging.getLogger(__name__)
 
+# How often a running call checks its deadline / cancel event
+WAIT_POLL_SECONDS = 0.2
+
+# Command line that replaces the gemini executable, e.g. "python -m src.fake_gemini"
+# (read from the environment or .gemini/.env)
+GEMINI_CLI_ENV = "GEMINI_CLI"
+
+# Output lines that show an MCP tool call (the CLI's tool status lines, or its debug log on stderr)
+TOOL_CALL_PATTERN = re.compile(r"\bget_market_state\b|\bmcp_\w+|\btool[ _]call", re.IGNORECASE)
+
 
 class GeminiClient:
     """
@@ -15,20 +33,32 @@ class GeminiClient:
     Configuration is picked up from the .gemini folder in the project root:
     - .gemini/.env: Contains GEMINI_SYSTEM_MD pointing to system prompt file
     - .gemini/settings.json: Contains MCP server configuration
+
+    The executable lookup and .gemini/.env are read once per client; restart the
+    daemon after changing them. Prompts are passed on stdin so that processes can be
+    started ahead of time by a GeminiProcessPool. Set GEMINI_CLI to run another
+    command instead of `gemini` (see src.fake_gemini).
     """
     
     # Use latest Pro preview model for trading inference
     MODEL = "gemini-3-pro-preview"
     
-    def __init__(self, user_prompt_path: str):
+    def __init__(self, user_prompt_path: str, pool_size: int = 0, record_dir: Optional[str] = None):
         """
         Initialize the Gemini client.
         
         Args:
             user_prompt_path: Path to the user prompt file.
+            pool_size: Warm standby gemini processes to keep (0 = cold spawn per call).
+            record_dir: Save every completed call as a transcript here, for replay by
+                        src.fake_gemini (None = don't record).
         """
         self.user_prompt_path = Path(user_prompt_path)
         self.project_root = Path(__file__).parent.parent.resolve()
+        self.pool_size = pool_size
+        self.record_dir = Path(record_dir) if record_dir else None
+        self._pool: Optional[GeminiProcessPool] = None
+        self._pool_lock = threading.Lock()
 
     def _read_file(self, path: Path) -> str:
         """Read file contents, returning empty string if file doesn't exist."""
@@ -55,19 +85,137 @@ class GeminiClient:
         
         return env_vars
 
-    def run_inference(self, context_header: str = "", prompt_path: Path = None) -> str:
+    def _find_executable(self) -> Optional[str]:
+        gemini_exec = shutil.which("gemini")
+        if not gemini_exec:
+            # Fallback to common Windows npm path
+            npm_path = Path(os.environ.get("APPDATA", "")) / "npm" / "gemini.cmd"
+            if npm_path.exists():
+                gemini_exec = str(npm_path)
+        return gemini_exec
+
+    def _find_command(self, dotenv: dict) -> Optional[List[str]]:
+        """The GEMINI_CLI override split into arguments, else the gemini executable."""
+        override = os.environ.get(GEMINI_CLI_ENV) or dotenv.get(GEMINI_CLI_ENV)
+        if override:
+            return shlex.split(override, posix=os.name != 'nt')
+        gemini_exec = self._find_executable()
+        return [gemini_exec] if gemini_exec else None
+
+    def _get_pool(self) -> Optional[GeminiProcessPool]:
+        """Creates the process pool on first use (None if the executable is missing)."""
+        with self._pool_lock:
+            if self._pool is None:
+                dotenv = self._load_dotenv()
+                command = self._find_command(dotenv)
+                if not command:
+                    return None
+
+                # Prepare environment - load .env from .gemini folder
+                env = os.environ.copy()
+                env.update(dotenv)
+                # Explicitly disable node-pty / console attachment features
+                env["NODE_SKIP_PLATFORM_CHECK"] = "1"
+
+                logger.info(f"Running gemini from: {self.project_root}")
+                logger.info(f"Using gemini executable: {' '.join(command)}")
+                if "GEMINI_SYSTEM_MD" in env:
+                    logger.info(f"System prompt: {env['GEMINI_SYSTEM_MD']}")
+
+                # Headless mode with Pro model; without -p the prompt is read from stdin
+                cmd = command + [
+                    "--model", self.MODEL,
+                    "--yolo",  # Auto-approve all tool calls (required for non-interactive)
+                ]
+                self._pool = GeminiProcessPool(cmd, env=env, cwd=str(self.project_root), size=self.pool_size)
+            return self._pool
+
+    def start_pool(self):
+        """Pre-start the standby processes (no-op when pool_size is 0)."""
+        pool = self._get_pool()
+        if pool is not None:
+            pool.fill()
+
+    def pool_stats(self) -> dict:
+        return self._pool.stats() if self._pool else {}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+    def _start_process(self, pool: GeminiProcessPool, prompt: str) -> subprocess.Popen:
+        """Takes a process from the pool and sends it the prompt. A standby that died is replaced once."""
+        process, warm = pool.acquire()
+        try:
+            process.stdin.write(prompt)
+            process.stdin.close()
+        except (BrokenPipeError, OSError) as e:
+            if not warm:
+                raise
+            logger.warning(f"Standby gemini process unusable ({e}) — spawning a fresh one")
+            kill_process_tree(process)  # its node/MCP children too
+            process.wait()
+            process, warm = pool.acquire()
+            process.stdin.write(prompt)
+            process.stdin.close()
+        logger.info(f"Gemini process {'warm' if warm else 'cold'} (pid {process.pid})")
+        return process
+
+    def _record(self, prompt: str, transcript: tuple, returncode: int, duration: float):
+        try:
+            path = save_transcript(self.record_dir, prompt, transcript[0], transcript[1], returncode,
+                                   duration, model=self.MODEL)
+            logger.info(f"Recorded transcript {path.name}")
+        except OSError as e:
+            logger.warning(f"Failed to record transcript: {e}")
+
+    @staticmethod
+    def _wait(process: subprocess.Popen, timeout: Optional[float],
+              cancel: Optional[threading.Event]) -> Optional[str]:
+        """Wait for exit; kill the process tree on deadline or cancel. Returns why it was stopped, if it was."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                process.wait(timeout=WAIT_POLL_SECONDS)
+                return None
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel is not None and cancel.is_set():
+                stopped = "cancelled"
+            elif deadline is not None and time.monotonic() >= deadline:
+                stopped = f"timed out after {timeout:g}s"
+            else:
+                continue
+            kill_process_tree(process)
+            process.wait()
+            return stopped
+
+    def run_inference(self, context_header: str = "", prompt_path: Path = None,
+                      on_line: Optional[Callable[[str], None]] = None,
+                      prompt_transform: Optional[Callable[[str], str]] = None,
+                      timeout: Optional[float] = None,
+                      cancel: Optional[threading.Event] = None) -> str:
         """
-        Calls the Gemini CLI in headless mode with -p parameter.
+        Calls the Gemini CLI in headless mode with the prompt on stdin.
         Uses Pro model for all inference requests.
         
         Args:
             context_header: Optional text derived from logic (e.g. current time/price) 
                           to prepend to the user prompt.
             prompt_path: Optional path to override the default user prompt file.
+            on_line: Optional callback for each stdout line as it arrives (on a reader thread).
+            prompt_transform: Optional rewrite of the prompt file text, applied before the
+                          context header is prepended.
+            timeout: Optional deadline in seconds; the process tree is killed when it passes.
+            cancel: Optional event; setting it kills the process tree (used by hedged calls).
 
         The system prompt is read from the GEMINI_SYSTEM_MD environment variable
         (set in .gemini/.env). MCP configuration is picked up from .gemini/settings.json.
+
+        Phase timings (prompt_build, spawn, first_byte, tool_call, exit) are recorded
+        under the caller's src.metrics inference labels.
         """
+        build_started = time.perf_counter()
         # Determine effective prompt path
         effective_prompt_path = Path(prompt_path) if prompt_path else self.user_prompt_path
         # Resolve user prompt path relative to project root
@@ -77,11 +225,14 @@ class GeminiClient:
             prompt_path = self.project_root / effective_prompt_path
         
         user_prompt = self._read_file(prompt_path)
+        if prompt_transform and user_prompt:
+            user_prompt = prompt_transform(user_prompt)
         
         # Prepend context if provided
         if context_header:
             user_prompt = f"{context_header}\n\n{user_prompt}"
         
+        observe_phase("prompt_build", time.perf_counter() - build_started)
         logger.info(f"User prompt path: {prompt_path}")
         logger.info(f"User prompt content:\n{user_prompt[:500]}...")  # Log first 500 chars
         
@@ -89,86 +240,86 @@ class GeminiClient:
             logger.warning("User prompt is empty")
             return "Error: User prompt is empty"
 
-        # Find gemini executable
-        gemini_exec = shutil.which("gemini")
-        if not gemini_exec:
-            # Fallback to common Windows npm path
-            npm_path = Path(os.environ.get("APPDATA", "")) / "npm" / "gemini.cmd"
-            if npm_path.exists():
-                gemini_exec = str(npm_path)
-        
-        if not gemini_exec:
+        pool = self._get_pool()
+        if pool is None:
             logger.error("Gemini executable not found in PATH or APPDATA/npm")
             return "Error: Gemini executable not found. Please install the Gemini CLI."
 
-        # Prepare environment - load .env from .gemini folder
-        env = os.environ.copy()
-        dotenv_vars = self._load_dotenv()
-        env.update(dotenv_vars)
-        
-        logger.info(f"Running gemini from: {self.project_root}")
-        logger.info(f"Using gemini executable: {gemini_exec}")
-        if "GEMINI_SYSTEM_MD" in env:
-            logger.info(f"System prompt: {env['GEMINI_SYSTEM_MD']}")
-        
-        # Explicitly disable node-pty / console attachment features
-        env["NODE_SKIP_PLATFORM_CHECK"] = "1"
-
         try:
-            # Run in headless mode with Pro model
-            cmd = [
-                gemini_exec,
-                "--model", self.MODEL,
-                "--yolo",  # Auto-approve all tool calls (required for non-interactive)
-                "-p", user_prompt,  # Headless mode with user prompt
-            ]
-            logger.info(f"Command: {cmd[0]} --model {self.MODEL} --yolo -p '<prompt of {len(user_prompt)} chars>'")
-            
-            # Use Popen to stream output to console in real-time
-            process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,  # Capture stderr separately
-                stdin=subprocess.DEVNULL, # Prevent Node from trying to attach to console input
-                text=True, 
-                env=env,
-                encoding='utf-8',
-                cwd=str(self.project_root),
-                bufsize=1, # Line buffered
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-            )
+            logger.info(f"Command: {pool.cmd[0]} --model {self.MODEL} --yolo '<prompt of {len(user_prompt)} chars on stdin>'")
+            spawn_started = time.perf_counter()
+            process = self._start_process(pool, user_prompt)
+            observe_phase("spawn", time.perf_counter() - spawn_started)
+            sent_at = time.monotonic()
             
             full_output = []
+            # (seconds since the prompt was sent, line) per stream, for record_dir
+            transcript = ([], [])
+            # Seconds since the prompt was sent; observed once the readers are done
+            first_byte = []
+            tool_calls = []
             print(f"--- START GEMINI INFERENCE ---")
             print(f"Using prompt file: {prompt_path.name}")
             
             # Create threads to read stdout and stderr concurrently
             def read_stream(stream, is_stderr):
                 for line in stream:
+                    if not is_stderr and not first_byte:
+                        first_byte.append(time.monotonic() - sent_at)
+                    if TOOL_CALL_PATTERN.search(line):
+                        tool_calls.append(time.monotonic() - sent_at)
                     print(line, end='', flush=True)
+                    if self.record_dir:
+                        transcript[is_stderr].append((time.monotonic() - sent_at, line))
                     if not is_stderr:
                         full_output.append(line)
+                        if on_line:
+                            try:
+                                on_line(line)
+                            except Exception as e:
+                                logger.error(f"Output line handler error: {e}")
 
             stdout_thread = threading.Thread(target=read_stream, args=(process.stdout, False))
             stderr_thread = threading.Thread(target=read_stream, args=(process.stderr, True))
             
             stdout_thread.start()
             stderr_thread.start()
-            
-            stdout_thread.join()
-            stderr_thread.join()
-            
+
+            stopped = self._wait(process, timeout, cancel)
+            exited_after = time.monotonic() - sent_at
+
+            stdout_thread.join(timeout=5)
+            stderr_thread.join(timeout=5)
+
+            labels = current_labels()
+            if first_byte:
+                observe_phase("first_byte", first_byte[0], labels)
+            for seconds in tool_calls:
+                observe_phase("tool_call", seconds, labels)
+            if tool_calls:
+                inference_tool_calls.inc(len(tool_calls), **labels)
+            if not stopped:
+                observe_phase("exit", exited_after, labels)
+
             print(f"\n--- END GEMINI INFERENCE ---")
-            
-            process.wait()
+
+            if stopped:
+                logger.error(f"Gemini CLI {stopped} — process tree killed (pid {process.pid})")
+                return f"Error: Gemini CLI {stopped}"
+
             result = "".join(full_output)
             
             logger.info(f"Gemini response length: {len(result)} chars")
+
+            if self.record_dir:
+                self._record(user_prompt, transcript, process.returncode, time.monotonic() - sent_at)
             
             if process.returncode != 0:
                 logger.error(f"Gemini CLI failed with code {process.returncode}")
-                # We return the result anyway as it might contain the error message
-                return result if result else f"Error: Gemini CLI failed with code {process.returncode}"
+                # Keep the output (it might contain the error message) but mark it failed, so
+                # setups streamed from a run that died partway are withdrawn
+                error = f"Error: Gemini CLI failed with code {process.returncode}"
+                return f"{result.rstrip()}\n{error}" if result else error
                 
             return result
             
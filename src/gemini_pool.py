@@ -0,0 +1,140 @@
+"""
+Warm Gemini CLI process pool.
+Keeps pre-started `gemini` processes on standby so Node startup, settings
+loading and auth happen before a job arrives. A standby process blocks reading
+its prompt from stdin; the CLI answers one prompt and exits, so every process
+serves a single job and a replacement is started as soon as one is taken.
+"""
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Standby processes older than this are recycled (auth tokens / MCP sessions may go stale)
+MAX_IDLE_SECONDS = 600
+
+
+def kill_process_tree(proc: subprocess.Popen):
+    """Kill a gemini process and everything it started (the CLI runs node and MCP servers)."""
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                           capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Process tree kill failed for pid {proc.pid} ({e}) — killing process only")
+    if proc.poll() is None:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+class GeminiProcessPool:
+    """
+    Hands out started processes for `cmd`. With size 0 every acquire() is a cold spawn.
+    Processes have stdin/stdout/stderr pipes in text mode; write the prompt to stdin and close it.
+    """
+
+    def __init__(self, cmd: List[str], env: Optional[Dict[str, str]] = None, cwd: Optional[str] = None,
+                 size: int = 1, max_idle_seconds: float = MAX_IDLE_SECONDS):
+        self.cmd = list(cmd)
+        self.env = env
+        self.cwd = cwd
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: Deque[Tuple[subprocess.Popen, float]] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.warm_hits = 0
+        self.cold_spawns = 0
+        self.discarded = 0
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            env=self.env,
+            cwd=self.cwd,
+            bufsize=1,  # Line buffered
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
+            # Own process group so kill_process_tree() also reaches node / MCP children
+            start_new_session=os.name != 'nt',
+        )
+
+    def _usable(self, proc: subprocess.Popen, spawned_at: float) -> bool:
+        return proc.poll() is None and time.monotonic() - spawned_at < self.max_idle_seconds
+
+    def fill(self):
+        """Recycle dead or stale standby processes and start new ones until `size` are idle."""
+        with self._lock:
+            for entry in [e for e in self._idle if not self._usable(*e)]:
+                self._idle.remove(entry)
+                self.discarded += 1
+                self._discard(entry[0])
+            while not self._closed and len(self._idle) < self.size:
+                try:
+                    self._idle.append((self._spawn(), time.monotonic()))
+                except OSError as e:
+                    logger.error(f"Failed to start standby gemini process: {e}")
+                    break
+
+    def acquire(self) -> Tuple[subprocess.Popen, bool]:
+        """
+        Take a warm process if one is alive and fresh, else spawn one cold.
+        Returns (process, warm). The taken standby is replaced immediately so it
+        warms up while the current job runs.
+        """
+        proc = None
+        with self._lock:
+            while self._idle:
+                candidate, spawned_at = self._idle.popleft()
+                if self._usable(candidate, spawned_at):
+                    proc = candidate
+                    self.warm_hits += 1
+                    break
+                self.discarded += 1
+                self._discard(candidate)
+
+        warm = proc is not None
+        if not warm:
+            proc = self._spawn()
+            with self._lock:
+                self.cold_spawns += 1
+        self.fill()
+        return proc, warm
+
+    def _discard(self, proc: subprocess.Popen):
+        """Kill a standby; the caller counts it in `discarded` under self._lock."""
+        kill_process_tree(proc)
+        try:
+            proc.communicate(timeout=5)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "warm_hits": self.warm_hits,
+                    "cold_spawns": self.cold_spawns, "discarded": self.discarded}
+
+    def close(self):
+        """Kill all standby processes."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self.discarded += len(idle)
+        for proc, _ in idle:
+            self._discard(proc)
@@ -0,0 +1,176 @@
+"""
+Deadline-bounded and hedged inference calls.
+Tracks a rolling latency window per strategy. When hedging is enabled and a
+call runs past the strategy's rolling p90, a second speculative call is
+started; whichever attempt wins first is kept and the other is cancelled once
+the winner has finished. A call that fails is not retried.
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 300.0
+DEFAULT_HEDGE_QUANTILE = 0.9
+# Samples needed before a strategy's quantile is trusted for hedging
+MIN_SAMPLES = 5
+LATENCY_WINDOW = 50
+
+
+@dataclass
+class CallPolicy:
+    """How inference calls are bounded. timeout 0/None = no deadline."""
+    timeout: Optional[float] = DEFAULT_TIMEOUT_SECONDS
+    hedging: bool = False
+    hedge_quantile: float = DEFAULT_HEDGE_QUANTILE
+
+
+class LatencyTracker:
+    """Rolling per-strategy latency samples (seconds)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, strategy: str, seconds: float):
+        with self._lock:
+            self._samples[strategy].append(seconds)
+
+    def quantile(self, strategy: str, q: float, min_samples: int = MIN_SAMPLES) -> Optional[float]:
+        """Nearest-rank quantile, or None with fewer than min_samples samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(strategy, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        idx = min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))
+        return samples[idx]
+
+    def stats(self) -> dict:
+        with self._lock:
+            strategies = list(self._samples)
+        out = {}
+        for strategy in strategies:
+            out[strategy] = {
+                "samples": len(self._samples[strategy]),
+                "p50": self.quantile(strategy, 0.5, min_samples=1),
+                "p90": self.quantile(strategy, 0.9, min_samples=1),
+            }
+        return out
+
+
+class Attempt:
+    """One run of a hedged call. Attempts poll `cancel` and may claim the win early."""
+
+    def __init__(self, call: "HedgedCall", index: int):
+        self.index = index
+        self.cancel = threading.Event()
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.result = None
+        self._call = call
+
+    @property
+    def hedge(self) -> bool:
+        return self.index > 0
+
+    def claim(self) -> bool:
+        """Make this attempt the winner (e.g. once it has streamed output). False if another won."""
+        return self._call._claim(self)
+
+    @property
+    def failed(self) -> bool:
+        return self.finished is not None and self._call._failed(self.result)
+
+
+class HedgedCall:
+    """
+    Runs fn(attempt) and, if it hasn't finished after `hedge_after` seconds, a second
+    fn(attempt) in parallel. The winner is the first attempt to claim() or to finish
+    without error. The other attempt keeps running until the winner finishes: it is
+    cancelled if the winner succeeds, and its result is used instead if the winner
+    fails. A primary that fails before the hedge point is returned as is (hedging
+    bounds tail latency; it is not a retry). If every attempt errors, the last error
+    is returned.
+    """
+
+    def __init__(self, fn: Callable[[Attempt], object], hedge_after: Optional[float] = None,
+                 is_error: Callable[[object], bool] = lambda result: False):
+        self.fn = fn
+        self.hedge_after = hedge_after
+        self.is_error = is_error
+        self.attempts: List[Attempt] = []
+        self.winner: Optional[Attempt] = None
+        self._cond = threading.Condition()
+
+    def _claim(self, attempt: Attempt) -> bool:
+        with self._cond:
+            if self.winner is None:
+                self.winner = attempt
+                self._cond.notify_all()
+            return self.winner is attempt
+
+    def _cancel_others(self, attempt: Attempt):
+        with self._cond:
+            for other in self.attempts:
+                if other is not attempt:
+                    other.cancel.set()
+
+    def _start(self):
+        attempt = Attempt(self, len(self.attempts))
+        self.attempts.append(attempt)
+        # Run in a copy of the caller's context so its metric labels (src.metrics) carry over
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run, attempt), daemon=True,
+                         name=f"inference-attempt-{attempt.index}").start()
+
+    def _run(self, attempt: Attempt):
+        try:
+            result = self.fn(attempt)
+        except Exception as e:
+            result = e
+        with self._cond:
+            attempt.result = result
+            attempt.finished = time.monotonic()
+            self._cond.notify_all()
+        if not self._failed(result) and attempt.claim():
+            self._cancel_others(attempt)
+
+    def _failed(self, result) -> bool:
+        return isinstance(result, Exception) or self.is_error(result)
+
+    def run(self) -> Attempt:
+        """Block until there is a result. Returns the attempt whose result to use."""
+        with self._cond:
+            self._start()
+            started = time.monotonic()
+            while True:
+                winner = self.winner
+                if winner is not None and winner.finished is not None and not winner.failed:
+                    return winner
+                if all(a.finished is not None for a in self.attempts):
+                    # The winner failed after claiming (or nothing won): use another attempt that succeeded
+                    succeeded = [a for a in self.attempts if not a.failed]
+                    if succeeded:
+                        return succeeded[0]
+                    return max(self.attempts, key=lambda a: a.finished)
+
+                timeout = None
+                if self.winner is None and self.hedge_after is not None and len(self.attempts) == 1:
+                    remaining = started + self.hedge_after - time.monotonic()
+                    if remaining <= 0:
+                        logger.info(f"Inference passed hedge threshold ({self.hedge_after:.1f}s) — starting hedge call")
+                        self._start()
+                        continue
+                    timeout = remaining
+                self._cond.wait(timeout)
+
+
+# Global singletons
+latency_tracker = LatencyTracker()
+call_policy = CallPolicy()
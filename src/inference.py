@@ -1,16 +1,27 @@
 """
 Inference orchestration.
-Handles running inference, cooldown enforcement, and result parsing.
+Defines inference jobs, cooldown rules, and the single code path that runs a job
+and parses its result. Jobs are scheduled by src.executor.
 """
 import json
 import logging
 import re
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import List, Optional, Set
 
+from src.clock import clock
 from src.state import app_state, NY_TZ
 from src.market import is_market_open
-from src.models import LLMResponse
+from src.models import LLMResponse, TradeSetup
+from src.stream_parser import SetupStreamParser
+from src.inference_cache import inference_cache, market_fingerprint
+from src.trendlines import trendline_cache
+from src.hedging import Attempt, HedgedCall, call_policy, latency_tracker
+from src.market_context import MODE_PREFETCHED, MODE_TOOL, adapt_prompt, build_market_context, context_stats
+from src.metrics import inference_labels, observe_phase, phase, reason_label
 
 logger = logging.getLogger(__name__)
 
@@ -18,93 +29,357 @@ logger = logging.getLogger(__name__)
 INFERENCE_COOLDOWN_SECONDS = 180  # 3 minutes
 
 
-def is_cooldown_active() -> bool:
-    """Returns True if an inference completed less than INFERENCE_COOLDOWN_SECONDS ago."""
+# Prompt file per strategy (None = GeminiClient default prompt)
+STRATEGY_PROMPTS = {
+    "main": None,
+    "alt": "prompts/user-prompt-alt.md",
+}
+
+# Pseudo-strategy that runs every entry of STRATEGY_PROMPTS in parallel
+ALL_STRATEGIES = "all"
+
+ERROR_PATTERNS = ["Error", "critical error", "ModelNotFoundError", "fetch failed", "Exception"]
+
+
+class JobPriority(IntEnum):
+    """Lower value runs first."""
+    MANUAL = 0
+    TRIGGER = 1
+    SCHEDULED = 2
+
+
+@dataclass
+class InferenceJob:
+    """A pending inference request. Duplicate requests are merged into one job."""
+    priority: JobPriority
+    strategy: str = "main"
+    reasons: List[str] = field(default_factory=list)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+    def merge(self, other: "InferenceJob"):
+        """Fold another request into this one, keeping the highest priority and all reasons."""
+        self.priority = min(self.priority, other.priority)
+        self.submitted_at = min(self.submitted_at, other.submitted_at)
+        for reason in other.reasons:
+            if reason not in self.reasons:
+                self.reasons.append(reason)
+
+    def to_dict(self) -> dict:
+        return {
+            "priority": self.priority.name.lower(),
+            "strategy": self.strategy,
+            "reasons": list(self.reasons),
+        }
+
+
+@dataclass
+class StrategyResult:
+    """Outcome of one strategy's CLI call within a job."""
+    strategy: str
+    raw: Optional[str] = None
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+    # Setup ids already added to TradeManager while the output was streaming
+    streamed: Set[str] = field(default_factory=set)
+    first_setup_after: Optional[float] = None
+    # A speculative second call was started
+    hedged: bool = False
+
+    def unstreamed_setups(self) -> List[TradeSetup]:
+        """Setups from the final parse that streaming did not already deliver."""
+        return [s for s in self.response.setups if s.id not in self.streamed] if self.response else []
+
+    def to_dict(self) -> dict:
+        return {
+            "status": "error" if self.error else "complete",
+            "duration_seconds": round(self.duration, 2),
+            "first_setup_seconds": round(self.first_setup_after, 2) if self.first_setup_after is not None else None,
+            "setups": len(self.response.setups) if self.response else len(self.streamed),
+            "hedged": self.hedged,
+            "error": self.error,
+        }
+
+
+def job_strategies(strategy: str) -> List[str]:
+    """Strategies a job runs: all configured ones for ALL_STRATEGIES, else just its own."""
+    return list(STRATEGY_PROMPTS) if strategy == ALL_STRATEGIES else [strategy]
+
+
+def cooldown_remaining() -> float:
+    """Seconds left until the global cooldown expires (0 if inactive)."""
     last_completed = app_state.inference.completed_at
     if not last_completed:
-        return False
-    elapsed = (datetime.now(NY_TZ) - last_completed).total_seconds()
-    return elapsed < INFERENCE_COOLDOWN_SECONDS
+        return 0.0
+    elapsed = (clock.now(NY_TZ) - last_completed).total_seconds()
+    if elapsed < 0:
+        # Completed "in the future": the clock was swapped (see src.simulate), so it doesn't apply
+        return 0.0
+    return max(0.0, INFERENCE_COOLDOWN_SECONDS - elapsed)
 
 
-def run_inference(client, reason: str = None):
+def is_cooldown_active() -> bool:
+    """Returns True if an inference completed less than INFERENCE_COOLDOWN_SECONDS ago."""
+    return cooldown_remaining() > 0
+
+
+def run_inference(client, job: InferenceJob):
     """
-    Execute an inference cycle.
-    
-    Args:
-        client: GeminiClient instance.
-        reason: If provided, this is an event-driven trigger (bypasses scheduled interval check).
-                If None, the call is treated as a scheduled auto-inference.
+    Execute a single inference job. Called only from the executor worker thread,
+    which guarantees one inference at a time and applies priority and cooldown.
+
+    Manual jobs always run. Scheduled and trigger jobs are skipped when the daemon
+    is stopped, the market is closed, or the market fingerprint matches a recent run.
     """
-    if not app_state.is_running:
-        return
+    manual = job.priority == JobPriority.MANUAL
+    reason = "; ".join(job.reasons) if job.reasons else None
 
-    # Scheduled auto-inference respects the configured interval
-    if not reason:
-        interval = app_state.get_auto_inference_interval()
-        if interval <= 0:
+    if not manual:
+        if not app_state.is_running:
             return
 
-    if not is_market_open():
-        if reason:
-            logger.info(f"Ignored trigger '{reason}' — market closed.")
-        else:
-            app_state.update_output(f"Waiting for market open... (Last check: {time.strftime('%H:%M:%S')})")
-        return
-
-    if app_state.is_inference_running():
-        logger.info(f"Inference already running. Skipping {'trigger' if reason else 'auto-inference'}.")
-        return
+        if not is_market_open():
+            if reason:
+                logger.info(f"Ignored trigger '{reason}' — market closed.")
+            else:
+                app_state.update_output(f"Waiting for market open... (Last check: {clock.now(NY_TZ).strftime('%H:%M:%S')})")
+            return
 
-    if is_cooldown_active():
-        elapsed = (datetime.now(NY_TZ) - app_state.inference.completed_at).total_seconds()
-        logger.info(f"Skipping inference (cooldown: {elapsed:.0f}s < {INFERENCE_COOLDOWN_SECONDS}s)")
-        return
+        cached = inference_cache.get(current_fingerprint(job.strategy))
+        if cached:
+            logger.info(f"Skipped {job.priority.name.lower()} inference ({job.strategy}) — market unchanged "
+                        f"since the run at {cached.completed_at} (cache hit)")
+            return
 
     # Build context
-    now = datetime.now()
+    now = clock.now(NY_TZ)
     price_str = f"{app_state.last_price:.2f}" if app_state.last_price else "Unknown"
     context = f"Current Time: {now.strftime('%H:%M')}\nCurrent Price: {price_str}"
     if reason:
         context += f"\nTRIGGER: {reason}"
         logger.info(f"Inference triggered: {reason}")
 
-    app_state.start_inference(context=context)
-    logger.info(f"Starting inference — {context.replace(chr(10), ', ')}")
+    strategies = job_strategies(job.strategy)
+    logger.info(f"Starting {job.priority.name.lower()} inference ({job.strategy}) — {context.replace(chr(10), ', ')}")
 
-    result = client.run_inference(context_header=context)
+    # Pre-fetched mode: inject the market state so the model needs no tool round trip
+    mode = MODE_TOOL
+    if app_state.get_context_mode() == MODE_PREFETCHED:
+        market_state = build_market_context(app_state.last_price)
+        if market_state:
+            context += f"\n\n{market_state}"
+            mode = MODE_PREFETCHED
+        else:
+            logger.info("No cached market data yet — falling back to get_market_state tool")
+    app_state.start_inference(context=context, strategy=job.strategy)
 
-    # Detect errors in CLI output
-    error_patterns = ["Error", "critical error", "ModelNotFoundError", "fetch failed", "Exception"]
-    if any(p in result for p in error_patterns):
-        app_state.fail_inference(result)
-        logger.error(f"Inference failed: {result[:500]}...")
-        return
+    trigger = reason_label(job.reasons, job.priority.name.lower())
+    with inference_labels(job.strategy, trigger):
+        if len(strategies) == 1:
+            display_result = _finish_single(_run_strategy(client, strategies[0], context, mode=mode, trigger=trigger))
+        else:
+            # Each strategy is its own CLI process, so wall-clock time is the slowest strategy
+            with ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="strategy") as pool:
+                results = list(pool.map(lambda s: _run_strategy(client, s, context, namespace=True, mode=mode,
+                                                                trigger=trigger), strategies))
+            display_result = _finish_merged(results)
 
-    app_state.complete_inference(result)
-    app_state.update_output(result)
-    _parse_inference_result(result)
-    logger.info("Inference completed successfully")
+    # Keyed on the state after this run's setups were added, which is what the next run will see
+    if display_result is not None:
+        inference_cache.put(current_fingerprint(job.strategy), display_result)
 
 
-def _parse_inference_result(result: str):
-    """Extract JSON from LLM output and update trade manager."""
+def current_fingerprint(strategy: str) -> str:
+    """Fingerprint of the live market state for `strategy` (see src.inference_cache)."""
+    price = app_state.last_price
+    relations = trendline_cache.relations(price) if price else []
+    return market_fingerprint(strategy, price, relations, app_state.trade_manager.get_active_setups())
+
+
+def _run_strategy(client, strategy: str, context: str, namespace: bool = False,
+                  mode: str = MODE_TOOL, trigger: str = "manual") -> StrategyResult:
+    """
+    Run one strategy's prompt and parse its setups, tagging each with the strategy.
+    With namespace=True setup ids are prefixed "<strategy>:" so parallel strategies can't collide.
+    In MODE_PREFETCHED the prompt's get_market_state instructions are rewritten to
+    point at the market state in `context`.
+
+    Setups are handed to TradeManager as soon as each one is complete in the streamed
+    output; the final parse only contributes setups the stream parser missed. If the
+    call then fails (error output, non-zero exit, timeout), the streamed setups are
+    withdrawn again.
+
+    Each CLI call is bounded by call_policy.timeout. With hedging on, a second call is
+    started once the first passes the strategy's rolling latency quantile (see src.hedging).
+
+    Phase timings are labelled with the strategy and `trigger` (see src.metrics).
+    """
+    with inference_labels(strategy, trigger):
+        return _call_strategy(client, strategy, context, namespace, mode, trigger)
+
+
+def _call_strategy(client, strategy: str, context: str, namespace: bool, mode: str, trigger: str) -> StrategyResult:
+    result = StrategyResult(strategy=strategy)
+    labels = {"strategy": strategy, "reason": trigger}
+    app_state.update_strategy(strategy, status="running")
+    started = time.monotonic()
+
+    prompt_chars = []
+
+    def prepare_prompt(prompt: str) -> str:
+        if mode == MODE_PREFETCHED:
+            prompt = adapt_prompt(prompt)
+        prompt_chars.append(len(context) + len(prompt))
+        return prompt
+
+    def call(attempt: Optional[Attempt] = None) -> str:
+        def on_setup(setup: TradeSetup):
+            # With hedging, only the attempt that streams first feeds TradeManager
+            if attempt is not None and not attempt.claim():
+                return
+            _tag(setup, strategy, namespace)
+            if result.first_setup_after is None:
+                result.first_setup_after = time.monotonic() - started
+            result.streamed.add(setup.id)
+            # On the CLI's reader thread, outside the labelled context
+            add_started = time.perf_counter()
+            app_state.trade_manager.add_setups([setup])
+            observe_phase("add_setups", time.perf_counter() - add_started, labels)
+
+        parser = SetupStreamParser(on_setup)
+        return client.run_inference(context_header=context, prompt_path=STRATEGY_PROMPTS.get(strategy),
+                                    on_line=parser.feed, prompt_transform=prepare_prompt,
+                                    timeout=call_policy.timeout or None,
+                                    cancel=attempt.cancel if attempt else None)
+
+    hedge_after = latency_tracker.quantile(strategy, call_policy.hedge_quantile) if call_policy.hedging else None
+    call_duration = None
     try:
-        # Try ```json ... ``` block first
-        json_match = re.search(r"```json\s*(.*?)```", result, re.DOTALL)
-        if json_match:
-            clean_json = json_match.group(1).strip()
+        if hedge_after is None:
+            result.raw = call()
         else:
-            # Fallback: find outermost { ... }
-            start = result.find("{")
-            end = result.rfind("}") + 1
-            if start != -1 and end > start:
-                clean_json = result[start:end]
-            else:
-                clean_json = result.replace("```json", "").replace("```", "").strip()
+            hedged = HedgedCall(call, hedge_after=hedge_after, is_error=_is_error_output)
+            winner = hedged.run()
+            result.hedged = len(hedged.attempts) > 1
+            if hedged.winner is not None and winner is not hedged.winner:
+                # The attempt that streamed failed; the fallback's setups come from its final parse
+                _withdraw_streamed(result, "its streaming attempt")
+                result.first_setup_after = None
+            if isinstance(winner.result, Exception):
+                raise winner.result
+            result.raw = winner.result
+            call_duration = winner.finished - winner.started
+    except Exception as e:
+        result.error = str(e)
+        logger.error(f"Inference exception ({strategy}): {e}")
+    else:
+        # Detect errors in CLI output
+        if _is_error_output(result.raw):
+            result.error = result.raw
+            logger.error(f"Inference failed ({strategy}): {result.raw[:500]}...")
+        else:
+            result.response = _parse_response(result.raw)
+            for setup in result.response.setups if result.response else []:
+                _tag(setup, strategy, namespace)
+    if result.error:
+        _withdraw_streamed(result, strategy)
+    result.duration = time.monotonic() - started
+    if not result.error:
+        # Per-attempt latency, so a hedge win doesn't inflate the threshold
+        latency_tracker.record(strategy, call_duration or result.duration)
+        if prompt_chars:
+            context_stats.record(mode, prompt_chars[0], result.duration, result.first_setup_after)
+    app_state.update_strategy(strategy, mode=mode, **result.to_dict())
+    logger.info(f"Strategy {strategy} finished in {result.duration:.1f}s "
+                f"({len(result.streamed)} setups streamed)")
+    return result
+
 
-        data = json.loads(clean_json)
-        response = LLMResponse(**data)
-        app_state.trade_manager.add_setups(response.setups)
+def _withdraw_streamed(result: StrategyResult, failed: str):
+    if not result.streamed:
+        return
+    withdrawn = app_state.trade_manager.remove_setups(sorted(result.streamed))
+    logger.warning(f"Withdrew {len(withdrawn)}/{len(result.streamed)} streamed setups after {failed} failed")
+    result.streamed.clear()
+
+
+def _is_error_output(raw: str) -> bool:
+    return any(p in raw for p in ERROR_PATTERNS)
+
+
+def _tag(setup: TradeSetup, strategy: str, namespace: bool):
+    setup.strategy = strategy
+    if namespace:
+        setup.id = f"{strategy}:{setup.id}"
+
+
+def _finish_single(result: StrategyResult) -> Optional[str]:
+    """Publish one strategy's result. Returns the displayed result, or None on failure."""
+    if result.error:
+        app_state.fail_inference(result.error)
+        return None
+
+    clean_json = _extract_json(result.raw)
+    display_result = clean_json if clean_json else result.raw
+    app_state.complete_inference(display_result)
+    app_state.update_output(display_result)
+    with phase("add_setups"):
+        app_state.trade_manager.add_setups(result.unstreamed_setups())
+    logger.info("Inference completed successfully")
+    return display_result
+
+
+def _finish_merged(results: List[StrategyResult]) -> Optional[str]:
+    """Merge parallel strategy results; the job fails only if every strategy failed."""
+    succeeded = [r for r in results if not r.error]
+    if not succeeded:
+        app_state.fail_inference("\n".join(f"[{r.strategy}] {r.error}" for r in results))
+        return None
+
+    setups = [setup for r in succeeded if r.response for setup in r.response.setups]
+    overview = "\n".join(f"[{r.strategy}] {r.response.market_overview}"
+                         for r in succeeded if r.response and r.response.market_overview)
+    merged = {
+        "inference_time": next((r.response.inference_time for r in succeeded if r.response and r.response.inference_time), None),
+        "inference_price": next((r.response.inference_price for r in succeeded if r.response and r.response.inference_price), None),
+        "market_overview": overview or None,
+        "setups": [s.model_dump(mode="json") for s in setups],
+    }
+    display_result = json.dumps(merged, indent=2)
+    app_state.complete_inference(display_result)
+    app_state.update_output(display_result)
+    with phase("add_setups"):
+        app_state.trade_manager.add_setups([s for r in succeeded for s in r.unstreamed_setups()])
+    logger.info(f"Merged {len(setups)} setups from {len(succeeded)}/{len(results)} strategies")
+    return display_result
+
+
+def _extract_json(result: str) -> str:
+    """Pull the JSON payload out of raw LLM output."""
+    # Try ```json ... ``` block first
+    json_match = re.search(r"```json\s*(.*?)```", result, re.DOTALL)
+    if json_match:
+        return json_match.group(1).strip()
+
+    # Fallback: find outermost { ... }
+    start = result.find("{")
+    end = result.rfind("}") + 1
+    if start != -1 and end > start:
+        return result[start:end]
+    return result.replace("```json", "").replace("```", "").strip()
+
+
+def _parse_response(result: str) -> Optional[LLMResponse]:
+    """Extract JSON from LLM output and validate it (None if it doesn't parse)."""
+    try:
+        started = time.perf_counter()
+        data = json.loads(_extract_json(result))
+        parsed = time.perf_counter()
+        observe_phase("json_extraction", parsed - started)
+        try:
+            return LLMResponse(**data)
+        finally:
+            observe_phase("validation", time.perf_counter() - parsed)
     except Exception as e:
         logger.error(f"Failed to parse inference JSON: {e}")
+        return None
@@ -0,0 +1,138 @@
+"""
+Market-state fingerprint cache.
+Scheduled and trigger inferences are skipped when the inputs that matter
+(price bucket, trendlines in proximity, session phase and open setups) are
+unchanged since a recent run. Entries expire after a TTL and the least
+recently used entry is evicted when the cache is full.
+"""
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, time as dtime
+from typing import Iterable, Optional
+
+from src.clock import clock
+from src.market import NY_TZ
+from src.models import TradeSetup, TradeStatus
+from src.trendlines import PriceRelation
+
+logger = logging.getLogger(__name__)
+
+# Price granularity of the fingerprint, in index points
+PRICE_BUCKET = 2.0
+
+DEFAULT_TTL_SECONDS = 900
+DEFAULT_MAX_ENTRIES = 64
+
+# Session phases (ET start times); the last phase starting at or before now applies
+SESSION_PHASES = (
+    (dtime(0, 0), "pre"),
+    (dtime(9, 30), "open"),
+    (dtime(10, 0), "morning"),
+    (dtime(11, 30), "midday"),
+    (dtime(14, 0), "afternoon"),
+    (dtime(15, 30), "close"),
+    (dtime(16, 0), "post"),
+)
+
+# Setups in these states no longer affect what the model should say
+_FINISHED = {TradeStatus.PROFIT, TradeStatus.STOP_LOSS, TradeStatus.CANCELED}
+
+
+def session_phase(now: Optional[datetime] = None) -> str:
+    t = (now or clock.now(NY_TZ)).astimezone(NY_TZ).time()
+    phase = SESSION_PHASES[0][1]
+    for start, name in SESSION_PHASES:
+        if t >= start:
+            phase = name
+    return phase
+
+
+def market_fingerprint(strategy: str, price: Optional[float], relations: Iterable[PriceRelation],
+                       setups: Iterable[TradeSetup], now: Optional[datetime] = None) -> str:
+    """Stable hash of the inference inputs that matter."""
+    bucket = math.floor(price / PRICE_BUCKET) if price else None
+    lines = sorted((r.timeframe, r.line.type, math.floor(r.line_price / PRICE_BUCKET), r.proximity)
+                   for r in relations)
+    open_setups = sorted((s.direction, s.entry.price, s.status.value)
+                         for s in setups if s.status not in _FINISHED)
+    key = repr((strategy, bucket, lines, session_phase(now), open_setups))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    result: str
+    created_at: float  # clock.monotonic()
+    completed_at: str  # wall clock, for display
+
+
+class InferenceCache:
+    """Thread-safe TTL + LRU map from market fingerprint to inference result."""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, ttl_seconds: float, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """A TTL of 0 disables the cache."""
+        with self._lock:
+            self.ttl_seconds = ttl_seconds
+            self.max_entries = max_entries
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Fresh entry for `key` (counted as a hit) or None (a miss)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and clock.monotonic() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key: str, result: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = CacheEntry(result=result, created_at=clock.monotonic(),
+                                            completed_at=clock.now(NY_TZ).strftime("%H:%M:%S"))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+# Global singleton
+inference_cache = InferenceCache()
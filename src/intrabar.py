@@ -0,0 +1,190 @@
+"""
+Intrabar path evaluation.
+Turns 1-minute OHLC bars into an ordered price path and replays that path through
+the TradeManager state machine, vectorized over path points x setups. Wicks that
+touch entry, stop or target between polls are no longer missed.
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+from src.models import TradeSetup, TradeStatus
+from src.market import bar_time
+from src.setup_book import CLOSE_THRESHOLD, best_target
+
+# Intrabar ordering policies — the order in which high and low are assumed to print
+ORDER_OHLC = "ohlc"        # open, high, low, close
+ORDER_OLHC = "olhc"        # open, low, high, close
+ORDER_NEAREST = "nearest"  # open, extreme nearest the open, other extreme, close
+ORDERS = (ORDER_OHLC, ORDER_OLHC, ORDER_NEAREST)
+DEFAULT_ORDER = ORDER_NEAREST
+
+# Integer status codes used by the vectorized kernels
+STATUS_CODES = {
+    TradeStatus.NEW: 0,
+    TradeStatus.MONITORING: 1,
+    TradeStatus.CLOSE_TO_ENTRY: 2,
+    TradeStatus.TRADING: 3,
+    TradeStatus.PROFIT: 4,
+    TradeStatus.STOP_LOSS: 5,
+    TradeStatus.CANCELED: 6,
+}
+CODE_STATUS = {code: status for status, code in STATUS_CODES.items()}
+NEW, MONITORING, CLOSE_TO_ENTRY, TRADING, PROFIT, STOP_LOSS, CANCELED = range(7)
+
+
+def high_first(opens, highs, lows, order: str = DEFAULT_ORDER) -> np.ndarray:
+    """Boolean per bar: True if the high is assumed to print before the low."""
+    opens = np.asarray(opens, dtype=float)
+    if order == ORDER_OHLC:
+        return np.ones(opens.shape, dtype=bool)
+    if order == ORDER_OLHC:
+        return np.zeros(opens.shape, dtype=bool)
+    if order == ORDER_NEAREST:
+        return (np.asarray(highs, dtype=float) - opens) <= (opens - np.asarray(lows, dtype=float))
+    raise ValueError(f"Unknown intrabar order '{order}' (expected one of {', '.join(ORDERS)})")
+
+
+def bar_points(opens, highs, lows, closes, order: str = DEFAULT_ORDER) -> np.ndarray:
+    """Ordered intrabar price points, shape (n_bars, 4)."""
+    opens = np.asarray(opens, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    hf = high_first(opens, highs, lows, order)
+    return np.stack([
+        opens,
+        np.where(hf, highs, lows),
+        np.where(hf, lows, highs),
+        np.asarray(closes, dtype=float),
+    ], axis=1)
+
+
+def setup_arrays(setups: Sequence[TradeSetup]):
+    """Column arrays (status, is_long, entry, stop, target) for the vectorized kernels."""
+    status = np.array([STATUS_CODES[s.status] for s in setups], dtype=np.int8)
+    is_long = np.array([s.direction == "LONG" for s in setups], dtype=bool)
+    entry = np.array([s.entry.price for s in setups], dtype=float)
+    stop = np.array([s.stop_loss.price for s in setups], dtype=float)
+    targets = [best_target(s) for s in setups]
+    target = np.array([np.nan if t is None else t for t in targets], dtype=float)
+    return status, is_long, entry, stop, target
+
+
+def _first_true(mask: np.ndarray):
+    """Index of the first True per column and whether any exists."""
+    return mask.argmax(axis=0), mask.any(axis=0)
+
+
+def evaluate_path(prices, status, is_long, entry, stop, target) -> np.ndarray:
+    """
+    Replay a price path through the setup state machine for many setups at once.
+    Equivalent to calling TradeManager._check_setup for each price in order.
+
+    Args:
+        prices: 1-D price path.
+        status, is_long, entry, stop, target: per-setup arrays (see setup_arrays).
+            target is the first target to be reached (NaN if none).
+
+    Returns:
+        New status codes, one per setup.
+    """
+    prices = np.asarray(prices, dtype=float)
+    status = np.asarray(status)
+    result = status.copy()
+    if prices.size == 0 or status.size == 0:
+        return result
+
+    p = prices[:, None]
+    rows = np.arange(prices.size)[:, None]
+
+    fill_hit = np.where(is_long, p <= entry, p >= entry)
+    stop_hit = np.where(is_long, p <= stop, p >= stop)
+    # NaN target compares False, so setups without targets never reach PROFIT
+    target_hit = np.where(is_long, p >= target, p <= target)
+
+    pending = status <= CLOSE_TO_ENTRY
+    trading = status == TRADING
+
+    fill_idx, filled = _first_true(fill_hit)
+    filled &= pending
+
+    # Exits are searched from the fill point onward (inclusive) — a fill and an exit
+    # can happen on the same price, exactly as in _check_setup
+    start = np.where(trading, 0, fill_idx)
+    exit_mask = (stop_hit | target_hit) & (rows >= start)
+    exit_idx, exited = _first_true(exit_mask)
+    exited &= trading | filled
+
+    # Targets are checked after the stop in _check_setup, so a target hit wins
+    cols = np.arange(status.size)
+    exit_profit = target_hit[exit_idx, cols]
+
+    # Unfilled setups settle on MONITORING / CLOSE_TO_ENTRY according to the last price
+    near_last = np.abs(prices[-1] - entry) <= CLOSE_THRESHOLD
+    result[pending] = np.where(near_last, CLOSE_TO_ENTRY, MONITORING)[pending]
+    result[filled] = TRADING
+    result[exited] = np.where(exit_profit, PROFIT, STOP_LOSS)[exited]
+    return result
+
+
+class BarReplayer:
+    """
+    Converts successive bar fetches into the price path not yet evaluated.
+    A bar that is still forming is re-fetched every poll; only its new extremes
+    and latest close are replayed on later polls.
+    """
+
+    def __init__(self, order: str = DEFAULT_ORDER):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown intrabar order '{order}' (expected one of {', '.join(ORDERS)})")
+        self.order = order
+        self._last_time = None
+        self._high = None
+        self._low = None
+
+    def reset(self):
+        """Forget replayed bars; the next call starts again from the latest close."""
+        self._last_time = None
+        self._high = None
+        self._low = None
+
+    def path(self, bars: List[dict]) -> np.ndarray:
+        """Price points since the previous call, in replay order."""
+        if not bars:
+            return np.empty(0)
+        bars = sorted(bars, key=bar_time)
+
+        # First call: nothing has been evaluated yet, so start from the latest close
+        if self._last_time is None:
+            last = bars[-1]
+            self._remember(last)
+            return np.array([float(last["close"])])
+
+        points: List[float] = []
+        for bar in bars:
+            t = bar_time(bar)
+            if t < self._last_time:
+                continue
+            o, h, l, c = (float(bar[k]) for k in ("open", "high", "low", "close"))
+            if t == self._last_time:
+                # Forming bar: only prices outside what was already replayed are new
+                extremes = []
+                if h > self._high:
+                    extremes.append(h)
+                if l < self._low:
+                    extremes.append(l)
+                if len(extremes) == 2 and not high_first([o], [h], [l], self.order)[0]:
+                    extremes.reverse()
+                points.extend(extremes)
+                points.append(c)
+                self._high = max(self._high, h)
+                self._low = min(self._low, l)
+            else:
+                points.extend(bar_points([o], [h], [l], [c], self.order)[0])
+                self._remember(bar)
+        return np.array(points)
+
+    def _remember(self, bar: dict):
+        self._last_time = bar_time(bar)
+        self._high = float(bar["high"])
+        self._low = float(bar["low"])
@@ -0,0 +1,231 @@
+"""
+Durable setup and inference journal.
+Setup creations, status transitions, prunes and inference results are appended
+to a SQLite database in WAL mode. Callers only enqueue a row; a writer thread
+commits them in batches. Every SNAPSHOT_EVERY rows (and on close) the writer
+also stores a snapshot of the whole book, so a restart rebuilds the active
+setups from the latest snapshot plus the journal tail.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.models import TradeSetup, TradeStatus
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_BATCH = 500
+# Journal rows between book snapshots
+SNAPSHOT_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    setup_id TEXT,
+    status TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS journal_setup ON journal (setup_id);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    last_seq INTEGER NOT NULL,
+    setups TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class Restored:
+    """What open() recovered from disk."""
+    setups: List[TradeSetup] = field(default_factory=list)
+    inference: Optional[dict] = None  # last inference record ("ts" = completion time)
+    replayed: int = 0                 # journal rows applied on top of the snapshot
+    seconds: float = 0.0
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class Journal:
+    """Append-only journal. record_* calls are no-ops until open()."""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, snapshot_every: int = SNAPSHOT_EVERY):
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.path: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot_source: Optional[Callable[[], List[TradeSetup]]] = None
+        self.rows_written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._thread is not None
+
+    def open(self, path: str, snapshot_source: Optional[Callable[[], List[TradeSetup]]] = None) -> Restored:
+        """Recover the saved state, then start the writer. snapshot_source returns the current book."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._snapshot_source = snapshot_source
+        restored = self.restore()
+        self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+        self._thread.start()
+        return restored
+
+    # ---- hot path -------------------------------------------------------
+
+    def on_setup_change(self, kind: str, setup: TradeSetup):
+        """TradeManager listener."""
+        if not self.is_open:
+            return
+        if kind == "status":
+            # Transitions only carry the new status; the full setup was journaled when added
+            self._queue.put((time.time(), kind, setup.id, setup.status.value, None))
+        else:
+            self._queue.put((time.time(), kind, setup.id, setup.status.value, setup.model_dump_json()))
+
+    def record_inference(self, status: str, result: Optional[str], error: Optional[str], strategy: Optional[str]):
+        if not self.is_open:
+            return
+        payload = json.dumps({"result": result, "error": error, "strategy": strategy})
+        self._queue.put((time.time(), "inference", None, status, payload))
+
+    # ---- writer thread --------------------------------------------------
+
+    def _writer(self):
+        conn = _connect(self.path)
+        since_snapshot = 0
+        running = True
+        while running:
+            rows, waiters = [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if not running or len(rows) >= MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany("INSERT INTO journal (ts, kind, setup_id, status, payload) "
+                                         "VALUES (?, ?, ?, ?, ?)", rows)
+                    self.rows_written += len(rows)
+                    self.batches += 1
+                    since_snapshot += len(rows)
+                if since_snapshot and (since_snapshot >= self.snapshot_every or not running):
+                    self._write_snapshot(conn)
+                    since_snapshot = 0
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                logger.error(f"Journal write failed ({len(rows)} rows dropped): {e}")
+            except Exception:
+                # A bad row or snapshot must not kill the writer: every later enqueue would pile up unwritten
+                self.write_errors += 1
+                logger.exception(f"Journal writer error ({len(rows)} rows in batch)")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _write_snapshot(self, conn: sqlite3.Connection):
+        if self._snapshot_source is None:
+            return
+        # Rows still queued may already be reflected in the book; replaying them is idempotent
+        last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM journal").fetchone()[0]
+        setups = [json.loads(s.model_dump_json()) for s in self._snapshot_source()]
+        with conn:
+            conn.execute("INSERT INTO snapshots (ts, last_seq, setups) VALUES (?, ?, ?)",
+                         (time.time(), last_seq, json.dumps(setups)))
+            conn.execute("DELETE FROM snapshots WHERE id < (SELECT MAX(id) FROM snapshots)")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything recorded so far is committed."""
+        if not self.is_open:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Commit pending rows, write a final snapshot and stop the writer."""
+        if not self.is_open:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    # ---- recovery -------------------------------------------------------
+
+    def restore(self, path: Optional[str] = None) -> Restored:
+        """Rebuild the book from the latest snapshot plus the journal rows after it."""
+        started = time.perf_counter()
+        restored = Restored()
+        conn = _connect(path or self.path)
+        try:
+            setups: Dict[str, TradeSetup] = {}
+            last_seq = 0
+            snapshot = conn.execute("SELECT last_seq, setups FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+            if snapshot:
+                last_seq = snapshot[0]
+                for raw in json.loads(snapshot[1]):
+                    setup = TradeSetup.model_validate(raw)
+                    setups[setup.id] = setup
+
+            rows = conn.execute("SELECT ts, kind, setup_id, status, payload FROM journal WHERE seq > ? ORDER BY seq",
+                                (last_seq,))
+            for ts, kind, setup_id, status, payload in rows:
+                restored.replayed += 1
+                if kind == "added":
+                    setups[setup_id] = TradeSetup.model_validate_json(payload)
+                elif kind == "status" and setup_id in setups:
+                    setups[setup_id].status = TradeStatus(status)
+                elif kind == "removed":
+                    setups.pop(setup_id, None)
+
+            last = conn.execute("SELECT ts, status, payload FROM journal WHERE kind = 'inference' "
+                                "ORDER BY seq DESC LIMIT 1").fetchone()
+            if last:
+                restored.inference = {"ts": last[0], "status": last[1], **json.loads(last[2])}
+        finally:
+            conn.close()
+        restored.setups = list(setups.values())
+        restored.seconds = time.perf_counter() - started
+        return restored
+
+    def stats(self) -> dict:
+        return {"path": self.path, "open": self.is_open, "pending": self._queue.qsize(),
+                "rows_written": self.rows_written, "batches": self.batches, "write_errors": self.write_errors}
+
+
+# Global singleton
+journal = Journal()
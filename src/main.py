@@ -3,87 +3,218 @@ Trading Daemon — Entry Point
 Wires together config, web server, and the main daemon loop.
 """
 import json
-import time
 import threading
 import logging
 import sys
 import os
+from typing import Optional
 
 # Add project root to sys.path to allow running as script from any directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.clock import clock
+from src.market import DEFAULT_DATA_SERVICE_URL, set_data_service_url
 from src.state import app_state
-from src.market import fetch_current_price
+from src.bar_store import bar_store
+from src.intrabar import BarReplayer, DEFAULT_ORDER
 from src.config import setup_gemini_config
 from src.gemini_client import GeminiClient
-from src.web_server import run_web_server, set_gemini_client
-from src.inference import run_inference
+from src.web_server import DEFAULT_WEB_THREADS, WEB_SERVER_MODES, run_web_server, set_gemini_client
+from src.inference import JobPriority
+from src.executor import inference_executor
 from src.triggers import check_trendline_proximity
+from src.price_stream import PriceStream
+from src.market_context import CONTEXT_MODES, MODE_TOOL
+from src.inference_cache import DEFAULT_TTL_SECONDS, inference_cache
+from src.hedging import DEFAULT_HEDGE_QUANTILE, DEFAULT_TIMEOUT_SECONDS, call_policy
+from src.journal import journal
+from src.trade_manager import DEFAULT_MAX_AGE_MINUTES
+from src.scheduler import OVERRUN_DELAY, Job, Scheduler, scheduler
+from src.trendlines import DEFAULT_AT_DISTANCE, DEFAULT_NEAR_DISTANCE, set_proximity_thresholds, trendline_cache
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("daemon.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("Main")
 
 
+def setup_logging(log_file: Optional[str] = "daemon.log"):
+    """Configure root logging for the daemon (console, plus `log_file` unless None)."""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
 def load_config():
     try:
         with open("app_config.json", "r") as f:
             config = json.load(f)
             app_state.set_interval(config.get("interval_seconds", 120))
+            set_data_service_url(config.get("data_service_url", DEFAULT_DATA_SERVICE_URL))
+            mode = config.get("context_mode", MODE_TOOL)
+            if mode not in CONTEXT_MODES:
+                logger.warning(f"Unknown context_mode '{mode}', using '{MODE_TOOL}'")
+                mode = MODE_TOOL
+            app_state.set_context_mode(mode)
+            inference_cache.configure(config.get("inference_cache_ttl_seconds", DEFAULT_TTL_SECONDS))
+            call_policy.timeout = config.get("inference_timeout_seconds", DEFAULT_TIMEOUT_SECONDS)
+            call_policy.hedging = config.get("inference_hedging", False)
+            call_policy.hedge_quantile = config.get("hedge_quantile", DEFAULT_HEDGE_QUANTILE)
+            app_state.trade_manager.set_expiry_policy(config.get("setup_max_age_minutes", DEFAULT_MAX_AGE_MINUTES),
+                                                      config.get("setup_status_ttl_minutes"))
+            set_proximity_thresholds(config.get("trendline_at_distance", DEFAULT_AT_DISTANCE),
+                                     config.get("trendline_near_distance", DEFAULT_NEAR_DISTANCE))
             return config
     except Exception as e:
         logger.error(f"Failed to load config: {e}")
         return {"interval_seconds": 120, "mcp_url": "http://localhost:8000/mcp/"}
 
 
-def daemon_loop(client: GeminiClient):
+DEFAULT_JOURNAL_PATH = "data/journal.db"
+
+
+def open_journal(path: str):
+    """Rebuild the setup book and last inference result from the journal, then keep journaling."""
+    restored = journal.open(path, snapshot_source=app_state.trade_manager.get_active_setups)
+    app_state.trade_manager.restore(restored.setups)
+    app_state.touch()
+    if restored.inference:
+        app_state.restore_inference(restored.inference)
+    app_state.trade_manager.add_listener(journal.on_setup_change)
+    logger.info(f"Journal {path}: restored {len(restored.setups)} setups "
+                f"({restored.replayed} rows replayed) in {restored.seconds * 1000:.0f}ms")
+
+
+# Most 1-minute bars fetched per intrabar evaluation (caps catch-up after a stall)
+MAX_REPLAY_BARS = 60
+
+# While streaming, bars are reconciled with data-service this often
+STREAM_BAR_REFRESH_SECONDS = 60
+
+# Price poll cadence (config "poll_interval_seconds")
+DEFAULT_POLL_SECONDS = 5.0
+
+PRUNE_INTERVAL_SECONDS = 5.0
+
+
+def on_stream_price(price: float, timestamp: float = None):
+    """Handles one streamed price update on the price-stream thread."""
+    if not app_state.is_running or price <= 0:
+        return
+    app_state.set_price(price)
+    bar_store.apply_tick(price, timestamp)
+    app_state.trade_manager.update_setups(price)
+    check_trendline_proximity(price)
+
+
+def build_jobs(config: dict = None, sched: Scheduler = scheduler) -> Scheduler:
     """
-    Continuous loop that manages automatic tasks.
-    Orchestrates scheduled inference, event-driven triggers, and price monitoring.
+    Registers the daemon's recurring work on the scheduler, each on its own cadence.
+    Inference runs on the executor thread, so no job ever blocks on the model.
+
+    Jobs:
+        "monitor"        — price evaluation every poll_interval_seconds (see below).
+        "prune"          — drops expired setups.
+        "trendlines"     — refreshes cached trendline geometry just after each bar close.
+        "auto_inference" — submits a SCHEDULED job every auto-inference interval
+                           (re-read when it changes; 0 disables).
+
+    With config "market_hours_enabled" the trendline and auto-inference jobs sleep from
+    the close to the next open. The monitor and prune jobs keep running (open setups still
+    get price updates and expire) unless "monitor_market_hours_only" is also set.
+
+    Price evaluation mode (config "price_evaluation"):
+        "close"    — evaluate setups against the last 1-minute close only.
+        "intrabar" — replay the OHLC path of the bars since the last evaluation,
+                     ordered by config "intrabar_order" (see src.intrabar.ORDERS).
+
+    Price feed (config "price_feed"):
+        "poll"   — evaluate on the monitor job's poll only.
+        "stream" — evaluate every update pushed over data-service's SSE stream
+                   (see on_stream_price); polling resumes while the stream is down.
     """
-    last_auto_run = time.time()
-    last_trendline_check = 0.0
-
-    while True:
-        try:
-            now = time.time()
-
-            # 1. Scheduled Auto-Inference
-            interval = app_state.get_auto_inference_interval()
-            if (app_state.is_running
-                    and interval > 0
-                    and now - last_auto_run >= interval):
-                run_inference(client)
-                last_auto_run = time.time()
-
-            # 2. Trendline Proximity Trigger (every 15s)
-            if app_state.is_running and now - last_trendline_check >= 15:
-                check_trendline_proximity(client)
-                last_trendline_check = time.time()
-
-            # 3. Price monitoring & setup management (every loop iteration)
-            if app_state.is_running:
-                price = fetch_current_price()
+    config = config or {}
+    intrabar_mode = config.get("price_evaluation", "close") == "intrabar"
+    replayer = BarReplayer(config.get("intrabar_order", DEFAULT_ORDER)) if intrabar_mode else None
+    market_hours = config.get("market_hours_enabled", True)
+    monitor_market_hours = market_hours and config.get("monitor_market_hours_only", False)
+    last_evaluation = 0.0
+    last_bar_refresh = 0.0
+
+    stream = None
+    if config.get("price_feed", "poll") == "stream":
+        stream = PriceStream(on_price=on_stream_price)
+        stream.start()
+
+    def monitor():
+        nonlocal last_evaluation, last_bar_refresh
+        if not app_state.is_running:
+            return
+        now = clock.time()
+        app_state.record_monitor_tick()
+        if stream and stream.is_connected:
+            # Prices are evaluated as they arrive; only reconcile bars here
+            if now - last_bar_refresh >= STREAM_BAR_REFRESH_SECONDS:
+                bar_store.refresh()
+                last_bar_refresh = now
+            if replayer:
+                # Bars seen while streaming must not be replayed once polling resumes
+                replayer.reset()
+                last_evaluation = now
+        else:
+            # Incremental fetch into the local bar cache; everything else reads from it
+            bar_store.refresh()
+            last_bar_refresh = now
+            if replayer:
+                # Enough 1-minute bars to cover the time since the last evaluation
+                count = min(MAX_REPLAY_BARS, int((now - last_evaluation) // 60) + 2)
+                path = replayer.path(bar_store.recent_bars(count=count))
+                if path.size:
+                    last_evaluation = now
+                    app_state.set_price(float(path[-1]))
+                    app_state.trade_manager.update_setups_path(path)
+                    check_trendline_proximity(app_state.last_price)
+            else:
+                price = bar_store.latest_close()
                 if price > 0:
-                    app_state.last_price = price
+                    app_state.set_price(price)
                     app_state.trade_manager.update_setups(price)
-                    app_state.trade_manager.prune_backlog()
+                    check_trendline_proximity(price)
+
+    def prune():
+        if app_state.is_running:
+            app_state.trade_manager.prune_backlog()
+
+    def trendlines():
+        if app_state.is_running:
+            trendline_cache.refresh_if_due()
 
-            time.sleep(5)
+    def auto_inference():
+        if app_state.is_running:
+            inference_executor.submit(JobPriority.SCHEDULED)
 
-        except Exception as e:
-            logger.error(f"Loop error: {e}")
-            time.sleep(5)
+    poll_interval = config.get("poll_interval_seconds", DEFAULT_POLL_SECONDS)
+    sched.add(Job("monitor", monitor, poll_interval, market_hours=monitor_market_hours,
+                  on_park=app_state.reset_monitor_tick))
+    sched.add(Job("prune", prune, PRUNE_INTERVAL_SECONDS, market_hours=monitor_market_hours))
+    sched.add(Job("trendlines", trendlines, trendline_cache.seconds_until_refresh,
+                  overrun=OVERRUN_DELAY, market_hours=market_hours))
+    # First run one interval after startup
+    sched.add(Job("auto_inference", auto_inference, app_state.get_auto_inference_interval,
+                  jitter=config.get("auto_inference_jitter_seconds", 0.0), market_hours=market_hours),
+              delay=None)
+    return sched
+
+
+def daemon_loop(config: dict = None):
+    """Runs the daemon's jobs (see build_jobs) on the calling thread until stopped."""
+    build_jobs(config).run()
 
 
 def main():
+    setup_logging()
     logger.info("Starting Trading Daemon...")
 
     # 1. Load Config
@@ -92,12 +223,26 @@ def main():
     # 2. Setup Gemini CLI Config
     setup_gemini_config(config.get("mcp_url", "http://localhost:8000/mcp/"))
 
+    # Recover setups from the previous run ("journal_path": "" disables the journal)
+    journal_path = config.get("journal_path", DEFAULT_JOURNAL_PATH)
+    if journal_path:
+        open_journal(journal_path)
+
     # 3. Initialize Client (system prompt via GEMINI_SYSTEM_MD env var in .gemini/.env)
-    client = GeminiClient(user_prompt_path="prompts/user-prompt.md")
+    client = GeminiClient(user_prompt_path="prompts/user-prompt.md",
+                          pool_size=config.get("gemini_pool_size", 0),
+                          record_dir=config.get("gemini_record_dir") or None)
+    client.start_pool()
     set_gemini_client(client)
 
     # 4. Start Web Server in separate thread
-    web_thread = threading.Thread(target=run_web_server, kwargs={'port': 8001}, daemon=True)
+    web_mode = config.get("web_server", "dev")
+    if web_mode not in WEB_SERVER_MODES:
+        logger.warning(f"Unknown web_server '{web_mode}', using 'dev'")
+        web_mode = "dev"
+    web_thread = threading.Thread(target=run_web_server, name="web-server", daemon=True,
+                                  kwargs={'port': 8001, 'mode': web_mode,
+                                          'threads': config.get("web_threads", DEFAULT_WEB_THREADS)})
     web_thread.start()
     logger.info("Web server started on port 8001")
 
@@ -105,9 +250,13 @@ def main():
     app_state.set_running(True)
 
     try:
-        daemon_loop(client)
+        daemon_loop(config)
     except KeyboardInterrupt:
         logger.info("Stopping daemon...")
+    finally:
+        scheduler.stop()
+        client.close()
+        journal.close()
 
 
 if __name__ == "__main__":
@@ -3,19 +3,28 @@ Market data access layer.
 Centralises all communication with the data-service API.
 """
 import logging
-from datetime import datetime, time
+import time as _time
+from datetime import datetime, time, timedelta
+from typing import Optional, Sequence
 import pytz
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from src.clock import clock
+from src.metrics import data_service_request_seconds
+
 logger = logging.getLogger(__name__)
 
 NY_TZ = pytz.timezone('America/New_York')
 MARKET_OPEN = time(9, 30)
 MARKET_CLOSE = time(16, 0)
 
-DATA_SERVICE_BASE = "http://localhost:8000"
+DEFAULT_DATA_SERVICE_URL = "http://localhost:8000"
+DATA_SERVICE_BASE = DEFAULT_DATA_SERVICE_URL
+
+# Field names data-service may use for the bar open time
+BAR_TIME_KEYS = ("timestamp", "time", "datetime")
 
 # Configure a session with retries and connection pooling
 _session = requests.Session()
@@ -23,39 +32,96 @@ retries = Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 50
 _session.mount('http://', HTTPAdapter(max_retries=retries))
 
 
+def set_data_service_url(url: str):
+    """Point every data-service call (bars, trendlines, price stream) at `url`."""
+    global DATA_SERVICE_BASE
+    DATA_SERVICE_BASE = url.rstrip("/")
+
+
 def is_market_open() -> bool:
     """Checks if the current NY time is within market hours (9:30 - 16:00 ET, Mon-Fri)."""
-    now_ny = datetime.now(NY_TZ)
+    now_ny = clock.now(NY_TZ)
     if now_ny.weekday() > 4:
         return False
     return MARKET_OPEN <= now_ny.time() <= MARKET_CLOSE
 
 
-def fetch_current_price(ticker: str = "@ES") -> float:
-    """Fetches the latest close price from data-service."""
+def seconds_until_market_open(now: Optional[datetime] = None) -> float:
+    """Seconds until the next regular session opens (0 while the market is open)."""
+    now_ny = (now or clock.now(NY_TZ)).astimezone(NY_TZ)
+    if now_ny.weekday() <= 4 and MARKET_OPEN <= now_ny.time() <= MARKET_CLOSE:
+        return 0.0
+    day = now_ny.date()
+    if now_ny.time() > MARKET_OPEN:
+        day += timedelta(days=1)
+    while day.weekday() > 4:
+        day += timedelta(days=1)
+    next_open = NY_TZ.localize(datetime.combine(day, MARKET_OPEN))
+    return (next_open - now_ny).total_seconds()
+
+
+def bar_time(bar: dict) -> float:
+    """Bar open time as epoch seconds. Accepts epoch seconds/milliseconds or ISO-8601 strings."""
+    for key in BAR_TIME_KEYS:
+        value = bar.get(key)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            # Treat 13-digit values as milliseconds
+            return value / 1000.0 if value > 1e11 else float(value)
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if ts.tzinfo is None:
+            ts = NY_TZ.localize(ts)
+        return ts.timestamp()
+    raise KeyError(f"Bar has no time field ({', '.join(BAR_TIME_KEYS)})")
+
+
+def fetch_bars(ticker: str = "@ES", timeframe: int = 1, bars_back: int = 1) -> list:
+    """Fetches the most recent OHLC bars from data-service (oldest first)."""
+    started = _time.perf_counter()
+    outcome = "error"
     try:
         url = f"{DATA_SERVICE_BASE}/bars/{ticker}"
-        params = {"timeframe": 1, "bars_back": 1}
+        params = {"timeframe": timeframe, "bars_back": bars_back}
         
         response = _session.get(url, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
-        if data and isinstance(data, list) and len(data) > 0:
-            return float(data[-1]['close'])
+        outcome = "ok"
+        if data and isinstance(data, list):
+            return data
     except Exception as e:
-        logger.debug(f"Failed to fetch price: {e}")
+        logger.debug(f"Failed to fetch bars: {e}")
+    finally:
+        data_service_request_seconds.observe(_time.perf_counter() - started, endpoint="bars", outcome=outcome)
+    return []
+
+
+def fetch_current_price(ticker: str = "@ES") -> float:
+    """Fetches the latest close price from data-service."""
+    bars = fetch_bars(ticker, timeframe=1, bars_back=1)
+    if bars:
+        try:
+            return float(bars[-1]['close'])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.debug(f"Failed to parse price: {e}")
     return 0.0
 
 
-def fetch_trendlines(ticker: str = "@ES", timeframe: int = 5) -> dict:
-    """Fetches trendlines and price relations from data-service."""
+def fetch_trendlines(ticker: str = "@ES", timeframe: int = 5, timeframes: Optional[Sequence[int]] = None) -> dict:
+    """
+    Fetches trendlines and price relations from data-service.
+    Pass `timeframes` to get several timeframes in one request (keyed "<n>min" in the response).
+    """
+    started = _time.perf_counter()
+    outcome = "error"
     try:
         url = f"{DATA_SERVICE_BASE}/trendlines"
         payload = {
             "ticker": ticker,
             "bars_back": 200,
-            "timeframes": [timeframe],
+            "timeframes": list(timeframes) if timeframes else [timeframe],
             "only_final": False,
         }
         
@@ -65,7 +131,11 @@ def fetch_trendlines(ticker: str = "@ES", timeframe: int = 5) -> dict:
         response = _session.post(url, json=payload, timeout=5)
         response.raise_for_status()
         
-        return response.json()
+        data = response.json()
+        outcome = "ok"
+        return data
     except Exception as e:
         logger.debug(f"Failed to fetch trendlines: {e}")
         return {}
+    finally:
+        data_service_request_seconds.observe(_time.perf_counter() - started, endpoint="trendlines", outcome=outcome)
@@ -0,0 +1,169 @@
+"""
+Pre-fetched market context.
+Builds a compact text snapshot of the market from the local bar cache and
+trendline cache, so the model can answer in a single turn instead of calling
+the get_market_state MCP tool. Also keeps prompt-size and latency statistics
+per context mode so the two modes can be compared.
+"""
+import re
+import statistics
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from src.bar_store import BarStore, bar_store
+from src.market import NY_TZ, MARKET_OPEN
+from src.trendlines import TrendlineCache, proximity_of, trendline_cache
+
+# Context modes (config "context_mode")
+MODE_TOOL = "tool"              # the model calls get_market_state itself
+MODE_PREFETCHED = "prefetched"  # the daemon injects the market state into the prompt
+CONTEXT_MODES = (MODE_TOOL, MODE_PREFETCHED)
+
+# Bars shown per timeframe and trendlines listed
+BARS_SHOWN = {5: 12, 15: 8}
+MAX_TRENDLINES = 8
+SESSION_BARS = 390  # 1-minute bars in a regular session
+
+# Inference samples kept per mode for stats
+STATS_WINDOW = 50
+
+_TOOL_LINE = re.compile(r"^\s*Call `get_market_state`\.?\s*$", re.MULTILINE)
+
+
+def _num(x: float) -> str:
+    """Shortest faithful rendering of a price (ES ticks are 0.25)."""
+    return f"{round(float(x), 2):g}"
+
+
+def resample(t: np.ndarray, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray, minutes: int):
+    """Aggregate 1-minute bars into `minutes` bars aligned to the clock. Returns (t, o, h, l, c)."""
+    if not len(t):
+        return t, o, h, l, c
+    keys = (t // (minutes * 60)).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    return (keys[starts] * minutes * 60.0, o[starts], np.maximum.reduceat(h, starts),
+            np.minimum.reduceat(l, starts), c[ends])
+
+
+def ema(values: np.ndarray, period: int) -> float:
+    if not len(values):
+        return float("nan")
+    alpha = 2.0 / (period + 1)
+    value = float(values[0])
+    for v in values[1:]:
+        value += alpha * (float(v) - value)
+    return value
+
+
+def _clock(ts: float) -> str:
+    return datetime.fromtimestamp(ts, NY_TZ).strftime("%H:%M")
+
+
+def build_market_context(price: Optional[float] = None, ticker: str = "@ES",
+                         store: BarStore = bar_store, cache: TrendlineCache = trendline_cache,
+                         now: Optional[float] = None) -> str:
+    """
+    Compact market state: session stats, EMAs, recent 5m/15m bars and nearby trendlines.
+    Returns "" when no bars are cached yet (callers then fall back to the tool).
+    """
+    bars = store.recent_bars(ticker=ticker, count=SESSION_BARS)
+    if not bars:
+        return ""
+    t, o, h, l, c, v = (np.array([b[k] for b in bars], dtype=float)
+                        for k in ("timestamp", "open", "high", "low", "close", "volume"))
+    price = price or float(c[-1])
+    now = now if now is not None else float(t[-1]) + 60
+
+    # Regular session so far (falls back to everything cached before the open)
+    today_open = datetime.fromtimestamp(t[-1], NY_TZ).replace(
+        hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0).timestamp()
+    session = t >= today_open
+    if not session.any():
+        session = np.ones_like(t, dtype=bool)
+    typical = (h + l + c) / 3
+    vol = v[session]
+    vwap = float((typical[session] * vol).sum() / vol.sum()) if vol.sum() > 0 else float(typical[session].mean())
+
+    lines = [
+        f"MARKET STATE {ticker} (pre-fetched by the daemon; it replaces get_market_state, do not call tools)",
+        f"time={_clock(now)}ET px={_num(price)}",
+        f"session: open={_num(o[session][0])} high={_num(h[session].max())} low={_num(l[session].min())} vwap={_num(vwap)}",
+    ]
+
+    for minutes, shown in BARS_SHOWN.items():
+        rt, ro, rh, rl, rc = resample(t, o, h, l, c, minutes)
+        e9, e21 = ema(rc, 9), ema(rc, 21)
+        trend = "up" if e9 > e21 else "down" if e9 < e21 else "flat"
+        lines.append(f"{minutes}m ema9={_num(e9)} ema21={_num(e21)} trend={trend}")
+        lines.append(f"{minutes}m bars time,o,h,l,c (oldest first):")
+        lines.extend(",".join([_clock(rt[i])] + [_num(x[i]) for x in (ro, rh, rl, rc)])
+                     for i in range(max(0, len(rt) - shown), len(rt)))
+
+    # Cached geometry only: the scheduler's "trendlines" job is the one refresher
+    rows = []
+    for tf in cache.timeframes:
+        for line in cache.lines(tf):
+            level = line.price_at(now, tf)
+            dist = price - level
+            rows.append((abs(dist), f"{tf},{line.type},{_num(level)},{_num(line.slope)},{line.touch_count},"
+                                    f"{round(line.score, 2):g},{_num(dist)},{proximity_of(dist) or 'far'}"))
+    if rows:
+        lines.append("trendlines tf,type,price_now,slope_per_bar,touch_count,score,distance,proximity:")
+        lines.extend(row for _, row in sorted(rows)[:MAX_TRENDLINES])
+    else:
+        lines.append("trendlines: none")
+    return "\n".join(lines)
+
+
+def adapt_prompt(prompt: str) -> str:
+    """Point a tool-mode user prompt at the injected market state instead of get_market_state."""
+    prompt = _TOOL_LINE.sub("Use the MARKET STATE above; answer in one turn without tool calls.", prompt)
+    return prompt.replace("using the `get_market_state` tool", "using the MARKET STATE above")
+
+
+class ContextStats:
+    """Rolling prompt-size and latency samples per context mode."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self._samples: Dict[str, Deque[dict]] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, prompt_chars: int, duration: float, first_setup_after: Optional[float] = None):
+        with self._lock:
+            self._samples[mode].append({"prompt_chars": prompt_chars, "duration": duration,
+                                        "first_setup": first_setup_after})
+
+    def summary(self) -> dict:
+        """Median prompt size and latency per mode, plus prefetched-minus-tool deltas."""
+        with self._lock:
+            samples = {mode: list(s) for mode, s in self._samples.items()}
+
+        def median(values: List[Optional[float]]) -> Optional[float]:
+            values = [x for x in values if x is not None]
+            return round(statistics.median(values), 2) if values else None
+
+        out = {}
+        for mode, rows in samples.items():
+            out[mode] = {
+                "runs": len(rows),
+                "prompt_chars": median([r["prompt_chars"] for r in rows]),
+                "approx_prompt_tokens": median([r["prompt_chars"] / 4 for r in rows]),
+                "duration_seconds": median([r["duration"] for r in rows]),
+                "first_setup_seconds": median([r["first_setup"] for r in rows]),
+            }
+        if MODE_TOOL in out and MODE_PREFETCHED in out:
+            out["delta"] = {
+                key: round(out[MODE_PREFETCHED][key] - out[MODE_TOOL][key], 2)
+                for key in ("prompt_chars", "duration_seconds", "first_setup_seconds")
+                if out[MODE_PREFETCHED][key] is not None and out[MODE_TOOL][key] is not None
+            }
+        return out
+
+
+# Global singleton
+context_stats = ContextStats()
@@ -0,0 +1,206 @@
+"""
+Prometheus metrics.
+Histograms and counters for inference phases, scheduler jobs and data-service
+requests, rendered in the Prometheus text format on /metrics. Dependency-free;
+every observation is a few dict operations under a lock.
+
+Inference phase timings are labelled by strategy and trigger reason. The
+labels of the inference running on the current thread are bound with
+inference_labels(), so code deep in the call (GeminiClient, parsing) records
+phases without being passed them.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Inference phases span milliseconds (parsing) to minutes (the CLI)
+INFERENCE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+JOB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.labels):
+                return tuple([str(labels[n]) for n in self.labels])
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [f"{self.name}{_label_text(self.labels, key)} {_format_value(v)}"
+                                   for key, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = INFERENCE_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # first bucket with value <= bound
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = super().render()
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+# Global singleton
+registry = Registry()
+
+inference_phase_seconds = registry.register(Histogram(
+    "inference_phase_seconds", "Time spent in each phase of an inference call.",
+    ("phase", "strategy", "reason"), INFERENCE_BUCKETS))
+inference_tool_calls = registry.register(Counter(
+    "inference_tool_calls_total", "MCP tool calls seen in the CLI output.", ("strategy", "reason")))
+job_duration_seconds = registry.register(Histogram(
+    "daemon_job_duration_seconds", "Run time of each scheduler job (the monitor job is the price loop).",
+    ("job",), JOB_BUCKETS))
+data_service_request_seconds = registry.register(Histogram(
+    "data_service_request_seconds", "Latency of data-service requests, retries included.",
+    ("endpoint", "outcome"), HTTP_BUCKETS))
+
+
+_UNLABELLED = {"strategy": "none", "reason": "none"}
+_inference_labels: ContextVar[Dict[str, str]] = ContextVar("inference_labels", default=_UNLABELLED)
+
+
+def reason_label(reasons: Sequence[str], priority: str) -> str:
+    """
+    Low-cardinality trigger reason: the first reason's prefix ("Price near Trendline: ..."
+    becomes "price_near_trendline"), or the job priority when there is no reason.
+    """
+    if not reasons:
+        return priority
+    head = reasons[0].split(":", 1)[0]
+    return re.sub(r"[^a-z0-9]+", "_", head.lower()).strip("_") or priority
+
+
+def current_labels() -> Dict[str, str]:
+    return dict(_inference_labels.get())
+
+
+@contextmanager
+def inference_labels(strategy: str, reason: str) -> Iterator[None]:
+    """Label the phases recorded on this thread (and contexts copied from it) until exit."""
+    token = _inference_labels.set({"strategy": strategy, "reason": reason})
+    try:
+        yield
+    finally:
+        _inference_labels.reset(token)
+
+
+def observe_phase(phase: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+    inference_phase_seconds.observe(seconds, phase=phase, **(labels or _inference_labels.get()))
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(name, time.perf_counter() - start)
@@ -4,6 +4,8 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 import pytz
 
+from src.clock import clock
+
 NY_TZ = pytz.timezone('America/New_York')
 
 class TradeStatus(str, Enum):
@@ -33,7 +35,7 @@ class TradeSetup(BaseModel):
     symbol: str = "@ES"
     direction: Literal["LONG", "SHORT"]
     status: TradeStatus = TradeStatus.NEW
-    created_at: datetime = Field(default_factory=lambda: datetime.now(NY_TZ))
+    created_at: datetime = Field(default_factory=lambda: clock.now(NY_TZ))
     
     entry: EntryRule
     stop_loss: StopLossRule
@@ -41,6 +43,7 @@ class TradeSetup(BaseModel):
     
     rules_text: str = Field(..., description="Condensed human readable rules")
     reasoning: Optional[str] = None
+    strategy: Optional[str] = Field(None, description="Strategy (prompt) that produced the setup")
 
 class LLMResponse(BaseModel):
     inference_time: Optional[str] = Field(None, description="Market time when inference was run")
@@ -0,0 +1,152 @@
+"""
+Push-mode price feed.
+Holds one long-lived Server-Sent Events connection to data-service
+(GET /stream/{ticker}) and hands every price update to a callback as it
+arrives. The daemon loop falls back to polling whenever the stream is not
+connected; the stream reconnects on its own with exponential backoff.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import quote
+
+import requests
+
+from src import market
+from src.market import bar_time
+
+logger = logging.getLogger(__name__)
+
+# Server keepalives are expected at least this often; a silent stream is treated as dropped
+READ_TIMEOUT_SECONDS = 15.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Reconnect backoff bounds
+BACKOFF_INITIAL_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+
+def parse_price_event(data: str):
+    """
+    Extract (price, timestamp) from an SSE data payload. Accepts
+    {"price": ..., "timestamp": ...} ticks or data-service bar dicts (close is used).
+    Timestamp is None when the event carries no time.
+    """
+    payload = json.loads(data)
+    if isinstance(payload, (int, float)):
+        return float(payload), None
+    price = payload.get("price", payload.get("last", payload.get("close")))
+    if price is None:
+        raise ValueError("event has no price")
+    try:
+        ts = bar_time(payload)
+    except KeyError:
+        ts = None
+    return float(price), ts
+
+
+class PriceStream:
+    """Background SSE client. Call start() once; on_price(price, timestamp) runs on the stream thread."""
+
+    def __init__(self, on_price: Callable[[float, Optional[float]], None], ticker: str = "@ES",
+                 base_url: Optional[str] = None, read_timeout: float = READ_TIMEOUT_SECONDS,
+                 backoff_initial: float = BACKOFF_INITIAL_SECONDS, backoff_max: float = BACKOFF_MAX_SECONDS):
+        self.on_price = on_price
+        self.ticker = ticker
+        self.base_url = base_url
+        self.read_timeout = read_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_event_at: Optional[float] = None
+        self.events_received = 0
+        self.reconnects = 0
+
+    @property
+    def url(self) -> str:
+        base = self.base_url or market.DATA_SERVICE_BASE
+        return f"{base}/stream/{quote(self.ticker, safe='')}"
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the stream thread to exit. A blocked read ends at the next event or read timeout."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def _run(self):
+        backoff = self.backoff_initial
+        while not self._stop.is_set():
+            try:
+                if self._consume():
+                    backoff = self.backoff_initial
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Price stream dropped: {e}")
+            finally:
+                if self._connected.is_set():
+                    logger.info("Price stream disconnected — falling back to polling")
+                self._connected.clear()
+
+            if self._stop.wait(backoff):
+                break
+            backoff = min(self.backoff_max, backoff * 2)
+            self.reconnects += 1
+
+    def _consume(self) -> bool:
+        """Read one connection until it ends. Returns True if any price event was received."""
+        received = False
+        with requests.get(self.url, stream=True, headers={"Accept": "text/event-stream"},
+                          timeout=(CONNECT_TIMEOUT_SECONDS, self.read_timeout)) as response:
+            response.raise_for_status()
+            self._connected.set()
+            logger.info(f"Price stream connected: {self.url}")
+
+            data_lines = []
+            # chunk_size=None yields each chunk as it arrives instead of waiting for a full buffer
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if self._stop.is_set():
+                    break
+                if line is None:
+                    continue
+                if line == "":
+                    # Blank line ends an event
+                    if data_lines:
+                        received |= self._dispatch("\n".join(data_lines))
+                        data_lines = []
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].lstrip())
+                # Comments (":keepalive") and event/id/retry fields need no handling
+        return received
+
+    def _dispatch(self, data: str) -> bool:
+        try:
+            price, ts = parse_price_event(data)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.debug(f"Ignoring stream event {data!r}: {e}")
+            return False
+        self.last_event_at = time.time()
+        self.events_received += 1
+        try:
+            self.on_price(price, ts)
+        except Exception as e:
+            logger.error(f"Price handler error: {e}")
+        return True
@@ -0,0 +1,244 @@
+"""
+Multi-cadence job scheduler.
+Jobs sit in a heap keyed on their next due time (clock.monotonic()), and a single
+thread sleeps until the earliest one is due, so every job keeps its own cadence
+and a slow run of one job doesn't shift the others. Jobs flagged market_hours are
+parked until the next market open while the market is closed, so the daemon
+sleeps overnight instead of polling.
+"""
+import heapq
+import itertools
+import logging
+import math
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.clock import clock as global_clock
+from src.market import seconds_until_market_open
+from src.metrics import job_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+# What happens to the slots a job misses while a run takes longer than its interval
+OVERRUN_SKIP = "skip"          # fixed rate; missed slots are dropped
+OVERRUN_CATCH_UP = "catch_up"  # fixed rate; missed slots run back to back (at most MAX_CATCH_UP per overrun)
+OVERRUN_DELAY = "delay"        # fixed delay; the next run starts interval after this one finished
+OVERRUN_POLICIES = (OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_DELAY)
+
+MAX_CATCH_UP = 3
+
+# A job whose interval is 0 (disabled) checks again this often
+IDLE_RECHECK_SECONDS = 5.0
+
+# Longest single sleep, so stop() and clock adjustments are noticed
+MAX_SLEEP_SECONDS = 60.0
+
+
+@dataclass
+class Job:
+    name: str
+    fn: Callable[[], None]
+    # Seconds between runs. A callable is read every time the job is rescheduled.
+    interval: Union[float, Callable[[], float]]
+    jitter: float = 0.0  # up to this many seconds are added to each run's start
+    overrun: str = OVERRUN_SKIP
+    market_hours: bool = False
+    on_park: Optional[Callable[[], None]] = None  # called when a market_hours job starts waiting for the open
+
+    slot: float = 0.0  # scheduled start of the current run, before jitter
+    due: float = 0.0
+    runs: int = 0
+    missed: int = 0  # slots skipped because of overruns
+    errors: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    parked: bool = False  # waiting for market open
+    _token: int = field(default=0, repr=False)
+    _catch_up_left: Optional[int] = field(default=None, repr=False)  # back-to-back runs still allowed
+    _anchor: float = field(default=0.0, repr=False)  # where the current interval is counted from
+
+    def current_interval(self) -> float:
+        return float(self.interval() if callable(self.interval) else self.interval)
+
+
+class Scheduler:
+    """Runs jobs on their own cadences from one thread."""
+
+    def __init__(self, clock: Callable[[], float] = global_clock.monotonic,
+                 until_open: Callable[[], float] = seconds_until_market_open,
+                 rng: Optional[random.Random] = None):
+        """
+        Args:
+            clock: Monotonic seconds.
+            until_open: Seconds until the market opens (0 while open); used by market_hours jobs.
+        """
+        self._clock = clock
+        self._until_open = until_open
+        self._rng = rng or random.Random()
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, Job, int]] = []
+        self._jobs: Dict[str, Job] = {}
+        self._seq = itertools.count()
+        self._stopped = False
+
+    def add(self, job: Job, delay: Optional[float] = 0.0) -> Job:
+        """Register a job. delay=None waits one interval before the first run."""
+        if job.overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{job.overrun}'")
+        with self._cond:
+            now = self._clock()
+            if delay is None:
+                delay = job.current_interval()
+                delay = delay if delay > 0 else IDLE_RECHECK_SECONDS
+            self._jobs[job.name] = job
+            job._anchor = now
+            self._push(job, now + delay)
+        return job
+
+    def remove(self, name: str):
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job:
+                job._token += 1  # its heap entry goes stale
+
+    def reschedule(self, name: str):
+        """Re-read a job's interval now (e.g. after it was changed) instead of at its next run."""
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None or job.parked:
+                return
+            now = self._clock()
+            interval = job.current_interval()
+            if interval <= 0:
+                self._push(job, now + IDLE_RECHECK_SECONDS)
+            else:
+                self._push(job, max(now, job._anchor + interval))
+
+    def _push(self, job: Job, slot: float):
+        """Caller holds self._cond."""
+        job._token += 1
+        job.slot = slot
+        job.due = slot + (self._rng.uniform(0, job.jitter) if job.jitter > 0 else 0.0)
+        heapq.heappush(self._heap, (job.due, next(self._seq), job, job._token))
+        self._cond.notify()
+
+    def _pop_due(self, block: bool) -> Optional[Job]:
+        with self._cond:
+            while not self._stopped:
+                # Entries of rescheduled or removed jobs are stale; drop them as they surface
+                while self._heap and self._heap[0][3] != self._heap[0][2]._token:
+                    heapq.heappop(self._heap)
+                wait = self._heap[0][0] - self._clock() if self._heap else MAX_SLEEP_SECONDS
+                if self._heap and wait <= 0:
+                    return heapq.heappop(self._heap)[2]
+                if not block:
+                    return None
+                self._cond.wait(min(wait, MAX_SLEEP_SECONDS))
+            return None
+
+    def _run(self, job: Job):
+        if job.market_hours:
+            until_open = self._until_open()
+            if until_open > 0:
+                with self._cond:
+                    newly_parked = not job.parked
+                    if newly_parked:
+                        logger.info(f"Market closed — '{job.name}' sleeps until the open "
+                                    f"({until_open / 3600:.1f}h)")
+                    job.parked = True
+                    self._push(job, self._clock() + until_open)
+                if newly_parked and job.on_park:
+                    job.on_park()
+                return
+            job.parked = False
+
+        job._anchor = job.slot
+        start = self._clock()
+        try:
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            logger.error(f"Job '{job.name}' failed: {e}")
+        end = self._clock()
+        job.runs += 1
+        job.last_duration = end - start
+        job.max_duration = max(job.max_duration, job.last_duration)
+        job_duration_seconds.observe(job.last_duration, job=job.name)
+
+        with self._cond:
+            if self._jobs.get(job.name) is job:
+                self._push(job, self._next_slot(job, end))
+
+    def _next_slot(self, job: Job, end: float) -> float:
+        try:
+            interval = job.current_interval()
+        except Exception as e:
+            logger.error(f"Job '{job.name}' interval failed: {e}")
+            interval = 0
+        if interval <= 0:
+            return end + IDLE_RECHECK_SECONDS
+        if job.overrun == OVERRUN_DELAY:
+            return end + interval
+
+        slot = job.slot + interval
+        if slot > end:
+            job._catch_up_left = None
+            return slot
+        behind = math.floor((end - slot) / interval) + 1  # slots already in the past
+        skip = behind
+        if job.overrun == OVERRUN_CATCH_UP:
+            if job._catch_up_left is None:
+                job._catch_up_left = MAX_CATCH_UP  # a new overrun
+            if job._catch_up_left > 0:
+                skip = behind - min(behind, job._catch_up_left)
+                job._catch_up_left -= 1
+            else:
+                job._catch_up_left = None
+        if skip:
+            job.missed += skip
+            logger.debug(f"Job '{job.name}' overran: skipped {skip} slot(s)")
+        return slot + skip * interval
+
+    def next_due(self) -> Optional[float]:
+        """Clock time of the earliest scheduled run, or None when no jobs are registered."""
+        with self._cond:
+            return min((job.due for job in self._jobs.values()), default=None)
+
+    def run_pending(self) -> int:
+        """Run every job that is due now without waiting. Returns the number of runs."""
+        count = 0
+        while True:
+            job = self._pop_due(block=False)
+            if job is None:
+                return count
+            self._run(job)
+            count += 1
+
+    def run(self):
+        """Run jobs until stop() is called."""
+        while True:
+            job = self._pop_due(block=True)
+            if job is None:
+                return
+            self._run(job)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._cond:
+            now = self._clock()
+            return {job.name: {"runs": job.runs, "missed": job.missed, "errors": job.errors,
+                               "last_ms": round(job.last_duration * 1000, 1),
+                               "max_ms": round(job.max_duration * 1000, 1),
+                               "next_in": round(max(0.0, job.due - now), 1),
+                               "parked": job.parked}
+                    for job in self._jobs.values()}
+
+
+# Global singleton
+scheduler = Scheduler()
@@ -0,0 +1,152 @@
+"""
+Price-indexed setup book.
+Keeps sorted entry, stop and target levels per direction and status, so a price
+update only visits setups whose levels were crossed or came within CLOSE_THRESHOLD.
+The book only selects candidates — TradeManager._check_setup stays the single
+source of truth for status transitions.
+"""
+import bisect
+import math
+from typing import Dict, List, Optional, Set, Tuple
+from .models import TradeSetup, TradeStatus
+
+# Define "Close" as within ~3 points (12 ticks) for ES
+CLOSE_THRESHOLD = 3.0
+
+# Queries are widened by this much so float rounding can only add candidates, never drop one
+_EPS = 1e-9
+
+_PENDING = (TradeStatus.MONITORING, TradeStatus.CLOSE_TO_ENTRY)
+
+
+class _Levels:
+    """Sorted list of (price, setup_id) keys."""
+
+    def __init__(self):
+        self._keys: List[Tuple[float, str]] = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, price: float, setup_id: str):
+        bisect.insort(self._keys, (price, setup_id))
+
+    def remove(self, price: float, setup_id: str):
+        key = (price, setup_id)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def at_or_above(self, price: float) -> List[str]:
+        i = bisect.bisect_left(self._keys, (price,))
+        return [k[1] for k in self._keys[i:]]
+
+    def at_or_below(self, price: float) -> List[str]:
+        i = bisect.bisect_left(self._keys, (math.nextafter(price, math.inf),))
+        return [k[1] for k in self._keys[:i]]
+
+    def below(self, price: float) -> List[str]:
+        i = bisect.bisect_left(self._keys, (price,))
+        return [k[1] for k in self._keys[:i]]
+
+    def above(self, price: float) -> List[str]:
+        i = bisect.bisect_left(self._keys, (math.nextafter(price, math.inf),))
+        return [k[1] for k in self._keys[i:]]
+
+
+def best_target(setup: TradeSetup) -> Optional[float]:
+    """The target reached first: lowest for LONG, highest for SHORT."""
+    if not setup.targets:
+        return None
+    prices = [t.price for t in setup.targets]
+    return min(prices) if setup.direction == "LONG" else max(prices)
+
+
+class SetupBook:
+    """Price index over the setups of a single symbol. Not thread-safe; guarded by TradeManager._lock."""
+
+    def __init__(self):
+        self._new: Set[str] = set()
+        self._entries: Dict[Tuple[str, TradeStatus], _Levels] = {
+            (d, s): _Levels() for d in ("LONG", "SHORT") for s in _PENDING
+        }
+        self._stops: Dict[str, _Levels] = {"LONG": _Levels(), "SHORT": _Levels()}
+        self._targets: Dict[str, _Levels] = {"LONG": _Levels(), "SHORT": _Levels()}
+        # Keys each setup is indexed under, so removal works even if the setup was mutated since
+        self._indexed: Dict[str, tuple] = {}
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def add(self, setup: TradeSetup):
+        """Index a setup under the levels relevant to its current status."""
+        self.remove(setup.id)
+        d = setup.direction
+        status = setup.status
+        if status == TradeStatus.NEW:
+            self._new.add(setup.id)
+            key = (status, d, None, None, None)
+        elif status in _PENDING:
+            self._entries[(d, status)].add(setup.entry.price, setup.id)
+            key = (status, d, setup.entry.price, None, None)
+        elif status == TradeStatus.TRADING:
+            target = best_target(setup)
+            self._stops[d].add(setup.stop_loss.price, setup.id)
+            if target is not None:
+                self._targets[d].add(target, setup.id)
+            key = (status, d, None, setup.stop_loss.price, target)
+        else:
+            # Terminal states never transition again
+            key = (status, d, None, None, None)
+        self._indexed[setup.id] = key
+
+    def remove(self, setup_id: str):
+        key = self._indexed.pop(setup_id, None)
+        if key is None:
+            return
+        status, d, entry, stop, target = key
+        if status == TradeStatus.NEW:
+            self._new.discard(setup_id)
+        elif status in _PENDING:
+            self._entries[(d, status)].remove(entry, setup_id)
+        elif status == TradeStatus.TRADING:
+            self._stops[d].remove(stop, setup_id)
+            if target is not None:
+                self._targets[d].remove(target, setup_id)
+
+    def reindex(self, setup: TradeSetup):
+        self.add(setup)
+
+    def candidates(self, price: float) -> List[str]:
+        """
+        IDs of setups whose status may change at this price. Every setup not returned
+        is guaranteed to be a no-op for _check_setup.
+        """
+        return self.candidates_in_range(price, price)
+
+    def candidates_in_range(self, low: float, high: float) -> List[str]:
+        """
+        IDs of setups whose status may change along any price path within [low, high]
+        (the path ends somewhere inside the range).
+        """
+        t = CLOSE_THRESHOLD
+        ids = set(self._new)
+
+        # Not yet close: LONG moves once price falls within t of entry (or through it), SHORT mirrors
+        ids.update(self._entries[("LONG", TradeStatus.MONITORING)].at_or_above(low - t - _EPS))
+        ids.update(self._entries[("SHORT", TradeStatus.MONITORING)].at_or_below(high + t + _EPS))
+
+        # Close: moves on fill or when price drifts more than t away
+        close_long = self._entries[("LONG", TradeStatus.CLOSE_TO_ENTRY)]
+        ids.update(close_long.at_or_above(low - _EPS))
+        ids.update(close_long.below(high - t + _EPS))
+        close_short = self._entries[("SHORT", TradeStatus.CLOSE_TO_ENTRY)]
+        ids.update(close_short.at_or_below(high + _EPS))
+        ids.update(close_short.above(low + t - _EPS))
+
+        # In trade: stop or first target touched
+        ids.update(self._stops["LONG"].at_or_above(low - _EPS))
+        ids.update(self._targets["LONG"].at_or_below(high + _EPS))
+        ids.update(self._stops["SHORT"].at_or_below(high + _EPS))
+        ids.update(self._targets["SHORT"].at_or_above(low - _EPS))
+        return list(ids)
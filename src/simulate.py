@@ -0,0 +1,217 @@
+"""
+Accelerated simulation of the whole daemon.
+Installs a VirtualClock, serves recorded or synthetic 1-minute bars in place of
+data-service, answers every inference with a stub Gemini and drives the daemon's
+own scheduler jobs (src.main.build_jobs) and inference executor in virtual time.
+A full session replays in seconds, for soak and regression testing.
+
+Usage:
+    python -m src.simulate bars.csv                    # recorded bars (.csv, .npz or .json, see src.backtest)
+    python -m src.simulate --synthetic 2024-03-12      # random-walk regular session
+    python -m src.simulate bars.csv --speed 500        # pace at 500x real time instead of as fast as possible
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backtest import load_bars
+from src.bar_store import Bars, bar_store
+from src.clock import VirtualClock, clock
+from src.executor import inference_executor
+from src.fake_gemini import stub_response
+from src.inference_cache import inference_cache
+from src.market import MARKET_CLOSE, MARKET_OPEN, NY_TZ
+from src.models import TradeSetup
+from src.scheduler import Scheduler
+from src.state import app_state
+from src.trade_manager import DEFAULT_MAX_AGE_MINUTES
+from src.trendlines import trendline_cache
+
+logger = logging.getLogger(__name__)
+
+BAR_SECONDS = 60
+
+
+class BarFeed:
+    """data-service stand-in: serves the 1-minute bars that have closed by virtual time."""
+
+    def __init__(self, bars: Bars):
+        self.bars = bars
+        self.requests = 0
+
+    def fetch_bars(self, ticker: str = "@ES", timeframe: int = 1, bars_back: int = 1) -> list:
+        self.requests += 1
+        if timeframe != 1:
+            return []
+        end = int(np.searchsorted(self.bars.time, clock.time() - BAR_SECONDS, side="right"))
+        start = max(0, end - bars_back)
+        return [{"timestamp": float(self.bars.time[i]), "open": float(self.bars.open[i]),
+                 "high": float(self.bars.high[i]), "low": float(self.bars.low[i]),
+                 "close": float(self.bars.close[i]), "volume": 0}
+                for i in range(start, end)]
+
+
+class StubGemini:
+    """Answers instantly with one long and one short setup around the price in the context header."""
+
+    def __init__(self, offset: float = 4.0, risk: float = 4.0):
+        self.offset = offset
+        self.risk = risk
+        self.calls = 0
+
+    def run_inference(self, context_header: str = "", prompt_path: str = None, on_line=None,
+                      prompt_transform=None, timeout: float = None, cancel=None) -> str:
+        self.calls += 1
+        text = stub_response(context_header, f"sim{self.calls}", self.offset, self.risk)
+        if on_line:
+            for line in text.splitlines(keepends=True):
+                on_line(line)
+        return text
+
+
+def random_walk_session(day: date, seed: int = 0, start_price: float = 5000.0, volatility: float = 1.5) -> Bars:
+    """One regular session (9:30-16:00 ET) of 1-minute random-walk bars."""
+    rng = np.random.default_rng(seed)
+    open_at = NY_TZ.localize(datetime.combine(day, MARKET_OPEN)).timestamp()
+    close_at = NY_TZ.localize(datetime.combine(day, MARKET_CLOSE)).timestamp()
+    n = int((close_at - open_at) // BAR_SECONDS)
+    # Four ticks per bar: open, two intrabar extremes, close
+    path = start_price + np.cumsum(rng.normal(0.0, volatility / 2, size=n * 4))
+    path = np.round(path.reshape(n, 4) * 4) / 4
+    opens = np.concatenate(([start_price], path[:-1, 3]))
+    closes = path[:, 3]
+    return Bars(time=open_at + BAR_SECONDS * np.arange(n, dtype=float), open=opens,
+                high=np.maximum(path.max(axis=1), opens), low=np.minimum(path.min(axis=1), opens),
+                close=closes)
+
+
+def simulate(bars: Bars, config: Optional[dict] = None, speed: float = 0.0, client=None,
+             auto_inference_interval: Optional[int] = None) -> dict:
+    """
+    Run the daemon over `bars` in virtual time and return a summary.
+
+    Args:
+        config: app_config-style keys for build_jobs. price_feed is always "poll".
+        speed: Virtual seconds per real second (0 = as fast as possible).
+        client: Gemini client; defaults to StubGemini.
+        auto_inference_interval: Overrides the daemon's auto-inference interval (seconds).
+    """
+    from src.main import build_jobs
+
+    if not len(bars):
+        raise ValueError("No bars to simulate")
+    config = {**(config or {}), "price_feed": "poll"}
+    client = client or StubGemini()
+    feed = BarFeed(bars)
+    start, end = float(bars.time[0]), float(bars.time[-1]) + BAR_SECONDS
+
+    counts = Counter()
+
+    def on_change(kind: str, setup: TradeSetup):
+        counts[kind] += 1
+        if kind == "status":
+            counts[setup.status.value] += 1
+
+    virtual = VirtualClock(start)
+    previous_clock = clock.install(virtual)
+    manager = app_state.trade_manager
+    saved = (bar_store._fetcher, trendline_cache._fetcher, inference_executor.inline, inference_executor._client,
+             app_state.get_auto_inference_interval(), (manager.max_age_minutes, manager.status_ttl_minutes))
+    bar_store._fetcher = feed.fetch_bars
+    trendline_cache._fetcher = lambda **kwargs: {}  # no trendline service in simulation
+    inference_executor.set_inline(True)
+    inference_executor.set_client(client)
+    manager.add_listener(on_change)
+    manager.set_expiry_policy(config.get("setup_max_age_minutes", DEFAULT_MAX_AGE_MINUTES),
+                              config.get("setup_status_ttl_minutes"))
+    if auto_inference_interval is not None:
+        app_state.set_auto_inference_interval(auto_inference_interval)
+    app_state.set_running(True)
+    # Cache entries are stamped with clock time, so virtual and real entries must not mix
+    inference_cache.clear()
+
+    sched = Scheduler()
+    wall_started = time.perf_counter()
+    steps = 0
+    try:
+        build_jobs(config, sched)
+        while True:
+            due = sched.next_due()
+            target = end if due is None else min(max(due, virtual.time()), end)
+            if speed > 0:
+                time.sleep((target - virtual.time()) / speed)
+            virtual.set(target)
+            sched.run_pending()
+            inference_executor.run_ready()
+            steps += 1
+            if target >= end:
+                break
+        jobs = {name: {k: stats[k] for k in ("runs", "missed", "errors")} for name, stats in sched.stats().items()}
+    finally:
+        app_state.set_running(False)
+        manager.remove_listener(on_change)
+        bar_store._fetcher, trendline_cache._fetcher, inline, client_before, interval, expiry = saved
+        manager.set_expiry_policy(*expiry)
+        inference_executor.set_client(client_before)
+        inference_executor.set_inline(inline)
+        app_state.set_auto_inference_interval(interval)
+        inference_cache.clear()
+        clock.install(previous_clock)
+
+    wall = time.perf_counter() - wall_started
+    return {
+        "bars": len(bars),
+        "virtual_minutes": round((end - start) / 60, 1),
+        "wall_seconds": round(wall, 3),
+        "speedup": round((end - start) / wall) if wall else None,
+        "steps": steps,
+        "bar_requests": feed.requests,
+        "inferences": getattr(client, "calls", None),
+        "setups_added": counts["added"],
+        "setups_pruned": counts["removed"],
+        "transitions": {k: v for k, v in counts.items() if k not in ("added", "removed", "status")},
+        "open_setups": len(manager.get_active_setups()),
+        "jobs": jobs,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay a trading session through the daemon in virtual time.")
+    parser.add_argument("bars", nargs="?", help="Bar file (.csv, .npz or .json)")
+    parser.add_argument("--synthetic", metavar="YYYY-MM-DD", help="Simulate a random-walk session on this date")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=0.0, help="Virtual seconds per real second (0 = max)")
+    parser.add_argument("--price-evaluation", choices=("close", "intrabar"), default="close")
+    parser.add_argument("--inference-interval", type=int, default=None, help="Auto-inference interval in seconds")
+    parser.add_argument("--verbose", action="store_true", help="Keep the daemon's INFO logging")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        bars = random_walk_session(date.fromisoformat(args.synthetic), seed=args.seed)
+    elif args.bars:
+        bars = load_bars(args.bars)
+    else:
+        parser.error("give a bar file or --synthetic DATE")
+
+    from src.main import setup_logging
+    setup_logging(log_file=None)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    summary = simulate(bars, {"price_evaluation": args.price_evaluation}, speed=args.speed,
+                       auto_inference_interval=args.inference_interval)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,14 @@
+import json
 import threading
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 from enum import Enum
 import pytz
+from .clock import clock
 from .trade_manager import TradeManager
+from .events import event_bus, publish_setup_change
+from .journal import journal
 
 NY_TZ = pytz.timezone('America/New_York')
 
@@ -27,6 +31,8 @@ class InferenceState:
     completed_at: Optional[datetime] = None
     context: Optional[str] = None
     strategy: Optional[str] = None
+    # Per-strategy status, timing and setup count for the current job
+    strategies: Dict[str, dict] = field(default_factory=dict)
 
 
 @dataclass
@@ -40,46 +46,109 @@ class DaemonState:
     # Auto-inference interval (600 = 10 minutes default, 0 = disabled)
     auto_inference_interval: int = 600
     
+    # "tool" (model calls get_market_state) or "prefetched" (daemon injects market state)
+    context_mode: str = "tool"
+
     # Current inference state
     inference: InferenceState = field(default_factory=InferenceState)
     
     # Trade Management
     trade_manager: TradeManager = field(default_factory=TradeManager)
+
+    # Monitor loop health (seconds between consecutive price/monitor passes)
+    monitor_gap_last: float = 0.0
+    monitor_gap_max: float = 0.0
+    _last_monitor_tick: Optional[float] = field(default=None, repr=False)
+
+    # Bumped on every change to the state served by get_snapshot_json / get_inference_json
+    version: int = 0
+    _json_cache: Dict[str, Tuple[int, str]] = field(default_factory=dict, repr=False)
     
     _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
+    def __post_init__(self):
+        self.trade_manager.add_listener(lambda kind, setup: self.touch())
+
+    def touch(self):
+        """Mark the state changed (for changes made outside the setters)."""
+        with self._lock:
+            self.version += 1
+
     def update_output(self, output: str):
         with self._lock:
             self.last_output = output
             # Store time as aware datetime in NY timezone
-            self.last_updated = datetime.now(NY_TZ)
+            self.last_updated = clock.now(NY_TZ)
+            self.version += 1
 
     def set_running(self, running: bool):
         with self._lock:
             self.is_running = running
+            if not running:
+                self._last_monitor_tick = None  # a stopped daemon is not a monitor gap
+            self.version += 1
+        event_bus.publish("daemon", {"is_running": running})
+
+    def set_price(self, price: float):
+        """Record the latest price; a price event is pushed only when it changed."""
+        with self._lock:
+            changed = price != self.last_price
+            self.last_price = price
+            if changed:
+                self.version += 1
+        if changed:
+            event_bus.publish("price", {"price": price})
 
     def set_interval(self, interval: int):
         with self._lock:
             self.current_interval = interval
+            self.version += 1
 
     def set_auto_inference_interval(self, interval: int):
         """Set automatic inference interval. 0 = disabled."""
         with self._lock:
             self.auto_inference_interval = max(0, interval)
+            self.version += 1
 
     def get_auto_inference_interval(self) -> int:
         with self._lock:
             return self.auto_inference_interval
 
+    def set_context_mode(self, mode: str):
+        with self._lock:
+            self.context_mode = mode
+            self.version += 1
+
+    def get_context_mode(self) -> str:
+        with self._lock:
+            return self.context_mode
+
+    def record_monitor_tick(self):
+        """Record a monitor loop pass and track the gap since the previous one."""
+        now = clock.monotonic()
+        with self._lock:
+            if self._last_monitor_tick is not None:
+                gap = now - self._last_monitor_tick
+                self.monitor_gap_last = gap
+                self.monitor_gap_max = max(self.monitor_gap_max, gap)
+            self._last_monitor_tick = now
+
+    def reset_monitor_tick(self):
+        """Forget the last monitor pass, so time spent parked or stopped is not counted as a gap."""
+        with self._lock:
+            self._last_monitor_tick = None
+
     def start_inference(self, context: str = None, strategy: str = None):
         """Mark inference as started."""
         with self._lock:
             self.inference = InferenceState(
                 status=InferenceStatus.RUNNING,
-                started_at=datetime.now(NY_TZ),
+                started_at=clock.now(NY_TZ),
                 context=context,
                 strategy=strategy
             )
+            self.version += 1
+        self._publish_inference()
 
     def complete_inference(self, result: str):
         """Mark inference as complete with result."""
@@ -87,7 +156,11 @@ class DaemonState:
             self.inference.status = InferenceStatus.COMPLETE
             self.inference.result = result
             self.inference.error = None
-            self.inference.completed_at = datetime.now(NY_TZ)
+            self.inference.completed_at = clock.now(NY_TZ)
+            self.version += 1
+            strategy = self.inference.strategy
+        self._publish_inference()
+        journal.record_inference(InferenceStatus.COMPLETE.value, result, None, strategy)
 
     def fail_inference(self, error: str):
         """Mark inference as failed with error."""
@@ -95,29 +168,72 @@ class DaemonState:
             self.inference.status = InferenceStatus.ERROR
             self.inference.result = None
             self.inference.error = error
-            self.inference.completed_at = datetime.now(NY_TZ)
+            self.inference.completed_at = clock.now(NY_TZ)
+            self.version += 1
+            strategy = self.inference.strategy
+        self._publish_inference()
+        journal.record_inference(InferenceStatus.ERROR.value, None, error, strategy)
+
+    def restore_inference(self, record: dict):
+        """Show the last journaled inference result after a restart (also restores the cooldown)."""
+        with self._lock:
+            self.inference = InferenceState(
+                status=InferenceStatus(record["status"]),
+                result=record.get("result"),
+                error=record.get("error"),
+                strategy=record.get("strategy"),
+                completed_at=datetime.fromtimestamp(record["ts"], NY_TZ),
+            )
+            self.version += 1
+        self._publish_inference()
+
+    def update_strategy(self, strategy: str, **fields):
+        """Record progress of one strategy within the current inference."""
+        with self._lock:
+            entry = self.inference.strategies.setdefault(strategy, {})
+            entry.update(fields)
+            entry = dict(entry)
+            self.version += 1
+        event_bus.publish("strategy", {"strategy": strategy, "fields": entry})
+
+    def _publish_inference(self):
+        with self._lock:
+            fields = self._inference_fields()
+        event_bus.publish("inference", fields)
+
+    def _inference_fields(self) -> dict:
+        """Inference state without setups or live data. Caller holds self._lock."""
+        return {
+            "status": self.inference.status.value,
+            "result": self.inference.result,
+            "error": self.inference.error,
+            "started_at": self.inference.started_at.strftime("%Y-%m-%d %H:%M:%S %Z") if self.inference.started_at else None,
+            "completed_at": self.inference.completed_at.strftime("%Y-%m-%d %H:%M:%S %Z") if self.inference.completed_at else None,
+            "context": self.inference.context,
+            "strategy": self.inference.strategy,
+            "strategies": {k: dict(v) for k, v in self.inference.strategies.items()},
+            "duration_seconds": round((self.inference.completed_at - self.inference.started_at).total_seconds(), 2)
+                if self.inference.completed_at and self.inference.started_at else None,
+        }
 
     def get_inference_snapshot(self) -> dict:
         """Get current inference state as dict."""
         with self._lock:
             return {
-                "status": self.inference.status.value,
-                "result": self.inference.result,
-                "error": self.inference.error,
-                "started_at": self.inference.started_at.strftime("%Y-%m-%d %H:%M:%S %Z") if self.inference.started_at else None,
-                "completed_at": self.inference.completed_at.strftime("%Y-%m-%d %H:%M:%S %Z") if self.inference.completed_at else None,
-                "context": self.inference.context,
-                "strategy": self.inference.strategy,
-                "active_setups": [s.model_dump() for s in self.trade_manager.get_active_setups()],
-                "current_time": datetime.now(NY_TZ).strftime("%H:%M:%S"),
+                **self._inference_fields(),
+                "active_setups": [s.model_dump(mode="json") for s in self.trade_manager.get_active_setups()],
                 "current_price": self.last_price or 0.0
             }
 
+    def get_inference_json(self) -> Tuple[int, str]:
+        """(version, JSON of get_inference_snapshot()), re-serialized only when the version changed."""
+        return self._cached_json("inference", self.get_inference_snapshot)
+
     def is_inference_running(self) -> bool:
         with self._lock:
             return self.inference.status == InferenceStatus.RUNNING
 
-    def get_snapshot(self):
+    def _status_fields(self) -> dict:
         with self._lock:
             # Format nicely: YYYY-MM-DD HH:MM:SS ET
             formatted_time = None
@@ -130,11 +246,39 @@ class DaemonState:
                 "current_interval": self.current_interval,
                 "last_updated": formatted_time,
                 "auto_inference_interval": self.auto_inference_interval,
-                "active_setups": [s.model_dump() for s in self.trade_manager.get_active_setups()],
-                "current_time": datetime.now(NY_TZ).strftime("%H:%M:%S"),
+                "active_setups": [s.model_dump(mode="json") for s in self.trade_manager.get_active_setups()],
                 "current_price": self.last_price or 0.0
             }
 
+    def get_monitor_health(self) -> dict:
+        """Monitor loop gaps. Kept out of the versioned snapshot since they change every pass."""
+        with self._lock:
+            return {
+                "monitor_gap_last": round(self.monitor_gap_last, 2),
+                "monitor_gap_max": round(self.monitor_gap_max, 2),
+            }
+
+    def get_snapshot(self):
+        return {**self._status_fields(), **self.get_monitor_health()}
+
+    def get_snapshot_json(self) -> Tuple[int, str]:
+        """(version, JSON of get_snapshot() without the monitor gaps), re-serialized only when the version changed."""
+        return self._cached_json("status", self._status_fields)
+
+    def _cached_json(self, name: str, build: Callable[[], dict]) -> Tuple[int, str]:
+        with self._lock:
+            version = self.version
+            cached = self._json_cache.get(name)
+        if cached and cached[0] == version:
+            return cached
+        # Tagged with the version read before building: if the state moved on meanwhile,
+        # the next call sees a newer version and rebuilds
+        entry = (version, json.dumps(build()))
+        with self._lock:
+            self._json_cache[name] = entry
+        return entry
+
 
 # Global singleton
 app_state = DaemonState()
+app_state.trade_manager.add_listener(publish_setup_change)
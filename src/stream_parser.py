@@ -0,0 +1,96 @@
+"""
+Incremental parser for streamed LLM output.
+Scans Gemini stdout as it arrives for the "setups" array and validates each
+element as a TradeSetup the moment its closing brace is seen, so setups can be
+monitored before the CLI process exits.
+"""
+import json
+import logging
+import re
+from typing import Callable, List
+
+from pydantic import ValidationError
+
+from src.models import TradeSetup
+
+logger = logging.getLogger(__name__)
+
+_SETUPS_KEY = re.compile(r'"setups"\s*:\s*\[')
+
+
+class SetupStreamParser:
+    """Feed text chunks in order; on_setup(setup) is called once per complete, valid setup."""
+
+    def __init__(self, on_setup: Callable[[TradeSetup], None]):
+        self.on_setup = on_setup
+        self.setups: List[TradeSetup] = []
+        self._buf = ""
+        self._pos = 0            # next unscanned index in _buf
+        self._in_array = False
+        self._done = False
+        self._depth = 0          # brace/bracket depth inside the current element
+        self._in_string = False
+        self._escape = False
+        self._start = None       # index of the current element's opening brace
+
+    def feed(self, chunk: str):
+        if self._done:
+            return
+        self._buf += chunk
+        if not self._in_array:
+            match = _SETUPS_KEY.search(self._buf, self._pos)
+            if not match:
+                # Keep scanning near the end next time; the key may be split across chunks
+                self._pos = max(self._pos, len(self._buf) - 32)
+                return
+            self._in_array = True
+            self._pos = match.end()
+        self._scan()
+
+    def _scan(self):
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # End of the setups array
+                    self._done = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buf[self._start:i + 1])
+                    self._start = None
+            i += 1
+
+        # Drop scanned text that no pending element needs
+        keep = self._start if self._start is not None else i
+        self._buf = buf[keep:]
+        self._pos = i - keep
+        if self._start is not None:
+            self._start = 0
+
+    def _emit(self, text: str):
+        try:
+            setup = TradeSetup(**json.loads(text))
+        except (ValueError, TypeError, ValidationError) as e:
+            logger.warning(f"Skipping streamed setup that failed validation: {e}")
+            return
+        self.setups.append(setup)
+        try:
+            self.on_setup(setup)
+        except Exception as e:
+            logger.error(f"Streamed setup handler error: {e}")
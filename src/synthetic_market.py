@@ -0,0 +1,259 @@
+"""
+Synthetic market generator.
+Produces an endless 1-minute price path as geometric Brownian motion whose drift
+and volatility switch between regimes (range, trend up/down, volatile), with
+occasional price gaps between bars and single-tick wicks. Bars, the latest tick
+and trendlines with price relations are derived from the same path, so what the
+daemon polls, streams and triggers on is consistent. Time is read from the
+injectable clock, so the generator also works under a VirtualClock.
+Served over HTTP by src.data_service_stub.
+"""
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.clock import clock as global_clock
+from src.trendlines import proximity_of
+
+TICK_SIZE = 0.25
+BAR_SECONDS = 60
+TICKS_PER_BAR = 12  # one price every 5 seconds
+TICK_SECONDS = BAR_SECONDS / TICKS_PER_BAR
+
+# 1-minute bars generated before the start time, enough for a full bar_store backfill
+DEFAULT_HISTORY_BARS = 3000
+
+# Bars on each side a swing high/low must dominate to count as a pivot
+PIVOT_WINDOW = 3
+
+# Trendlines returned per type and timeframe
+MAX_LINES_PER_TYPE = 3
+
+
+@dataclass(frozen=True)
+class Regime:
+    name: str
+    drift: float       # mean log return per 1-minute bar
+    volatility: float  # stdev of the log return per 1-minute bar
+
+
+DEFAULT_REGIMES = (
+    Regime("range", 0.0, 0.0002),
+    Regime("trend_up", 0.00005, 0.0003),
+    Regime("trend_down", -0.00005, 0.0003),
+    Regime("volatile", 0.0, 0.0006),
+)
+
+
+class SyntheticMarket:
+    """Thread-safe lazily generated price path for one ticker."""
+
+    def __init__(self, seed: int = 0, start_price: float = 5000.0, start_time: Optional[float] = None,
+                 history_bars: int = DEFAULT_HISTORY_BARS, regimes: Sequence[Regime] = DEFAULT_REGIMES,
+                 mean_regime_bars: float = 45.0, gap_probability: float = 0.003, gap_volatility: float = 0.0015,
+                 wick_probability: float = 0.04, wick_scale: float = 2.5,
+                 clock: Callable[[], float] = global_clock.time):
+        """
+        Args:
+            start_price: Price at the first (oldest) generated bar.
+            start_time: Epoch second the path reaches "now"; defaults to the current minute.
+                        `history_bars` minutes are generated before it.
+            mean_regime_bars: Average regime length in bars (switches are a Markov chain).
+            gap_probability / gap_volatility: Chance per bar of a jump between the previous
+                        close and the open, and the jump's stdev as a log return.
+            wick_probability / wick_scale: Chance per bar of a one-tick spike, and its size
+                        in multiples of the regime's per-bar volatility.
+        """
+        self._clock = clock
+        now = clock() if start_time is None else start_time
+        self.origin = math.floor(now / BAR_SECONDS) * BAR_SECONDS - history_bars * BAR_SECONDS
+        self.regimes = tuple(regimes)
+        self.switch_probability = 1.0 / mean_regime_bars if mean_regime_bars > 0 else 0.0
+        self.gap_probability = gap_probability
+        self.gap_volatility = gap_volatility
+        self.wick_probability = wick_probability
+        self.wick_scale = wick_scale
+
+        self._rng = np.random.default_rng(seed)
+        self._log_price = math.log(start_price)
+        self._regime = 0
+        self._ticks = np.zeros((0, TICKS_PER_BAR))
+        self._regime_of = np.zeros(0, dtype=int)
+        self._volume = np.zeros(0)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.gaps = 0
+        self.wicks = 0
+
+    def _extend_to(self, now: float):
+        """Generate every bar up to and including the one containing `now`. Caller holds the lock."""
+        target = int((now - self.origin) // BAR_SECONDS) + 1
+        n = target - self._count
+        if n <= 0:
+            return
+        rng = self._rng
+
+        regime_of = np.empty(n, dtype=int)
+        switches = rng.random(n) < self.switch_probability
+        for i in range(n):
+            if switches[i] and len(self.regimes) > 1:
+                self._regime = (self._regime + int(rng.integers(1, len(self.regimes)))) % len(self.regimes)
+            regime_of[i] = self._regime
+        drift = np.array([self.regimes[r].drift for r in regime_of])
+        vol = np.array([self.regimes[r].volatility for r in regime_of])
+
+        steps = rng.normal(0.0, 1.0, size=(n, TICKS_PER_BAR)) * (vol / math.sqrt(TICKS_PER_BAR))[:, None]
+        steps += (drift / TICKS_PER_BAR)[:, None]
+        gaps = rng.random(n) < self.gap_probability
+        steps[gaps, 0] += rng.normal(0.0, self.gap_volatility, size=int(gaps.sum()))
+        log_path = self._log_price + np.cumsum(steps.ravel()).reshape(n, TICKS_PER_BAR)
+        self._log_price = float(log_path[-1, -1])
+
+        # A wick moves one interior tick only; the path continues from where it was
+        wicks = np.flatnonzero(rng.random(n) < self.wick_probability)
+        at = rng.integers(1, TICKS_PER_BAR - 1, size=len(wicks))
+        size = rng.exponential(self.wick_scale, size=len(wicks)) * vol[wicks] * rng.choice((-1.0, 1.0), len(wicks))
+        log_path[wicks, at] += size
+
+        ticks = np.round(np.exp(log_path) / TICK_SIZE) * TICK_SIZE
+        volume = np.round(rng.gamma(4.0, 250.0, size=n) * vol / self.regimes[0].volatility)
+
+        self._ticks = np.concatenate((self._ticks, ticks))
+        self._regime_of = np.concatenate((self._regime_of, regime_of))
+        self._volume = np.concatenate((self._volume, volume))
+        self._count = target
+        self.gaps += int(gaps.sum())
+        self.wicks += len(wicks)
+
+    def _minute_bars(self, lo: int, hi: int, now: float) -> Tuple[np.ndarray, ...]:
+        """time/open/high/low/close/volume of minute bars [lo, hi); a forming bar only shows elapsed ticks."""
+        ticks = self._ticks[lo:hi].copy()
+        volume = self._volume[lo:hi].copy()
+        if hi == self._count and hi > lo:
+            seen = min(TICKS_PER_BAR, int((now - self.bar_open(hi - 1)) // TICK_SECONDS) + 1)
+            ticks[-1, seen:] = ticks[-1, seen - 1]
+            volume[-1] = math.floor(volume[-1] * seen / TICKS_PER_BAR)
+        times = self.origin + BAR_SECONDS * np.arange(lo, hi, dtype=float)
+        return times, ticks[:, 0], ticks.max(axis=1), ticks.min(axis=1), ticks[:, -1], volume
+
+    def bar_open(self, index: int) -> float:
+        return self.origin + index * BAR_SECONDS
+
+    def tick(self, now: Optional[float] = None) -> Tuple[float, float]:
+        """Latest (price, tick time)."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._extend_to(now)
+            i = self._count - 1
+            k = min(TICKS_PER_BAR - 1, int((now - self.bar_open(i)) // TICK_SECONDS))
+            return float(self._ticks[i, k]), self.bar_open(i) + k * TICK_SECONDS
+
+    def regime(self, now: Optional[float] = None) -> str:
+        now = self._clock() if now is None else now
+        with self._lock:
+            self._extend_to(now)
+            return self.regimes[self._regime_of[self._count - 1]].name
+
+    def bars(self, timeframe: int = 1, bars_back: int = 1, now: Optional[float] = None,
+             closed_only: bool = False) -> List[dict]:
+        """The last `bars_back` bars of `timeframe` minutes (oldest first), data-service style."""
+        now = self._clock() if now is None else now
+        span = timeframe * BAR_SECONDS
+        with self._lock:
+            self._extend_to(now)
+            hi = self._count
+            # Start on a timeframe boundary so the first group is complete
+            first = math.floor((self.bar_open(hi - 1) - (bars_back - 1) * span) / span) * span
+            lo = max(0, int(math.ceil((first - self.origin) / BAR_SECONDS)))
+            times, opens, highs, lows, closes, volume = self._minute_bars(lo, hi, now)
+
+        if timeframe > 1:
+            group = np.floor(times / span)
+            starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+            times = group[starts] * span
+            opens = opens[starts]
+            highs = np.maximum.reduceat(highs, starts)
+            lows = np.minimum.reduceat(lows, starts)
+            closes = closes[np.r_[starts[1:] - 1, len(closes) - 1]]
+            volume = np.add.reduceat(volume, starts)
+        if closed_only and len(times) and times[-1] + span > now:
+            times, opens, highs, lows, closes, volume = (a[:-1] for a in (times, opens, highs, lows, closes, volume))
+        start = max(0, len(times) - bars_back)
+        return [{"timestamp": float(times[i]), "open": float(opens[i]), "high": float(highs[i]),
+                 "low": float(lows[i]), "close": float(closes[i]), "volume": int(volume[i])}
+                for i in range(start, len(times))]
+
+    def trendlines(self, timeframe: int = 5, bars_back: int = 200, now: Optional[float] = None) -> dict:
+        """
+        Support/resistance lines through consecutive swing lows/highs of the closed bars,
+        plus where the current price sits relative to each line.
+        """
+        now = self._clock() if now is None else now
+        bars = self.bars(timeframe, bars_back, now, closed_only=True)
+        price, _ = self.tick(now)
+        lines = []
+        if len(bars) > 2 * PIVOT_WINDOW:
+            times = np.array([b["timestamp"] for b in bars])
+            lines += _pivot_lines("support", times, np.array([b["low"] for b in bars]),
+                                  np.array([b["close"] for b in bars]), timeframe)
+            lines += _pivot_lines("resistance", times, np.array([b["high"] for b in bars]),
+                                  np.array([b["close"] for b in bars]), timeframe)
+        return {"trendlines": lines, "price_relations": price_relations(lines, price, now, timeframe),
+                "current_price": price}
+
+
+def _pivot_lines(kind: str, times: np.ndarray, extremes: np.ndarray, closes: np.ndarray,
+                 timeframe: int) -> List[dict]:
+    """Lines through the most recent pairs of consecutive pivots of `extremes`."""
+    k = PIVOT_WINDOW
+    windows = np.lib.stride_tricks.sliding_window_view(extremes, 2 * k + 1)
+    edge = windows.min(axis=1) if kind == "support" else windows.max(axis=1)
+    pivots = np.flatnonzero(extremes[k:-k] == edge) + k
+    sign = 1.0 if kind == "support" else -1.0
+    tolerance = max(TICK_SIZE * 2, float(np.median(np.abs(np.diff(closes)))) if len(closes) > 1 else TICK_SIZE)
+
+    lines = []
+    for a, b in reversed(list(zip(pivots[:-1], pivots[1:]))):
+        if b - a < k:  # a flat top/bottom, not two swings
+            continue
+        slope = (extremes[b] - extremes[a]) / (b - a)
+        line = extremes[a] + slope * (np.arange(len(extremes)) - a)
+        after = slice(a, None)
+        touches = int(np.sum(np.abs(extremes[after] - line[after]) <= tolerance))
+        breaks = int(np.sum(sign * (closes[after] - line[after]) < -tolerance))
+        if breaks > 1:
+            continue
+        lines.append({
+            "type": kind,
+            "slope": round(float(slope), 4),
+            "anchor": {"time": float(times[a]), "price": float(extremes[a])},
+            "start": {"time": float(times[a]), "price": float(extremes[a])},
+            "end": {"time": float(times[b]), "price": float(extremes[b])},
+            "touch_count": touches,
+            "score": round(touches / (touches + breaks + 1), 3),
+            "timeframe": f"{timeframe}min",
+        })
+        if len(lines) >= MAX_LINES_PER_TYPE:
+            break
+    return lines
+
+
+def price_relations(lines: List[dict], price: float, now: float, timeframe: int) -> List[dict]:
+    """Distance from `price` to each line at `now`; proximity is "at", "near" or "far"."""
+    relations = []
+    for line in lines:
+        anchor = line["anchor"]
+        line_price = anchor["price"] + line["slope"] * (now - anchor["time"]) / (timeframe * 60)
+        distance = price - line_price
+        relations.append({
+            "type": line["type"],
+            "line_price": round(line_price, 2),
+            "distance": round(distance, 2),
+            "proximity": proximity_of(distance) or "far",
+            "position": "above" if distance >= 0 else "below",
+        })
+    relations.sort(key=lambda r: abs(r["distance"]))
+    return relations
@@ -1,23 +1,55 @@
 import logging
 import threading
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Mapping, Optional, Sequence, Tuple, Union
+import numpy as np
 from .models import TradeSetup, TradeStatus
+from .setup_book import SetupBook, CLOSE_THRESHOLD
+from .expiry import ExpiryQueue
+from .clock import clock
+from . import intrabar
 import pytz
 
 NY_TZ = pytz.timezone('America/New_York')
 
 logger = logging.getLogger("TradeManager")
 
+# Setups are pruned this long after created_at unless their status has its own TTL
+DEFAULT_MAX_AGE_MINUTES = 30
+
 class TradeManager:
     def __init__(self):
         self._lock = threading.Lock()
         self.setups: Dict[str, TradeSetup] = {}
+        # Price index per symbol — update_setups only visits setups near the price
+        self._books: Dict[str, SetupBook] = {}
+        # Expiry deadlines keyed by setup id — prune_backlog only visits setups that are due
+        self.max_age_minutes: float = DEFAULT_MAX_AGE_MINUTES
+        self.status_ttl_minutes: Dict[TradeStatus, Optional[float]] = {}
+        self._expiry = ExpiryQueue()
+        # Called with (kind, setup): "added", "status" (transition) or "removed" (pruned or withdrawn)
+        self._listeners: List[Callable[[str, TradeSetup], None]] = []
         # Simple history to avoid re-adding same ID if we wanted, 
         # but for now we just rely on current backlog
     
+    def add_listener(self, listener: Callable[[str, TradeSetup], None]):
+        """Register a change listener. Listeners run after the lock is released."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, TradeSetup], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, changes: List[Tuple[str, TradeSetup]]):
+        for kind, setup in changes:
+            for listener in self._listeners:
+                try:
+                    listener(kind, setup)
+                except Exception as e:
+                    logger.error(f"Setup listener error: {e}")
+
     def add_setups(self, new_setups: List[TradeSetup]):
         """Adds new setups to the backlog."""
+        changes = []
         with self._lock:
             for setup in new_setups:
                 # If setup ID already exists, update it or skip? 
@@ -29,8 +61,40 @@ class TradeManager:
                     if existing.status in [TradeStatus.TRADING, TradeStatus.PROFIT, TradeStatus.STOP_LOSS]:
                         continue # Don't overwrite active trades with new plan
                 
+                self._unindex(setup.id)
                 self.setups[setup.id] = setup
+                self._books.setdefault(setup.symbol, SetupBook()).add(setup)
+                self._schedule_expiry(setup)
+                changes.append(("added", setup))
                 logger.info(f"Added setup: {setup.id} ({setup.direction} @ {setup.entry.price})")
+        self._notify(changes)
+
+    def remove_setups(self, setup_ids: Sequence[str]) -> List[str]:
+        """
+        Withdraws setups that have not filled (e.g. streamed by an inference that then failed).
+        Filled setups (TRADING, PROFIT, STOP_LOSS) are kept. Returns the ids removed.
+        """
+        changes = []
+        with self._lock:
+            for setup_id in setup_ids:
+                setup = self.setups.get(setup_id)
+                if setup is None or setup.status in [TradeStatus.TRADING, TradeStatus.PROFIT, TradeStatus.STOP_LOSS]:
+                    continue
+                self._unindex(setup_id)
+                del self.setups[setup_id]
+                changes.append(("removed", setup))
+                logger.info(f"Withdrew setup {setup_id}")
+        self._notify(changes)
+        return [setup.id for _, setup in changes]
+
+    def restore(self, setups: List[TradeSetup]):
+        """Load setups recovered at startup (e.g. from the journal) without notifying listeners."""
+        with self._lock:
+            for setup in setups:
+                self._unindex(setup.id)
+                self.setups[setup.id] = setup
+                self._books.setdefault(setup.symbol, SetupBook()).add(setup)
+                self._schedule_expiry(setup)
 
     def get_active_setups(self) -> List[TradeSetup]:
         """Returns list of all setups in backlog."""
@@ -38,38 +102,141 @@ class TradeManager:
             # Return sorted by creation time desc
             return sorted(self.setups.values(), key=lambda x: x.created_at, reverse=True)
 
-    def prune_backlog(self, max_age_minutes: int = 30):
-        """Removes all setups older than max_age_minutes regardless of status."""
+    def set_expiry_policy(self, max_age_minutes: float = DEFAULT_MAX_AGE_MINUTES,
+                          status_ttl_minutes: Optional[Mapping[Union[TradeStatus, str], Optional[float]]] = None):
+        """
+        Sets how long setups live, measured from created_at.
+
+        Args:
+            max_age_minutes: TTL for statuses without their own entry.
+            status_ttl_minutes: Per-status TTLs; None never expires (e.g. {"TRADING": None}
+                keeps filled setups until they hit a target or the stop).
+        """
         with self._lock:
-            now = datetime.now(NY_TZ)
-            ids_to_remove = []
-            for start_id, setup in self.setups.items():
-                age = now - setup.created_at
-                
-                if age > timedelta(minutes=max_age_minutes):
-                    ids_to_remove.append(start_id)
-            
-            for i in ids_to_remove:
-                del self.setups[i]
-                logger.info(f"Pruned old setup ({i}): age > {max_age_minutes}m")
+            self.max_age_minutes = max_age_minutes
+            self.status_ttl_minutes = {TradeStatus(k): v for k, v in (status_ttl_minutes or {}).items()}
+            for setup in self.setups.values():
+                self._schedule_expiry(setup)
+
+    def prune_backlog(self, max_age_minutes: Optional[float] = None):
+        """
+        Removes setups whose TTL has passed. Only due setups are visited (O(k log n)).
 
-    def update_setups(self, current_price: float):
+        max_age_minutes replaces the default TTL for this call only (statuses with their
+        own TTL keep it); it scans every setup. The policy set by set_expiry_policy is unchanged.
         """
-        Monitors all setups against current price and updates status.
+        now = clock.time()
+        changes = []
+        with self._lock:
+            due = self._expiry.pop_due(now)
+            if max_age_minutes is not None:
+                # Setups on the default TTL are judged by the override alone
+                cutoff = now - max_age_minutes * 60
+                popped = set(due)
+                due = [i for i in due if self.setups[i].status in self.status_ttl_minutes]
+                for setup_id, setup in self.setups.items():
+                    if setup.status in self.status_ttl_minutes:
+                        continue
+                    if setup.created_at.timestamp() <= cutoff:
+                        due.append(setup_id)
+                    elif setup_id in popped:
+                        self._schedule_expiry(setup)  # still due for the next call without override
+            for setup_id in due:
+                self._unindex(setup_id)
+                setup = self.setups.pop(setup_id)
+                changes.append(("removed", setup))
+                overridden = max_age_minutes is not None and setup.status not in self.status_ttl_minutes
+                ttl = max_age_minutes if overridden else self._ttl(setup.status)
+                logger.info(f"Pruned old setup ({setup_id}): {setup.status.value} age > {ttl}m")
+        self._notify(changes)
+
+    def update_setups(self, current_price: float, symbol: Optional[str] = None):
+        """
+        Monitors setups against current price and updates status.
+        Only setups whose levels were crossed or came within CLOSE_THRESHOLD are visited.
+
+        Args:
+            current_price: Latest price.
+            symbol: Restrict to one symbol's setups. None applies the price to all setups.
         """
+        changes = []
         with self._lock:
-            for setup in self.setups.values():
-                self._check_setup(setup, current_price)
+            if symbol is None:
+                books = list(self._books.values())
+            else:
+                books = [self._books[symbol]] if symbol in self._books else []
+
+            for book in books:
+                for setup_id in book.candidates(current_price):
+                    setup = self.setups[setup_id]
+                    before = setup.status
+                    self._check_setup(setup, current_price)
+                    if setup.status != before:
+                        book.reindex(setup)
+                        self._schedule_expiry(setup)
+                        changes.append(("status", setup))
+        self._notify(changes)
+
+    def update_setups_path(self, prices: Sequence[float], symbol: Optional[str] = None):
+        """
+        Replays an ordered price path (e.g. intrabar OHLC points from intrabar.BarReplayer)
+        through the state machine in one vectorized pass. Equivalent to calling
+        update_setups for each price in order.
+
+        Setups still NEW have not been evaluated yet and did not exist for most of the
+        path, so they only see its last price.
+        """
+        prices = np.asarray(prices, dtype=float)
+        if prices.size == 0:
+            return
+
+        changes = []
+        with self._lock:
+            if symbol is None:
+                books = list(self._books.values())
+            else:
+                books = [self._books[symbol]] if symbol in self._books else []
+
+            for book in books:
+                ids = book.candidates_in_range(float(prices.min()), float(prices.max()))
+                fresh = [self.setups[i] for i in ids if self.setups[i].status == TradeStatus.NEW]
+                seen = [self.setups[i] for i in ids if self.setups[i].status != TradeStatus.NEW]
+                for group, path in ((seen, prices), (fresh, prices[-1:])):
+                    if not group:
+                        continue
+                    codes = intrabar.evaluate_path(path, *intrabar.setup_arrays(group))
+                    for setup, code in zip(group, codes):
+                        status = intrabar.CODE_STATUS[int(code)]
+                        if status != setup.status:
+                            setup.status = status
+                            book.reindex(setup)
+                            self._schedule_expiry(setup)
+                            changes.append(("status", setup))
+        self._notify(changes)
+
+    def _unindex(self, setup_id: str):
+        """Drop a setup from its symbol's price index and the expiry queue. Caller holds self._lock."""
+        existing = self.setups.get(setup_id)
+        if existing is not None and existing.symbol in self._books:
+            self._books[existing.symbol].remove(setup_id)
+        self._expiry.discard(setup_id)
+
+    def _ttl(self, status: TradeStatus) -> Optional[float]:
+        return self.status_ttl_minutes.get(status, self.max_age_minutes)
+
+    def _schedule_expiry(self, setup: TradeSetup):
+        """(Re)schedule a setup's expiry for its current status. Caller holds self._lock."""
+        ttl = self._ttl(setup.status)
+        # timestamp() reads naive datetimes as local time, so they compare correctly too
+        deadline = None if ttl is None else setup.created_at.timestamp() + ttl * 60
+        self._expiry.schedule(setup.id, deadline)
 
     def _check_setup(self, setup: TradeSetup, price: float):
         # 1. NEW -> MONITORING (Immediate transition usually)
         if setup.status == TradeStatus.NEW:
             setup.status = TradeStatus.MONITORING
 
-        # 2. MONITORING -> CLOSE_TO_ENTRY
-        # Define "Close" as within ~3 points (12 ticks) for ES
-        CLOSE_THRESHOLD = 3.0 
-        
+        # 2. MONITORING -> CLOSE_TO_ENTRY (within CLOSE_THRESHOLD)
         if setup.status == TradeStatus.MONITORING:
             dist = abs(price - setup.entry.price)
             if dist <= CLOSE_THRESHOLD:
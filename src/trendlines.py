@@ -0,0 +1,197 @@
+"""
+Trendline cache.
+Trendline geometry only changes when a bar closes, so the line sets for every
+timeframe are fetched from data-service in one batched request, cached, and
+refreshed at the next bar-close boundary. Price proximity ("at" / "near") is
+computed locally from the cached geometry on every price update.
+"""
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.clock import clock as global_clock
+from src.market import bar_time, fetch_trendlines
+
+logger = logging.getLogger(__name__)
+
+# Timeframes (minutes) fetched in the batched request
+DEFAULT_TIMEFRAMES = (5, 15)
+
+# Proximity thresholds in index points. Classified locally, so they replace data-service's
+# own at/near thresholds; configure them to match (see set_proximity_thresholds).
+DEFAULT_AT_DISTANCE = 1.0
+DEFAULT_NEAR_DISTANCE = 3.0
+AT_DISTANCE = DEFAULT_AT_DISTANCE
+NEAR_DISTANCE = DEFAULT_NEAR_DISTANCE
+
+# Wait after a bar-close boundary before refreshing, so data-service has closed the bar
+BAR_CLOSE_GRACE_SECONDS = 3.0
+
+# Retry delay after a failed or empty refresh
+RETRY_SECONDS = 15.0
+
+
+@dataclass
+class Trendline:
+    """A straight support/resistance line. slope is in points per bar of its timeframe."""
+    type: str
+    slope: float
+    anchor_time: float   # epoch seconds
+    anchor_price: float
+    touch_count: int = 0
+    score: float = 0.0
+
+    @property
+    def key(self) -> tuple:
+        """Identity of the line across refreshes."""
+        return (self.type, self.anchor_time, round(self.anchor_price, 2))
+
+    def price_at(self, t: float, timeframe: int) -> float:
+        return self.anchor_price + self.slope * (t - self.anchor_time) / (timeframe * 60)
+
+    @classmethod
+    def from_payload(cls, raw: dict, timeframe: int) -> "Trendline":
+        """Build from a data-service line: slope + anchor {time, price}, or start/end points."""
+        anchor = raw.get("anchor") or raw["start"]
+        anchor_time = bar_time(anchor)
+        anchor_price = float(anchor["price"])
+        if "slope" in raw:
+            slope = float(raw["slope"])
+        else:
+            end = raw["end"]
+            bars = (bar_time(end) - anchor_time) / (timeframe * 60)
+            slope = (float(end["price"]) - anchor_price) / bars if bars else 0.0
+        return cls(
+            type=str(raw.get("type", "")).lower(),
+            slope=slope,
+            anchor_time=anchor_time,
+            anchor_price=anchor_price,
+            touch_count=int(raw.get("touch_count", 0) or 0),
+            score=float(raw.get("score", 0.0) or 0.0),
+        )
+
+
+@dataclass
+class PriceRelation:
+    """Where the current price sits relative to one cached line."""
+    timeframe: int
+    line: Trendline
+    line_price: float
+    distance: float      # price - line_price
+    proximity: str       # "at" | "near"
+
+    def describe(self) -> str:
+        return f"{self.line.type.title()} Trendline {self.timeframe}m ({self.proximity}, dist={self.distance:.2f})"
+
+
+def set_proximity_thresholds(at: float = DEFAULT_AT_DISTANCE, near: float = DEFAULT_NEAR_DISTANCE):
+    """Distances (index points) within which price counts as 'at' / 'near' a line."""
+    global AT_DISTANCE, NEAR_DISTANCE
+    if not 0 <= at <= near:
+        raise ValueError(f"Need 0 <= at <= near, got at={at}, near={near}")
+    AT_DISTANCE, NEAR_DISTANCE = float(at), float(near)
+
+
+def proximity_of(distance: float) -> Optional[str]:
+    d = abs(distance)
+    if d <= AT_DISTANCE:
+        return "at"
+    if d <= NEAR_DISTANCE:
+        return "near"
+    return None
+
+
+def next_bar_close(now: float, timeframes: Iterable[int]) -> float:
+    """Earliest bar-close boundary after `now` across the given timeframes."""
+    return min(math.floor(now / (tf * 60) + 1) * tf * 60 for tf in timeframes)
+
+
+class TrendlineCache:
+    """Thread-safe per-timeframe trendline sets, refreshed once per bar close."""
+
+    def __init__(self, fetcher: Callable = fetch_trendlines, timeframes: Sequence[int] = DEFAULT_TIMEFRAMES,
+                 ticker: str = "@ES", clock: Callable[[], float] = global_clock.time):
+        """
+        Args:
+            fetcher: Called as fetcher(ticker=..., timeframes=[...]) and returns the
+                     data-service /trendlines response.
+            timeframes: Timeframes in minutes, all fetched in one request.
+        """
+        self._fetcher = fetcher
+        self.timeframes = tuple(timeframes)
+        self.ticker = ticker
+        self._clock = clock
+        self._lines: Dict[int, List[Trendline]] = {}
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self.fetch_count = 0
+
+    def refresh_if_due(self) -> bool:
+        """Refresh when the next bar-close boundary has passed. Returns True if a fetch ran."""
+        if self._clock() < self._next_refresh:
+            return False
+        self.refresh()
+        return True
+
+    def seconds_until_refresh(self) -> float:
+        """Time until refresh_if_due will fetch again (the next bar close, or a retry)."""
+        with self._lock:
+            return max(0.0, self._next_refresh - self._clock())
+
+    def refresh(self) -> bool:
+        """Fetch every timeframe in one request and replace the cached sets."""
+        now = self._clock()
+        self.fetch_count += 1
+        data = self._fetcher(ticker=self.ticker, timeframes=list(self.timeframes))
+        parsed = self._parse(data)
+        with self._lock:
+            if parsed:
+                self._lines = parsed
+                self._next_refresh = next_bar_close(now, self.timeframes) + BAR_CLOSE_GRACE_SECONDS
+            else:
+                # Keep serving the previous geometry and try again shortly
+                self._next_refresh = now + RETRY_SECONDS
+        return bool(parsed)
+
+    def _parse(self, data: dict) -> Dict[int, List[Trendline]]:
+        parsed = {}
+        for tf in self.timeframes:
+            tf_data = (data or {}).get("timeframes", {}).get(f"{tf}min")
+            if not tf_data:
+                continue
+            lines = []
+            for raw in tf_data.get("trendlines", []):
+                try:
+                    lines.append(Trendline.from_payload(raw, tf))
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.debug(f"Skipping malformed trendline {raw}: {e}")
+            parsed[tf] = lines
+        return parsed
+
+    def lines(self, timeframe: int) -> List[Trendline]:
+        with self._lock:
+            return list(self._lines.get(timeframe, []))
+
+    def relations(self, price: float, timeframes: Optional[Iterable[int]] = None,
+                  now: Optional[float] = None) -> List[PriceRelation]:
+        """Lines that price is at or near, closest first."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            sets = {tf: self._lines.get(tf, []) for tf in (timeframes or self.timeframes)}
+
+        found = []
+        for tf, lines in sets.items():
+            for line in lines:
+                line_price = line.price_at(now, tf)
+                distance = price - line_price
+                proximity = proximity_of(distance)
+                if proximity:
+                    found.append(PriceRelation(tf, line, line_price, distance, proximity))
+        found.sort(key=lambda r: abs(r.distance))
+        return found
+
+
+# Global singleton
+trendline_cache = TrendlineCache()
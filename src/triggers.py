@@ -1,47 +1,80 @@
 """
 Event-driven inference triggers.
-Each trigger checks a market condition and calls inference.run_inference() when criteria are met.
+Each trigger checks a market condition and submits a TRIGGER job to the
+inference executor when criteria are met.
 """
 import logging
+import threading
+from typing import Optional, Set
 
 from src.state import app_state
-from src.market import fetch_trendlines
-from src.inference import is_cooldown_active, run_inference
+from src.inference import JobPriority
+from src.executor import inference_executor
+from src.trendlines import TrendlineCache, trendline_cache
 
 logger = logging.getLogger(__name__)
 
+# Timeframes whose trendlines can trigger inference
+TRIGGER_TIMEFRAMES = (5,)
 
-def check_trendline_proximity(client):
+
+class TrendlineTrigger:
     """
-    Fetches trendlines for the 5m timeframe and triggers inference
-    if price is 'at' or 'near' any support/resistance line.
-    
-    Skips the fetch entirely if cooldown is active or inference is running,
-    to avoid unnecessary API calls.
+    Fires when price moves 'at' or 'near' a cached support/resistance line.
+    Evaluated on every price update against the cached geometry only, so it costs no
+    HTTP; the scheduler's "trendlines" job keeps the cache fresh.
+    A line fires once when price enters its proximity (or moves from near to at)
+    and re-arms after price leaves, so sitting on a line doesn't queue a trigger per tick.
+    Checks come from both the monitor and the price-stream thread, so the active set
+    is updated under a lock.
     """
-    if not app_state.is_running:
-        return
 
-    # Bail early — don't waste a trendline fetch if we can't act on it
-    if app_state.is_inference_running() or is_cooldown_active():
-        return
+    def __init__(self, cache: TrendlineCache = trendline_cache, timeframes=TRIGGER_TIMEFRAMES):
+        self.cache = cache
+        self.timeframes = tuple(timeframes)
+        self._active: Set[tuple] = set()
+        self._lock = threading.Lock()
+
+    def check(self, price: float, submit: bool = True) -> Optional[str]:
+        """
+        Returns the submitted trigger reason, if any. With submit=False the active
+        lines are still tracked but nothing fires, so a line price entered meanwhile
+        doesn't fire once submitting resumes.
+        """
+        relations = self.cache.relations(price, timeframes=self.timeframes)
+
+        active = {(r.timeframe, r.line.key, r.proximity) for r in relations}
+        with self._lock:
+            entered = [r for r in relations if (r.timeframe, r.line.key, r.proximity) not in self._active]
+            # Dropping from 'at' to 'near' is not an entry
+            entered = [r for r in entered
+                       if not (r.proximity == "near" and (r.timeframe, r.line.key, "at") in self._active)]
+            self._active = active | {(tf, key, "near") for tf, key, prox in active if prox == "at"}
+
+        if not entered or not submit:
+            return None
+        reason = "Price near Trendline: " + "; ".join(r.describe() for r in entered[:2])
+        inference_executor.submit(JobPriority.TRIGGER, reason=reason)
+        return reason
 
-    data = fetch_trendlines(timeframe=5)
-    if not data or "timeframes" not in data:
-        return
 
-    tf_data = data["timeframes"].get("5min")
-    if not tf_data or "price_relations" not in tf_data:
+# Global singleton
+trendline_trigger = TrendlineTrigger()
+
+
+def check_trendline_proximity(price: Optional[float] = None):
+    """
+    Triggers inference if price is 'at' or 'near' any 5m support/resistance line.
+
+    Doesn't fire while an inference is running — the model is already looking at
+    the market — but still tracks which lines price is at, so they don't fire when
+    the run ends. During cooldown the trigger is still queued; the executor runs it
+    once cooldown ends, merged with any other pending triggers.
+    """
+    if not app_state.is_running:
         return
 
-    # Collect lines where price is very close
-    triggers = []
-    for rel in tf_data["price_relations"]:
-        if rel["proximity"] in ("at", "near"):
-            triggers.append(
-                f"{rel['type'].title()} Trendline ({rel['proximity']}, dist={rel['distance']:.2f})"
-            )
-
-    if triggers:
-        reason = "Price near Trendline: " + "; ".join(triggers[:2])
-        run_inference(client, reason=reason)
+    price = price or app_state.last_price
+    if not price:
+        return
+    trendline_trigger.check(price, submit=not app_state.is_inference_running())
@@ -1,17 +1,68 @@
-from flask import Flask, render_template_string, request, redirect, url_for, jsonify
+import json
 import threading
+import zlib
+from flask import Flask, Response, render_template_string, request, redirect, url_for, jsonify, stream_with_context
 import logging
-import re
-import json
-from datetime import datetime
 from flask_cors import CORS
 from src.state import app_state, NY_TZ
+from src.inference import ALL_STRATEGIES, JobPriority, STRATEGY_PROMPTS
+from src.executor import inference_executor
+from src.market_context import context_stats
+from src.inference_cache import inference_cache
+from src.hedging import call_policy, latency_tracker
+from src.events import event_bus
+from src.scheduler import scheduler
+from src.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
 
 logger = logging.getLogger(__name__)
 
+# Serving modes (config "web_server"): waitress with a bounded worker pool, or Flask's dev server
+WEB_SERVER_MODES = ("production", "dev")
+# Worker threads in production mode; each open /api/events stream holds one
+DEFAULT_WEB_THREADS = 32
+# Open connections (keep-alive pollers, event streams) waitress accepts; its default is 100
+WEB_CONNECTION_LIMIT = 1000
+# Workers never given to /api/events streams in production mode, so polls and /metrics are served
+EVENT_STREAM_RESERVED_THREADS = 8
+
+# Idle /api/events connections get a comment line this often (also detects closed clients)
+EVENTS_KEEPALIVE_SECONDS = 15
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+
+class StreamSlots:
+    """
+    Caps concurrent /api/events streams (limit None = unlimited). Each stream holds a
+    waitress worker for its lifetime; clients over the cap get 503 and poll instead.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.limit is not None and self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+
+def max_event_streams(threads: int) -> int:
+    """Event streams allowed with `threads` waitress workers: all but EVENT_STREAM_RESERVED_THREADS (at most half)."""
+    return max(1, threads - min(EVENT_STREAM_RESERVED_THREADS, threads // 2))
+
+
+# Global singleton
+event_stream_slots = StreamSlots()
+
 # Filter out noisy polling logs
 class EndpointFilter(logging.Filter):
     def filter(self, record):
@@ -19,19 +70,16 @@ class EndpointFilter(logging.Filter):
         return not (
             "GET /api/status" in msg or 
             "GET /api/inference" in msg or 
-            "GET /api/auto-inference" in msg
+            "GET /api/auto-inference" in msg or
+            "GET /metrics" in msg
         )
 
 # Apply filter to werkzeug logger
 logging.getLogger("werkzeug").addFilter(EndpointFilter())
 
-# Reference to the GeminiClient, set by main.py
-_gemini_client = None
-
 def set_gemini_client(client):
-    """Set the GeminiClient instance for inference endpoints."""
-    global _gemini_client
-    _gemini_client = client
+    """Set the GeminiClient instance used by the inference executor."""
+    inference_executor.set_client(client)
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -95,144 +143,170 @@ HTML_TEMPLATE = """
 
 
         function updateStatus() {
-            fetch('/api/inference?t=' + Date.now())
+            fetch('/api/inference', { cache: 'no-cache' })
                 .then(r => r.json())
-                .then(data => {
-                    document.getElementById('status-badge').className = 'status-badge ' + data.status;
-                    document.getElementById('status-badge').textContent = data.status.toUpperCase();
-                    
-                    const isRunning = data.status === 'running';
-                    const activeStrategy = data.strategy; // 'main' or 'alt' or null
+                .then(renderInference);
+        }
+
+        function renderInference(data) {
+            document.getElementById('status-badge').className = 'status-badge ' + data.status;
+            document.getElementById('status-badge').textContent = data.status.toUpperCase();
+            
+            const isRunning = data.status === 'running';
+            const activeStrategy = data.strategy; // 'main' or 'alt' or null
+            
+            const btnRun = document.getElementById('btn-run');
+            if (btnRun) {
+                btnRun.disabled = isRunning;
+                if (isRunning && activeStrategy === 'main') {
+                    btnRun.textContent = '⟳ Running...';
+                } else {
+                    btnRun.textContent = '▶ Run';
+                }
+            }
+            
+            const btnAlt = document.getElementById('btn-run-alt');
+            if (btnAlt) {
+                btnAlt.disabled = isRunning;
+                if (isRunning && activeStrategy === 'alt') {
+                    btnAlt.textContent = '⟳ Running...';
+                } else {
+                    btnAlt.textContent = '⚡ Run Alt';
+                }
+            }
+
+            const btnAll = document.getElementById('btn-run-all');
+            if (btnAll) {
+                btnAll.disabled = isRunning;
+                if (isRunning && activeStrategy === 'all') {
+                    btnAll.textContent = '⟳ Running...';
+                } else {
+                    btnAll.textContent = '⧉ Run All';
+                }
+            }
+
+            // Per-strategy timings (shown for multi-strategy runs)
+            const strategies = data.strategies || {};
+            const timing = Object.keys(strategies).length > 1 ? Object.entries(strategies).map(([name, s]) =>
+                '<span>' + name.toUpperCase() + ': ' + (s.status === 'running' ? '⟳' :
+                    (s.status === 'error' ? '✖ ' : '') + (s.duration_seconds != null ? s.duration_seconds + 's' : '') +
+                    (s.status === 'complete' ? ' · ' + s.setups + ' setups' : '') + (s.hedged ? ' · hedged' : '')) + '</span>'
+            ).join('') : '';
+            const timingHtml = timing ? '<div style="font-size: 0.8rem; color: #8b949e; margin-bottom: 0.75rem; display: flex; gap: 1rem; flex-wrap: wrap;">' + timing +
+                (data.duration_seconds != null ? '<span>TOTAL: ' + data.duration_seconds + 's</span>' : '') + '</div>' : '';
+
+            const output = document.getElementById('output-content');
+            
+            // Show analyzing state if running and we don't have a result yet (or if we want to overwrite old result)
+            if (isRunning) {
+                 output.innerHTML = '<div style="padding: 2rem; text-align: center; color: #8b949e;"><div style="font-size: 2rem; margin-bottom: 1rem;">🧠</div><div>AI is analyzing market structure...</div><div style="font-size: 0.8rem; margin-top: 0.5rem;">Strategy: ' + (activeStrategy || 'Main').toUpperCase() + '</div></div>' + timingHtml;
+            } else if (data.result) {
+                try {
+                    const cleanJson = data.result.replaceAll('\\u0060' + '\\u0060' + '\\u0060json', '').replaceAll('\\u0060' + '\\u0060' + '\\u0060', '').trim();
+                    const parsed = JSON.parse(cleanJson);
                     
-                    const btnRun = document.getElementById('btn-run');
-                    if (btnRun) {
-                        btnRun.disabled = isRunning;
-                        if (isRunning && activeStrategy === 'main') {
-                            btnRun.textContent = '⟳ Running...';
-                        } else {
-                            btnRun.textContent = '▶ Run';
+                    if (parsed.setups && Array.isArray(parsed.setups)) {
+                        let html = timingHtml;
+                        
+                        // Display inference time and price if present
+                        if (parsed.inference_time || parsed.inference_price) {
+                            html += '<div style="font-size: 0.8rem; color: #8b949e; margin-bottom: 0.75rem; display: flex; gap: 1rem;">';
+                            if (parsed.inference_time) html += '<span>⏱️ ' + parsed.inference_time + '</span>';
+                            if (parsed.inference_price) html += '<span>💰 ' + parsed.inference_price + '</span>';
+                            html += '</div>';
                         }
-                    }
-                    
-                    const btnAlt = document.getElementById('btn-run-alt');
-                    if (btnAlt) {
-                        btnAlt.disabled = isRunning;
-                        if (isRunning && activeStrategy === 'alt') {
-                            btnAlt.textContent = '⟳ Running...';
-                        } else {
-                            btnAlt.textContent = '⚡ Run Alt';
+                        
+                        // Display market overview if present
+                        if (parsed.market_overview) {
+                            html += '<div style="background: #1c2128; border: 1px solid #30363d; border-radius: 6px; padding: 0.75rem; margin-bottom: 1rem;">';
+                            html += '<div style="font-size: 0.75rem; color: #8b949e; margin-bottom: 0.25rem;">MARKET OVERVIEW</div>';
+                            html += '<div style="color: #c9d1d9;">' + parsed.market_overview + '</div>';
+                            html += '</div>';
+                        }
+                        
+                        parsed.setups.forEach(setup => {
+                            const color = setup.direction === 'LONG' ? '#3fb950' : '#f85149';
+                            html += `
+                                <div style="background: #161b22; border: 1px solid #30363d; border-radius: 6px; padding: 1rem; margin-bottom: 1rem;">
+                                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
+                                        <h3 style="margin: 0; color: ${color};">${setup.direction} ${setup.symbol}${setup.strategy ? ' <span style="font-size: 0.75rem; color: #8b949e;">' + setup.strategy.toUpperCase() + '</span>' : ''}</h3>
+                                        <span class="status-badge" style="background: rgba(110, 118, 129, 0.2); color: #8b949e;">${setup.status || 'NEW'}</span>
+                                    </div>
+                                    <p style="margin: 0.5rem 0; color: #c9d1d9;">${setup.reasoning || ''}</p>
+                                    <div style="font-size: 0.85rem; color: #8b949e; border-top: 1px solid #30363d; padding-top: 0.5rem; margin-top: 0.5rem;">
+                                        <strong>Entry:</strong> ${setup.entry.type} @ ${setup.entry.price}<br>
+                                        <strong>Stop:</strong> ${setup.stop_loss.price}<br>
+                                        <strong>Targets:</strong> ${setup.targets.map(t => t.price).join(', ')}
+                                    </div>
+                                </div>`;
+                        });
+                        
+                        // If no setups, show a helpful message
+                        if (parsed.setups.length === 0) {
+                            html += '<div style="text-align: center; padding: 1.5rem; color: #8b949e; background: #161b22; border: 1px solid #30363d; border-radius: 6px;">';
+                            html += '<div style="font-size: 1.5rem; margin-bottom: 0.5rem;">⏸️</div>';
+                            html += '<div style="font-weight: 600; color: #c9d1d9; margin-bottom: 0.25rem;">No Trade Setups</div>';
+                            html += '<div style="font-size: 0.85rem;">AI found no high-probability entries at this time.</div>';
+                            html += '</div>';
                         }
+                        
+                        output.innerHTML = html;
+                    } else {
+                        // Fallback to JSON for readability
+                        output.innerHTML = '<pre style="font-family: Consolas; color: #e6edf3;">' + JSON.stringify(parsed, null, 2) + '</pre>';
                     }
+                } catch (e) {
+                    output.innerHTML = marked.parse(data.result);
+                }
+            } else if (data.error) {
+                output.textContent = data.error;
+                if (timingHtml) output.insertAdjacentHTML('afterbegin', timingHtml);
+                output.style.color = '#f85149';
+            }
+            
+            renderSetups(data.active_setups || []);
 
-                    const output = document.getElementById('output-content');
-                    
-                    // Show analyzing state if running and we don't have a result yet (or if we want to overwrite old result)
-                    if (isRunning) {
-                         output.innerHTML = '<div style="padding: 2rem; text-align: center; color: #8b949e;"><div style="font-size: 2rem; margin-bottom: 1rem;">🧠</div><div>AI is analyzing market structure...</div><div style="font-size: 0.8rem; margin-top: 0.5rem;">Strategy: ' + (activeStrategy || 'Main').toUpperCase() + '</div></div>';
-                    } else if (data.result) {
+            document.getElementById('last-run').textContent = data.completed_at || '-';
+            document.getElementById('completed-at').style.display = data.completed_at ? 'inline' : 'none';
+        }
+
+        function renderSetups(setups) {
+            const tbody = document.getElementById('setups-body');
+            if (tbody) {
+                tbody.innerHTML = setups.map(s => {
+                    // Extract HH:MM from created_at string if possible, else use as is
+                    let timeStr = '-';
+                    if (s.created_at) {
                         try {
-                            const cleanJson = data.result.replaceAll('\\u0060' + '\\u0060' + '\\u0060json', '').replaceAll('\\u0060' + '\\u0060' + '\\u0060', '').trim();
-                            const parsed = JSON.parse(cleanJson);
-                            
-                            if (parsed.setups && Array.isArray(parsed.setups)) {
-                                let html = '';
-                                
-                                // Display inference time and price if present
-                                if (parsed.inference_time || parsed.inference_price) {
-                                    html += '<div style="font-size: 0.8rem; color: #8b949e; margin-bottom: 0.75rem; display: flex; gap: 1rem;">';
-                                    if (parsed.inference_time) html += '<span>⏱️ ' + parsed.inference_time + '</span>';
-                                    if (parsed.inference_price) html += '<span>💰 ' + parsed.inference_price + '</span>';
-                                    html += '</div>';
-                                }
-                                
-                                // Display market overview if present
-                                if (parsed.market_overview) {
-                                    html += '<div style="background: #1c2128; border: 1px solid #30363d; border-radius: 6px; padding: 0.75rem; margin-bottom: 1rem;">';
-                                    html += '<div style="font-size: 0.75rem; color: #8b949e; margin-bottom: 0.25rem;">MARKET OVERVIEW</div>';
-                                    html += '<div style="color: #c9d1d9;">' + parsed.market_overview + '</div>';
-                                    html += '</div>';
-                                }
-                                
-                                parsed.setups.forEach(setup => {
-                                    const color = setup.direction === 'LONG' ? '#3fb950' : '#f85149';
-                                    html += `
-                                        <div style="background: #161b22; border: 1px solid #30363d; border-radius: 6px; padding: 1rem; margin-bottom: 1rem;">
-                                            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;">
-                                                <h3 style="margin: 0; color: ${color};">${setup.direction} ${setup.symbol}</h3>
-                                                <span class="status-badge" style="background: rgba(110, 118, 129, 0.2); color: #8b949e;">${setup.status || 'NEW'}</span>
-                                            </div>
-                                            <p style="margin: 0.5rem 0; color: #c9d1d9;">${setup.reasoning || ''}</p>
-                                            <div style="font-size: 0.85rem; color: #8b949e; border-top: 1px solid #30363d; padding-top: 0.5rem; margin-top: 0.5rem;">
-                                                <strong>Entry:</strong> ${setup.entry.type} @ ${setup.entry.price}<br>
-                                                <strong>Stop:</strong> ${setup.stop_loss.price}<br>
-                                                <strong>Targets:</strong> ${setup.targets.map(t => t.price).join(', ')}
-                                            </div>
-                                        </div>`;
-                                });
-                                
-                                // If no setups, show a helpful message
-                                if (parsed.setups.length === 0) {
-                                    html += '<div style="text-align: center; padding: 1.5rem; color: #8b949e; background: #161b22; border: 1px solid #30363d; border-radius: 6px;">';
-                                    html += '<div style="font-size: 1.5rem; margin-bottom: 0.5rem;">⏸️</div>';
-                                    html += '<div style="font-weight: 600; color: #c9d1d9; margin-bottom: 0.25rem;">No Trade Setups</div>';
-                                    html += '<div style="font-size: 0.85rem;">AI found no high-probability entries at this time.</div>';
-                                    html += '</div>';
-                                }
-                                
-                                output.innerHTML = html;
-                            } else {
-                                // Fallback to JSON for readability
-                                output.innerHTML = '<pre style="font-family: Consolas; color: #e6edf3;">' + JSON.stringify(parsed, null, 2) + '</pre>';
-                            }
-                        } catch (e) {
-                            output.innerHTML = marked.parse(data.result);
-                        }
-                    } else if (data.error) {
-                        output.textContent = data.error;
-                        output.style.color = '#f85149';
-                    }
-                    
-                    // Update active setups table
-                    const setups = data.active_setups || [];
-                    const tbody = document.getElementById('setups-body');
-                    if (tbody) {
-                        tbody.innerHTML = setups.map(s => {
-                            // Extract HH:MM from created_at string if possible, else use as is
-                            let timeStr = '-';
-                            if (s.created_at) {
-                                try {
-                                    const date = new Date(s.created_at);
-                                    timeStr = date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
-                                } catch (e) { timeStr = s.created_at; }
-                            }
-
-                            const rules = s.rules_text || '-';
-                            const statusColor = s.status === 'NEW' ? '#2f81f7' : 
-                                              s.status === 'TRIGGERED' ? '#3fb950' : 
-                                              s.status === 'STOPPED' ? '#f85149' : '#8b949e';
-                            
-                            const directionColor = s.direction === 'LONG' ? '#3fb950' : '#f85149';
-                            
-                            return `<tr>
-                                <td>${timeStr}</td>
-                                <td style="color: ${directionColor}">${s.symbol}</td>
-                                <td>${s.direction}</td>
-                                <td>${s.entry.price}</td>
-                                <td><span style="color: ${statusColor}">${s.status}</span></td>
-                                <td style="white-space: nowrap;" title="${rules}">${rules}</td>
-                            </tr>`;
-                        }).join('');
+                            const date = new Date(s.created_at);
+                            timeStr = date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
+                        } catch (e) { timeStr = s.created_at; }
                     }
 
-                    document.getElementById('last-run').textContent = data.completed_at || '-';
-                    document.getElementById('completed-at').style.display = data.completed_at ? 'inline' : 'none';
+                    const rules = s.rules_text || '-';
+                    const statusColor = s.status === 'NEW' ? '#2f81f7' : 
+                                      s.status === 'TRIGGERED' ? '#3fb950' : 
+                                      s.status === 'STOPPED' ? '#f85149' : '#8b949e';
                     
-                });
+                    const directionColor = s.direction === 'LONG' ? '#3fb950' : '#f85149';
+                    
+                    return `<tr>
+                        <td>${timeStr}</td>
+                        <td style="color: ${directionColor}">${s.symbol}</td>
+                        <td>${s.direction}</td>
+                        <td>${s.entry.price}</td>
+                        <td><span style="color: ${statusColor}">${s.status}</span></td>
+                        <td style="white-space: nowrap;" title="${rules}">${rules}</td>
+                    </tr>`;
+                }).join('');
+            }
         }
         
+        const RUN_BUTTONS = { main: ['btn-run', '▶ Run'], alt: ['btn-run-alt', '⚡ Run Alt'], all: ['btn-run-all', '⧉ Run All'] };
+
         function triggerInference(strategy) { 
             strategy = strategy || 'main';
-            const btnId = strategy === 'main' ? 'btn-run' : 'btn-run-alt';
+            const btnId = RUN_BUTTONS[strategy][0];
             const btn = document.getElementById(btnId);
             
             // Optimistic UI update
@@ -259,7 +333,7 @@ HTML_TEMPLATE = """
                     // Reset buttons if failed (updateStatus handles success/running)
                     if (btn) {
                         btn.disabled = false;
-                        btn.textContent = strategy === 'main' ? '▶ Run' : '⚡ Run Alt';
+                        btn.textContent = RUN_BUTTONS[strategy][1];
                     }
                 });
         }
@@ -277,17 +351,89 @@ HTML_TEMPLATE = """
             switchTab(savedTab);
             updateStatus();
             checkLiveStatus();
-            setInterval(updateStatus, 2000); // Poll inference status every 2s
-            setInterval(checkLiveStatus, 1000); // Poll live data every 1s
+            renderClock();
+            setInterval(renderClock, 1000);
+            startPolling();
+            connectEvents();
             initColumnResize();
         };
 
+        // Push channel: /api/events sends a snapshot, then versioned deltas. Polling runs only
+        // while the stream is down; EventSource reconnects by itself and resumes from Last-Event-ID.
+        let live = null;
+        let pollTimers = [];
+
+        function startPolling() {
+            if (pollTimers.length) return;
+            pollTimers = [
+                setInterval(updateStatus, 2000), // Poll inference status every 2s
+                setInterval(checkLiveStatus, 1000), // Poll live data every 1s
+            ];
+        }
+
+        function stopPolling() {
+            pollTimers.forEach(clearInterval);
+            pollTimers = [];
+        }
+
+        function connectEvents() {
+            if (!window.EventSource) return;
+            const source = new EventSource('/api/events');
+            const on = (type, handler) => source.addEventListener(type, e => handler(JSON.parse(e.data)));
+
+            on('snapshot', data => {
+                live = data;
+                stopPolling();
+                renderInference(live);
+                renderPrice(live.current_price);
+            });
+            on('inference', data => {
+                if (!live) return;
+                Object.assign(live, data);
+                renderInference(live);
+            });
+            on('strategy', data => {
+                if (!live) return;
+                live.strategies[data.strategy] = data.fields;
+                renderInference(live);
+            });
+            on('setup', setup => {
+                if (!live) return;
+                live.active_setups = [setup].concat(live.active_setups.filter(s => s.id !== setup.id))
+                    .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+                renderSetups(live.active_setups);
+            });
+            on('setup_removed', data => {
+                if (!live) return;
+                live.active_setups = live.active_setups.filter(s => s.id !== data.id);
+                renderSetups(live.active_setups);
+            });
+            on('price', data => {
+                if (live) live.current_price = data.price;
+                renderPrice(data.price);
+            });
+            source.onopen = () => { if (live) stopPolling(); };
+            source.onerror = () => {
+                startPolling();
+                // Turned away (e.g. 503 when the server is at its stream limit): retry later
+                if (source.readyState === EventSource.CLOSED) setTimeout(connectEvents, 30000);
+            };
+        }
+
+        function renderClock() {
+            document.getElementById('live-time').textContent =
+                new Date().toLocaleTimeString('en-GB', { timeZone: 'America/New_York' });
+        }
+
+        function renderPrice(price) {
+            if (price) document.getElementById('live-price').textContent = Number(price).toFixed(2);
+        }
+
         function checkLiveStatus() {
-            fetch('/api/status?t=' + Date.now())
+            fetch('/api/status', { cache: 'no-cache' })
                 .then(r => r.json())
                 .then(data => {
-                    if (data.current_time) document.getElementById('live-time').textContent = data.current_time;
-                    if (data.current_price) document.getElementById('live-price').textContent = Number(data.current_price).toFixed(2);
+                    renderPrice(data.current_price);
                 })
                 .catch(e => console.error('Live status error:', e));
         }
@@ -367,6 +513,7 @@ HTML_TEMPLATE = """
             <div class="controls">
                 <button id="btn-run" onclick="triggerInference('main')" class="btn-primary">▶ Run</button>
                 <button id="btn-run-alt" onclick="triggerInference('alt')" class="btn-secondary">⚡ Run Alt</button>
+                <button id="btn-run-all" onclick="triggerInference('all')" class="btn-secondary">⧉ Run All</button>
                 <span id="status-badge" class="status-badge idle">IDLE</span>
                 <div class="auto-controls">
                     <label>Auto:</label>
@@ -417,9 +564,35 @@ HTML_TEMPLATE = """
 def index():
     return HTML_TEMPLATE
 
+def _versioned_json(version: int, body: str, extras: dict):
+    """
+    Serve a pre-serialized state snapshot plus a few live fields with an ETag, answering
+    304 when the client's If-None-Match matches (nothing changed).
+    """
+    extra = json.dumps(extras)[1:-1]
+    if extra:
+        body = f"{body[:-1]}, {extra}}}"
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(f"{version}-{zlib.crc32(extra.encode()):08x}" if extra else str(version))
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
 @app.route("/api/status")
 def status_api():
-    return jsonify(app_state.get_snapshot())
+    version, body = app_state.get_snapshot_json()
+    return _versioned_json(version, body, {})
+
+
+@app.route("/api/jobs")
+def jobs_api():
+    """
+    Scheduler job stats, with the monitor loop's gaps under "monitor". Kept out of
+    /api/status: run counts, due times and gaps change on every pass.
+    """
+    jobs = scheduler.stats()
+    jobs.setdefault("monitor", {}).update(app_state.get_monitor_health())
+    return jsonify(jobs)
 
 @app.route("/control", methods=["POST"])
 def control():
@@ -443,9 +616,64 @@ def config():
 
 # ==================== NEW INFERENCE ENDPOINTS ====================
 
+def _inference_extras() -> dict:
+    """Executor and model-call statistics served alongside the inference snapshot."""
+    return {
+        "pending_jobs": inference_executor.pending_jobs(),
+        "context_mode": app_state.get_context_mode(),
+        "context_stats": context_stats.summary(),
+        "inference_cache": inference_cache.stats(),
+        "latency": {"hedging": call_policy.hedging, "timeout_seconds": call_policy.timeout,
+                    "strategies": latency_tracker.stats()},
+    }
+
+
 @app.route("/api/inference", methods=["GET"])
 def get_inference():
-    return jsonify(app_state.get_inference_snapshot())
+    version, body = app_state.get_inference_json()
+    return _versioned_json(version, body, _inference_extras())
+
+
+def _snapshot_frame():
+    """Full state as an SSE "snapshot" event, tagged with the bus version it reflects."""
+    seq = event_bus.seq
+    _, body = app_state.get_inference_json()
+    extra = json.dumps({**_inference_extras(), "is_running": app_state.is_running})
+    return seq, f"id: {seq}\nevent: snapshot\ndata: {body[:-1]}, {extra[1:]}\n\n"
+
+
+@app.route("/api/events")
+def stream_events():
+    """
+    Server-sent events: a snapshot, then every published change as it happens.
+    Reconnecting clients send Last-Event-ID and resume from the ring buffer;
+    if they fell too far behind they get a fresh snapshot instead.
+    """
+    if not event_stream_slots.acquire():
+        return jsonify({"error": "Too many event streams; poll /api/status instead"}), 503, {"Retry-After": "30"}
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("since")
+
+    def generate():
+        seq = int(last_id) if last_id and last_id.isdigit() else None
+        if seq is None or not event_bus.covers(seq):
+            seq, frame = _snapshot_frame()
+            yield frame
+        while True:
+            events = event_bus.wait(seq, timeout=EVENTS_KEEPALIVE_SECONDS)
+            if events is None:
+                seq, frame = _snapshot_frame()
+                yield frame
+            elif events:
+                yield "".join(e.frame for e in events)
+                seq = events[-1].seq
+            else:
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # The server closes the response when the client goes away, however far the stream got
+    response.call_on_close(event_stream_slots.release)
+    return response
 
 
 @app.route("/api/inference", methods=["POST"])
@@ -460,82 +688,19 @@ def trigger_inference():
         
     logger.info(f"Strategy selected: {strategy}")
 
-    if app_state.is_inference_running():
-        return jsonify({"error": "Inference already in progress"}), 409
-    
-    if _gemini_client is None:
+    if strategy not in STRATEGY_PROMPTS and strategy != ALL_STRATEGIES:
+        return jsonify({"error": f"Unknown strategy '{strategy}'"}), 400
+
+    if not inference_executor.has_client():
         return jsonify({"error": "GeminiClient not configured"}), 503
     
-    def run_inference_async():
-        logger.info("DEBUG: Entered run_inference_async")
-        try:
-            # Construct context header
-            now = datetime.now()
-            time_str = now.strftime("%H:%M")
-            price_str = f"{app_state.last_price:.2f}" if app_state.last_price else "Unknown"
-            context = f"Current Time: {time_str}\nCurrent Price: {price_str}"
-            
-            # Select prompt file based on strategy
-            prompt_file = "prompts/user-prompt-alt.md" if strategy == "alt" else None
-            # Note: None defaults to main prompt in GeminiClient
-            
-            context_prefix = f"Strategy: {strategy.upper()}\n{context}"
-            
-            app_state.start_inference(context=context_prefix, strategy=strategy)
-            logger.info(f"Starting inference with context: {context_prefix.replace('\\n', ', ')}")
-            
-            logger.info(f"DEBUG: Calling _gemini_client.run_inference with strategy={strategy}...")
-            result = _gemini_client.run_inference(context_header=context, prompt_path=prompt_file)
-            logger.info("DEBUG: _gemini_client.run_inference returned")
-            
-            error_patterns = ["Error", "critical error", "ModelNotFoundError", "fetch failed", "Exception"]
-            is_error = any(pattern in result for pattern in error_patterns)
-            
-            if is_error:
-                app_state.fail_inference(result)
-                logger.error(f"Inference failed (detected error keywords): {result[:500]}...")
-            else:
-                # Log the full raw result for debugging
-                logger.info(f"Raw Gemini response:\n{result}")
-
-                # Robust JSON extraction
-                clean_json = ""
-                json_match = re.search(r"```json\s*(.*?)```", result, re.DOTALL)
-                if json_match:
-                    clean_json = json_match.group(1).strip()
-                else:
-                    # Fallback: try to find start/end braces
-                    start = result.find('{')
-                    end = result.rfind('}') + 1
-                    if start != -1 and end != -1:
-                        clean_json = result[start:end]
-                    else:
-                        clean_json = result.replace("```json", "").replace("```", "").strip()
-
-                # Use cleaned JSON for frontend display if possible
-                display_result = clean_json if clean_json else result
-                app_state.complete_inference(display_result)
-                app_state.update_output(display_result)
-
-                try:
-                    from src.models import LLMResponse
-                    data = json.loads(clean_json)
-                    response = LLMResponse(**data)
-                    app_state.trade_manager.add_setups(response.setups)
-                except Exception as parse_err:
-                     logger.error(f"Failed to parse manual inference JSON: {parse_err}")
-                     logger.debug(f"Attempted to parse: {clean_json if 'clean_json' in locals() else 'N/A'}")
-
-                logger.info("Inference completed successfully")
-        except Exception as e:
-            error_msg = str(e)
-            app_state.fail_inference(error_msg)
-            logger.error(f"Inference exception: {error_msg}")
-    
-    thread = threading.Thread(target=run_inference_async, daemon=True)
-    thread.start()
-    
-    return jsonify({"message": "Inference started", "status": "running"}), 202
+    # Queued behind a running job if there is one; manual jobs run next
+    job = inference_executor.submit(JobPriority.MANUAL, strategy=strategy)
+    ahead = inference_executor.jobs_ahead(job) or 0
+    if ahead:
+        return jsonify({"message": f"Inference queued behind {ahead} job(s)", "status": "queued",
+                        "position": ahead}), 202
+    return jsonify({"message": "Inference started", "status": "running", "position": 0}), 202
 
 
 @app.route("/api/auto-inference", methods=["GET"])
@@ -551,6 +716,7 @@ def set_auto_inference():
     try:
         interval = int(data.get("interval", 0))
         app_state.set_auto_inference_interval(interval)
+        scheduler.reschedule("auto_inference")
         logger.info(f"Auto-inference interval set to {interval}s")
         return jsonify({
             "interval": app_state.get_auto_inference_interval(),
@@ -560,8 +726,34 @@ def set_auto_inference():
         return jsonify({"error": "Invalid interval value"}), 400
 
 
-def run_web_server(port=8001):
-    app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (see src.metrics)."""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def run_web_server(port=8001, mode="dev", threads=DEFAULT_WEB_THREADS, host="0.0.0.0"):
+    """
+    Serve the dashboard and API (blocks).
+
+    "production" uses waitress: connections (including idle keep-alives) are handled by
+    its event loop and requests by a fixed pool of `threads` workers. "dev" is Flask's
+    development server, which is also the fallback when waitress is not installed.
+    """
+    if mode == "production":
+        try:
+            from waitress import serve
+        except ImportError:
+            logger.warning("waitress is not installed — falling back to the Flask development server")
+        else:
+            event_stream_slots.limit = max_event_streams(threads)
+            logger.info(f"Serving on {host}:{port} with waitress ({threads} threads, "
+                        f"up to {event_stream_slots.limit} event streams)")
+            serve(app, host=host, port=port, threads=threads, ident=None,
+                  connection_limit=WEB_CONNECTION_LIMIT, backlog=WEB_CONNECTION_LIMIT)
+            return
+    app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+
 
 if __name__ == "__main__":
     run_web_server()
@@ -0,0 +1,93 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+from src.backtest import Bars, _BlockIndex, run_backtest
+from src.intrabar import bar_points
+from src.models import TradeStatus
+from src.trade_manager import TradeManager
+from benchmarks.fixtures import make_setup, random_setups
+
+NY_TZ = pytz.timezone('America/New_York')
+T0 = NY_TZ.localize(datetime(2024, 3, 4, 9, 30))
+
+def synthetic_bars(n, seed=3, start=5000.0):
+    rng = np.random.default_rng(seed)
+    close = np.round((start + np.cumsum(rng.normal(0, 1.2, n))) * 4) / 4
+    open_ = np.concatenate([[start], close[:-1]])
+    high = np.maximum(open_, close) + np.round(rng.exponential(0.6, n) * 4) / 4
+    low = np.minimum(open_, close) - np.round(rng.exponential(0.6, n) * 4) / 4
+    time = T0.timestamp() + 60.0 * np.arange(n)
+    return Bars(time, open_, high, low, close)
+
+class TestBacktest(unittest.TestCase):
+
+    def test_block_index_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        values = rng.normal(0, 1, 1000)
+        index = _BlockIndex(values)
+        start = rng.integers(0, 1000, 500)
+        end = np.minimum(1000, start + rng.integers(0, 400, 500))
+        x = rng.normal(-1.5, 1, 500)
+
+        first = index.first_le(start, end, x)
+        low = index.range_min(start, end)
+        for i in range(500):
+            hits = np.flatnonzero(values[start[i]:end[i]] <= x[i])
+            self.assertEqual(first[i], start[i] + hits[0] if hits.size else end[i])
+            expected = values[start[i]:end[i]].min() if end[i] > start[i] else np.inf
+            self.assertEqual(low[i], expected)
+
+    def test_matches_trade_manager_replay(self):
+        """Final statuses equal feeding every intrabar point through TradeManager."""
+        bars = synthetic_bars(600)
+        rng = random.Random(5)
+        setups = random_setups(rng, 200)
+        for s in setups:
+            s.created_at = T0 + timedelta(minutes=rng.randint(0, 500))
+
+        result = run_backtest(setups, bars, order="nearest", max_age_minutes=None)
+        points = bar_points(bars.open, bars.high, bars.low, bars.close, "nearest")
+
+        for i, setup in enumerate(setups):
+            manager = TradeManager()
+            manager.add_setups([setup.model_copy(deep=True)])
+            start = int(np.searchsorted(bars.time, setup.created_at.timestamp()))
+            for p in points[start:].ravel():
+                manager.update_setups(float(p))
+            expected = manager.setups[setup.id].status
+            self.assertEqual(result.to_records()[i]["status"], expected.value, setup.id)
+
+    def test_fill_exit_excursions(self):
+        # LONG 5000 / stop 4990 / target 5010, created before the first bar
+        bars = Bars(
+            time=T0.timestamp() + 60.0 * np.arange(4),
+            open=np.array([5005.0, 5002.0, 4998.0, 5004.0]),
+            high=np.array([5006.0, 5003.0, 5004.0, 5012.0]),
+            low=np.array([5001.0, 4999.0, 4995.0, 5003.0]),
+            close=np.array([5002.0, 4998.0, 5004.0, 5011.0]),
+        )
+        setup = make_setup("long", "LONG", 5000.0, 4990.0, [5010.0, 5020.0])
+        setup.created_at = T0 - timedelta(seconds=1)
+        record = run_backtest([setup], bars, order="ohlc").to_records()[0]
+
+        self.assertEqual(record["status"], TradeStatus.PROFIT.value)
+        self.assertEqual(record["fill_time"], bars.time[1])
+        self.assertEqual(record["fill_price"], 5000.0)
+        self.assertEqual(record["exit_time"], bars.time[3])
+        self.assertEqual(record["exit_price"], 5010.0)
+        self.assertEqual(record["mae"], 5.0)
+        self.assertEqual(record["mfe"], 10.0)
+        self.assertEqual(record["r_multiple"], 1.0)
+
+    def test_expiry_cancels_unfilled(self):
+        bars = synthetic_bars(120)
+        setup = make_setup("far", "LONG", 4000.0, 3990.0, [4010.0])
+        setup.created_at = T0
+        record = run_backtest([setup], bars, max_age_minutes=30).to_records()[0]
+        self.assertEqual(record["status"], TradeStatus.CANCELED.value)
+        self.assertIsNone(record["fill_time"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import time
+import unittest
+import numpy as np
+from src.bar_store import BarRing, BarStore
+
+class FakeFeed:
+    """Serves 1-minute bars up to `now`, recording each bars_back requested."""
+
+    def __init__(self, now):
+        self.now = now
+        self.requests = []
+
+    def bars(self, ticker, timeframe, bars_back):
+        self.requests.append(bars_back)
+        last_open = int(self.now // 60) * 60
+        opens = [last_open - 60 * i for i in range(bars_back)][::-1]
+        return [{"timestamp": t, "open": t / 60, "high": t / 60 + 1, "low": t / 60 - 1,
+                 "close": t / 60 + (self.now - t) / 60, "volume": 10} for t in opens]
+
+class TestBarStore(unittest.TestCase):
+
+    def test_ring_wraps_and_replaces_forming_bar(self):
+        ring = BarRing(capacity=3)
+        for t in range(5):
+            ring.upsert((t, 1, 2, 0, t, 0))
+        np.testing.assert_array_equal(ring.tail()[0], [2, 3, 4])
+
+        ring.upsert((4, 1, 3, 0, 9, 0))      # forming bar update
+        self.assertFalse(ring.upsert((1, 1, 1, 1, 1, 0)))  # stale
+        np.testing.assert_array_equal(ring.tail()[4], [2, 3, 9])
+        self.assertEqual(ring.last_time(), 4)
+
+    def test_incremental_refresh(self):
+        now = time.time()
+        feed = FakeFeed(now)
+        store = BarStore(fetcher=feed.bars, capacity=100)
+
+        self.assertEqual(store.refresh(), 100)  # backfill
+        self.assertEqual(feed.requests, [100])
+
+        # Same minute: only the forming bar is re-requested
+        store.refresh()
+        self.assertEqual(feed.requests[-1], 1)
+
+        self.assertEqual(len(store.window()), 100)
+        self.assertEqual(store.latest_close(), feed.bars("@ES", 1, 1)[-1]["close"])
+        recent = store.recent_bars(count=2)
+        self.assertEqual([b["timestamp"] for b in recent], [int(now // 60) * 60 - 60, int(now // 60) * 60])
+
+    def test_gap_is_backfilled(self):
+        feed = FakeFeed(time.time() - 600)
+        store = BarStore(fetcher=feed.bars, capacity=50)
+        store.refresh()
+
+        # Our request sizing thinks little time passed, but the feed moved 10 minutes ahead
+        feed.now += 600
+        store._fetcher = lambda ticker, timeframe, bars_back: feed.bars(ticker, timeframe, bars_back if bars_back > 11 else 2)
+        store.refresh()
+        times = store.window().time
+        self.assertTrue(np.all(np.diff(times) == 60))
+
+    def test_empty_store(self):
+        store = BarStore(fetcher=lambda *args: [])
+        store.refresh()
+        self.assertEqual(store.latest_close(), 0.0)
+        self.assertEqual(len(store.window()), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,9 +12,8 @@ class TestMarketDaemon(unittest.TestCase):
         ny_tz = pytz.timezone('America/New_York')
         mock_now = datetime(2023, 10, 23, 10, 0, 0) # Oct 23 2023 is Monday
         
-        with patch('src.market.datetime') as mock_date:
-            mock_date.now.return_value = ny_tz.localize(mock_now)
-            mock_date.side_effect = lambda *args, **kw: datetime(*args, **kw)
+        with patch('src.market.clock') as mock_clock:
+            mock_clock.now.return_value = ny_tz.localize(mock_now)
             self.assertTrue(is_market_open())
 
     def test_market_hours_closed_weekend(self):
@@ -22,8 +21,8 @@ class TestMarketDaemon(unittest.TestCase):
         ny_tz = pytz.timezone('America/New_York')
         mock_now = datetime(2023, 10, 21, 10, 0, 0) # Oct 21 2023 is Saturday
         
-        with patch('src.market.datetime') as mock_date:
-            mock_date.now.return_value = ny_tz.localize(mock_now)
+        with patch('src.market.clock') as mock_clock:
+            mock_clock.now.return_value = ny_tz.localize(mock_now)
             self.assertFalse(is_market_open())
 
     def test_market_hours_closed_evening(self):
@@ -31,8 +30,8 @@ class TestMarketDaemon(unittest.TestCase):
         ny_tz = pytz.timezone('America/New_York')
         mock_now = datetime(2023, 10, 23, 18, 0, 0)
         
-        with patch('src.market.datetime') as mock_date:
-            mock_date.now.return_value = ny_tz.localize(mock_now)
+        with patch('src.market.clock') as mock_clock:
+            mock_clock.now.return_value = ny_tz.localize(mock_now)
             self.assertFalse(is_market_open())
 
     def test_state_updates(self):
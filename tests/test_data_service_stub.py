@@ -0,0 +1,126 @@
+import threading
+import unittest
+from unittest.mock import patch
+import numpy as np
+from werkzeug.serving import make_server
+from src import market
+from src.clock import VirtualClock, clock
+from src.data_service_stub import FaultInjector, MarketRegistry, create_app
+from src.synthetic_market import SyntheticMarket, TICK_SIZE
+from src.trendlines import TrendlineCache
+
+T0 = 1_710_250_200.0  # 2024-03-12 09:30 ET
+
+class TestSyntheticMarket(unittest.TestCase):
+
+    def setUp(self):
+        self.virtual = VirtualClock(T0 + 90)
+        self.market = SyntheticMarket(seed=3, start_time=T0, clock=self.virtual.time)
+
+    def test_same_seed_same_path(self):
+        other = SyntheticMarket(seed=3, start_time=T0, clock=self.virtual.time)
+        self.assertEqual(self.market.bars(1, 500), other.bars(1, 500))
+        self.assertNotEqual(self.market.bars(1, 500), SyntheticMarket(seed=4, start_time=T0).bars(1, 500, now=T0 + 90))
+
+    def test_bars_are_consistent_across_timeframes(self):
+        minutes = self.market.bars(1, 3000)
+        self.assertEqual(len(minutes), 3000)
+        for bar in minutes:
+            self.assertLessEqual(bar["low"], min(bar["open"], bar["close"]))
+            self.assertGreaterEqual(bar["high"], max(bar["open"], bar["close"]))
+            self.assertEqual(bar["close"] % TICK_SIZE, 0)
+        # The forming bar shows only the ticks elapsed so far
+        self.assertEqual(minutes[-1]["timestamp"], T0 + 60)
+        self.assertEqual(minutes[-1]["close"], self.market.tick()[0])
+
+        fives = self.market.bars(5, 10)
+        self.assertEqual(len(fives), 10)
+        last = [b for b in minutes if b["timestamp"] >= fives[-2]["timestamp"]][:5]
+        self.assertEqual(fives[-2]["open"], last[0]["open"])
+        self.assertEqual(fives[-2]["close"], last[-1]["close"])
+        self.assertEqual(fives[-2]["high"], max(b["high"] for b in last))
+        self.assertEqual(fives[-2]["low"], min(b["low"] for b in last))
+
+    def test_path_has_regimes_gaps_and_wicks(self):
+        self.market.bars(1, 1)
+        self.assertGreater(len(set(self.market._regime_of)), 2)
+        self.assertGreater(self.market.gaps, 0)
+        self.assertGreater(self.market.wicks, 0)
+        closes = np.array([b["close"] for b in self.market.bars(1, 3000)])
+        self.assertLess(abs(np.log(closes[-1] / closes[0])), 0.2)
+
+    def test_trendlines_follow_the_cache_contract(self):
+        data = self.market.trendlines(5, 200)
+        self.assertTrue(data["trendlines"])
+        lines = {line["type"] for line in data["trendlines"]}
+        self.assertEqual(lines, {"support", "resistance"})
+        relations = data["price_relations"]
+        self.assertEqual(len(relations), len(data["trendlines"]))
+        self.assertEqual(relations, sorted(relations, key=lambda r: abs(r["distance"])))
+        for rel in relations:
+            self.assertIn(rel["proximity"], ("at", "near", "far"))
+
+class TestDataServiceStub(unittest.TestCase):
+    """Drives src.market's HTTP layer against the stub."""
+
+    def setUp(self):
+        self.virtual = VirtualClock(T0 + 90)
+        self.previous_clock = clock.install(self.virtual)
+        self.faults = FaultInjector(seed=1)
+        self.app = create_app(MarketRegistry(seed=5, start_time=T0), self.faults)
+        self.server = make_server("127.0.0.1", 0, self.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = patch.object(market, "DATA_SERVICE_BASE", f"http://127.0.0.1:{self.server.server_port}")
+        url.start()
+        self.addCleanup(url.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        clock.install(self.previous_clock)
+
+    def stats(self):
+        return self.app.test_client().get("/stub/stats").get_json()
+
+    def test_bars_and_current_price(self):
+        bars = market.fetch_bars("@ES", timeframe=1, bars_back=2000)
+        self.assertEqual(len(bars), 2000)
+        self.assertEqual(market.bar_time(bars[-1]), T0 + 60)
+        self.assertEqual(market.fetch_current_price("@ES"), bars[-1]["close"])
+        self.assertEqual(len(market.fetch_bars("@ES", timeframe=15, bars_back=20)), 20)
+
+    def test_bar_polls_retry_injected_errors(self):
+        self.faults.configure(fail_next=2)
+        self.assertEqual(len(market.fetch_bars("@ES", bars_back=5)), 5)
+        counts = self.stats()["counts"]
+        self.assertEqual(counts["requests.bars"], 3)
+        self.assertEqual(counts["errors.bars"], 2)
+
+        # More failures than Retry(total=3) allows
+        self.faults.configure(fail_next=4)
+        self.assertEqual(market.fetch_bars("@ES"), [])
+
+    def test_trendline_posts_are_not_retried(self):
+        self.faults.configure(fail_next=1)
+        self.assertEqual(market.fetch_trendlines(timeframes=[5, 15]), {})
+        self.assertEqual(self.stats()["counts"]["requests.trendlines"], 1)
+
+    def test_trendline_cache_matches_stub_relations(self):
+        cache = TrendlineCache(fetcher=market.fetch_trendlines, clock=self.virtual.time)
+        self.assertTrue(cache.refresh())
+        data = market.fetch_trendlines(timeframes=[5])["timeframes"]["5min"]
+        self.assertEqual(len(cache.lines(5)), len(data["trendlines"]))
+
+        price = data["current_price"]
+        expected = sorted((r["proximity"], round(r["distance"], 1)) for r in data["price_relations"]
+                          if r["proximity"] != "far")
+        found = sorted((r.proximity, round(r.distance, 1)) for r in cache.relations(price, timeframes=[5]))
+        self.assertEqual(found, expected)
+
+    def test_fault_settings_endpoint(self):
+        client = self.app.test_client()
+        self.assertEqual(client.post("/stub/faults", json={"error_rate": 1.0}).get_json()["error_rate"], 1.0)
+        self.assertEqual(client.get("/bars/@ES").status_code, 503)
+        self.assertEqual(client.post("/stub/faults", json={"bogus": 1}).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
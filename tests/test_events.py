@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+import unittest
+from src.events import EventBus, event_bus
+from src.models import TradeStatus
+from src.state import app_state
+from src.trade_manager import TradeManager
+from src.web_server import app
+from benchmarks.fixtures import make_setup
+
+def parse_frames(text):
+    frames = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if fields:
+            frames.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return frames
+
+class TestEventBus(unittest.TestCase):
+
+    def test_wait_returns_events_after_seq(self):
+        bus = EventBus(capacity=3)
+        self.assertEqual(bus.wait(0, timeout=0.01), [])
+        for i in range(3):
+            bus.publish("price", {"price": i})
+        self.assertEqual([e.seq for e in bus.wait(1, timeout=0)], [2, 3])
+        self.assertIn('data: {"price": 1}', bus.wait(1, timeout=0)[0].frame)
+
+        bus.publish("price", {"price": 3})  # evicts seq 1
+        self.assertTrue(bus.covers(1))
+        self.assertIsNone(bus.wait(0, timeout=0))  # reader fell behind the ring
+        self.assertIsNone(bus.wait(99, timeout=0))  # id from another server run
+
+    def test_wait_wakes_on_publish(self):
+        bus = EventBus()
+        threading.Timer(0.05, bus.publish, args=("daemon", {"is_running": True})).start()
+        t0 = time.monotonic()
+        events = bus.wait(0, timeout=5)
+        self.assertLess(time.monotonic() - t0, 2)
+        self.assertEqual(events[0].type, "daemon")
+
+class TestSetupListener(unittest.TestCase):
+
+    def test_add_transition_and_prune_are_reported(self):
+        manager = TradeManager()
+        changes = []
+        manager.add_listener(lambda kind, setup: changes.append((kind, setup.id, setup.status)))
+        manager.add_setups([make_setup("a", "LONG", 5000.0, 4990.0, [5010.0])])
+        manager.update_setups(5020.0)  # NEW -> MONITORING
+        manager.update_setups(5020.0)  # no change, no event
+        manager.update_setups_path([5001.0, 4999.0])  # -> TRADING
+        manager.prune_backlog(max_age_minutes=-1)
+        self.assertEqual(changes, [("added", "a", TradeStatus.NEW), ("status", "a", TradeStatus.MONITORING),
+                                   ("status", "a", TradeStatus.TRADING), ("removed", "a", TradeStatus.TRADING)])
+
+class TestEventsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_snapshot_then_deltas(self):
+        response = self.client.get('/api/events')
+        it = iter(response.response)
+        seq, kind, snapshot = parse_frames(next(it).decode())[0]
+        self.assertEqual(kind, "snapshot")
+        self.assertEqual(seq, event_bus.seq)
+        self.assertIn("active_setups", snapshot)
+
+        app_state.set_price(4321.25)
+        app_state.trade_manager.add_setups([make_setup("evt", "SHORT", 5000.0, 5010.0, [4990.0])])
+        frames = []
+        while len(frames) < 2:
+            frames += parse_frames(next(it).decode())
+        response.close()
+        self.assertEqual([(f[1], f[0]) for f in frames], [("price", seq + 1), ("setup", seq + 2)])
+        self.assertEqual(frames[1][2]["id"], "evt")
+        app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+
+    def test_resume_from_last_event_id(self):
+        seq = event_bus.publish("daemon", {"is_running": False})
+        event_bus.publish("price", {"price": 1.0})
+        response = self.client.get('/api/events', headers={"Last-Event-ID": str(seq)})
+        frames = parse_frames(next(iter(response.response)).decode())
+        response.close()
+        self.assertEqual(frames[0][:2], (seq + 1, "price"))
+
+if __name__ == '__main__':
+    unittest.main()
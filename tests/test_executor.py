@@ -0,0 +1,133 @@
+import threading
+import time
+from src.executor import InferenceExecutor
+from src.inference import JobPriority
+from src.clock import VirtualClock, clock
+from src.scheduler import Job, Scheduler
+from src.state import DaemonState
+
+def _wait_idle(executor, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while executor.is_busy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not executor.is_busy()
+
+def test_submit_runs_off_caller_thread():
+    """Jobs execute on the executor thread, not the caller's."""
+    seen = {}
+    done = threading.Event()
+
+    def runner(client, job):
+        seen["thread"] = threading.current_thread().name
+        done.set()
+
+    executor = InferenceExecutor(runner=runner, cooldown=lambda: 0.0)
+    executor.submit(JobPriority.SCHEDULED)
+    assert done.wait(1.0)
+    assert seen["thread"] == "inference-executor"
+
+def test_submit_does_not_block_while_job_in_flight():
+    """A slow job must not block the submitting (monitor) thread."""
+    release = threading.Event()
+    executor = InferenceExecutor(runner=lambda client, job: release.wait(), cooldown=lambda: 0.0)
+
+    start = time.monotonic()
+    executor.submit(JobPriority.SCHEDULED)
+    executor.submit(JobPriority.TRIGGER, reason="near support")
+    assert time.monotonic() - start < 0.1
+    assert executor.is_busy()
+
+    release.set()
+    assert _wait_idle(executor)
+
+def test_priority_order_and_coalescing():
+    """Pending jobs run highest priority first; same-strategy requests merge."""
+    release = threading.Event()
+    ran = []
+
+    def runner(client, job):
+        if not ran:
+            release.wait()
+        ran.append((job.priority, job.strategy, list(job.reasons)))
+
+    executor = InferenceExecutor(runner=runner, cooldown=lambda: 0.0)
+    executor.submit(JobPriority.SCHEDULED, strategy="alt")  # occupies the worker
+    time.sleep(0.05)
+
+    executor.submit(JobPriority.SCHEDULED)
+    executor.submit(JobPriority.TRIGGER, reason="support at 5000")
+    executor.submit(JobPriority.TRIGGER, reason="resistance at 5010")
+    executor.submit(JobPriority.TRIGGER, reason="support at 5000")
+    executor.submit(JobPriority.MANUAL, strategy="alt")
+
+    pending = executor.pending_jobs()
+    assert [p["strategy"] for p in pending] == ["alt", "main"]
+    assert pending[1]["priority"] == "trigger"
+    assert pending[1]["reasons"] == ["support at 5000", "resistance at 5010"]
+
+    release.set()
+    assert _wait_idle(executor)
+    assert ran[1] == (JobPriority.MANUAL, "alt", [])
+    assert ran[2] == (JobPriority.TRIGGER, "main", ["support at 5000", "resistance at 5010"])
+
+def test_trigger_during_cooldown_is_deferred():
+    """Non-manual jobs wait out the cooldown; manual jobs bypass it."""
+    cooldown_until = time.monotonic() + 0.2
+    ran = []
+    executor = InferenceExecutor(
+        runner=lambda client, job: ran.append((job.priority, time.monotonic())),
+        cooldown=lambda: max(0.0, cooldown_until - time.monotonic()),
+    )
+
+    executor.submit(JobPriority.TRIGGER, reason="near support")
+    executor.submit(JobPriority.MANUAL, strategy="alt")
+    assert _wait_idle(executor, timeout=2.0)
+
+    assert ran[0][0] == JobPriority.MANUAL
+    assert ran[0][1] < cooldown_until
+    assert ran[1][0] == JobPriority.TRIGGER
+    assert ran[1][1] >= cooldown_until
+
+def test_monitor_gap_tracking():
+    state = DaemonState()
+    state.record_monitor_tick()
+    time.sleep(0.05)
+    state.record_monitor_tick()
+    state.record_monitor_tick()
+
+    snapshot = state.get_snapshot()
+    assert state.monitor_gap_max >= 0.05
+    assert state.monitor_gap_last < state.monitor_gap_max
+    assert snapshot["monitor_gap_max"] == round(state.monitor_gap_max, 2)
+
+def test_parked_or_stopped_time_is_not_a_monitor_gap():
+    virtual = VirtualClock(1_000_000.0)
+    previous = clock.install(virtual)
+    try:
+        state = DaemonState()
+        until_open = [0.0]
+        sched = Scheduler(clock=clock.monotonic, until_open=lambda: until_open[0])
+        sched.add(Job("monitor", state.record_monitor_tick, 5, market_hours=True,
+                      on_park=state.reset_monitor_tick))
+        sched.run_pending()
+        virtual.advance(5)
+        sched.run_pending()
+        assert state.monitor_gap_max == 5
+
+        # Overnight: the job parks until the open, 17.5h later
+        virtual.advance(5)
+        until_open[0] = 17.5 * 3600
+        sched.run_pending()
+        virtual.advance(until_open[0])
+        until_open[0] = 0.0
+        sched.run_pending()
+        virtual.advance(5)
+        sched.run_pending()
+        assert state.monitor_gap_max == 5
+
+        state.set_running(False)
+        virtual.advance(600)
+        state.record_monitor_tick()
+        assert state.monitor_gap_max == 5
+    finally:
+        clock.install(previous)
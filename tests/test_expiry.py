@@ -0,0 +1,92 @@
+import random
+import time
+import unittest
+from datetime import datetime, timedelta
+from src.expiry import ExpiryQueue
+from src.models import NY_TZ, TradeStatus
+from src.trade_manager import TradeManager
+from benchmarks.fixtures import make_setup, random_setups
+
+def aged(setup, minutes):
+    setup.created_at = datetime.now(NY_TZ) - timedelta(minutes=minutes)
+    return setup
+
+class TestExpiryQueue(unittest.TestCase):
+
+    def test_pops_only_due_keys_in_deadline_order(self):
+        queue = ExpiryQueue()
+        for key, deadline in (("c", 30.0), ("a", 10.0), ("b", 20.0), ("d", 40.0)):
+            queue.schedule(key, deadline)
+        self.assertEqual(queue.pop_due(25.0), ["a", "b"])
+        self.assertEqual(queue.pop_due(25.0), [])
+        self.assertEqual(len(queue), 2)
+
+    def test_reschedule_and_discard_invalidate_old_entries(self):
+        queue = ExpiryQueue()
+        queue.schedule("moved", 10.0)
+        queue.schedule("moved", 50.0)
+        queue.schedule("gone", 10.0)
+        queue.discard("gone")
+        queue.schedule("forever", 10.0)
+        queue.schedule("forever", None)
+        self.assertEqual(queue.pop_due(20.0), [])
+        self.assertEqual(queue.pop_due(60.0), ["moved"])
+
+    def test_stale_entries_are_compacted(self):
+        queue = ExpiryQueue()
+        for i in range(1000):
+            queue.schedule("k", float(i))
+        self.assertLess(len(queue._heap), 200)
+        self.assertEqual(queue.deadline("k"), 999.0)
+
+class TestSetupExpiry(unittest.TestCase):
+
+    def test_matches_full_scan(self):
+        rng = random.Random(3)
+        manager = TradeManager()
+        setups = [aged(s, rng.uniform(0, 60)) for s in random_setups(rng, 500)]
+        manager.add_setups(setups)
+        manager.prune_backlog(max_age_minutes=30)
+        now = datetime.now(NY_TZ)
+        expected = {s.id for s in setups if now - s.created_at <= timedelta(minutes=30)}
+        self.assertEqual({s.id for s in manager.get_active_setups()}, expected)
+
+    def test_trading_setups_never_expire_until_they_close(self):
+        manager = TradeManager()
+        manager.set_expiry_policy(30, {"TRADING": None})
+        manager.add_setups([aged(make_setup("filled", "LONG", 5000.0, 4990.0, [5010.0]), 45),
+                            aged(make_setup("waiting", "LONG", 4950.0, 4940.0, [4960.0]), 45)])
+        manager.update_setups(5000.0)  # "filled" enters the trade
+        manager.prune_backlog()
+        self.assertEqual([s.id for s in manager.get_active_setups()], ["filled"])
+
+        manager.update_setups(5010.0)  # target hit: back on the default TTL, which has passed
+        manager.prune_backlog()
+        self.assertEqual(manager.get_active_setups(), [])
+
+    def test_max_age_override_applies_to_one_call(self):
+        manager = TradeManager()
+        manager.add_setups([aged(make_setup("old", "LONG", 5000.0, 4990.0, [5010.0]), 20),
+                            aged(make_setup("stale", "LONG", 4950.0, 4940.0, [4960.0]), 40)])
+        manager.prune_backlog(max_age_minutes=60)  # longer than the policy: "stale" survives this call
+        self.assertEqual({s.id for s in manager.get_active_setups()}, {"old", "stale"})
+        self.assertEqual(manager.max_age_minutes, 30)
+        manager.prune_backlog(max_age_minutes=10)
+        self.assertEqual(manager.get_active_setups(), [])
+
+        manager.add_setups([aged(make_setup("fresh", "LONG", 5000.0, 4990.0, [5010.0]), 20)])
+        manager.prune_backlog()  # back on the 30-minute policy
+        self.assertEqual([s.id for s in manager.get_active_setups()], ["fresh"])
+
+    def test_prune_cost_scales_with_expirations(self):
+        manager = TradeManager()
+        manager.add_setups(random_setups(random.Random(5), 20000))
+        start = time.perf_counter()
+        for _ in range(1000):
+            manager.prune_backlog()
+        # A full scan of 20k setups per call would take seconds here
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(len(manager.setups), 20000)
+
+if __name__ == '__main__':
+    unittest.main()
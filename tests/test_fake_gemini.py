@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from src.fake_gemini import TranscriptStore, sample_latency, save_transcript, template_key
+from src.gemini_client import GEMINI_CLI_ENV, GeminiClient
+
+FAKE_CLI = f'"{sys.executable}" -m src.fake_gemini'
+
+class TestTranscripts(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_lookup_by_prompt_then_template(self):
+        prompt = "Current Time: 10:30\nCurrent Price: 5000.25\n\nFind setups."
+        save_transcript(self.dir, prompt, [(0.5, "hello\n")], [], 0, 0.6)
+        store = TranscriptStore(self.dir)
+        rng = random.Random(0)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.find(prompt, rng)["stdout"], [[0.5, "hello\n"]])
+        # Same template at another time and price
+        later = "Current Time: 11:05\nCurrent Price: 5012.75\n\nFind setups."
+        self.assertEqual(template_key(later), template_key(prompt))
+        self.assertIsNotNone(store.find(later, rng))
+        self.assertIsNone(store.find("Something else entirely", rng))
+
+    def test_latency_specs(self):
+        rng = random.Random(0)
+        self.assertIsNone(sample_latency("recorded", rng))
+        self.assertEqual(sample_latency("fixed:0.25", rng), 0.25)
+        self.assertTrue(1 <= sample_latency("uniform:1:2", rng) <= 2)
+        self.assertGreater(sample_latency("lognormal:2:0.5", rng), 0)
+        with self.assertRaises(ValueError):
+            sample_latency("pareto:1", rng)
+
+class TestFakeCli(unittest.TestCase):
+    """GeminiClient running src.fake_gemini through the GEMINI_CLI override."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.prompt = Path(self.dir) / "prompt.md"
+        self.prompt.write_text("Find setups.", encoding="utf-8")
+
+    def run_client(self, env: dict, record_dir=None, **kwargs) -> str:
+        with patch.dict(os.environ, {GEMINI_CLI_ENV: FAKE_CLI, **env}):
+            client = GeminiClient(user_prompt_path=str(self.prompt), record_dir=record_dir)
+            return client.run_inference(context_header="Current Price: 5000.00", **kwargs)
+
+    def test_record_then_replay(self):
+        record_dir = Path(self.dir) / "transcripts"
+        lines = []
+        recorded = self.run_client({"FAKE_GEMINI_STDERR_LINES": "2"}, record_dir=str(record_dir), on_line=lines.append)
+        setups = json.loads(recorded.split("```json")[1].split("```")[0])["setups"]
+        self.assertEqual([s["entry"]["price"] for s in setups], [4996.0, 5004.0])
+        self.assertEqual("".join(lines), recorded)
+
+        [path] = record_dir.glob("*.json")
+        transcript = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual(transcript["returncode"], 0)
+        self.assertEqual(len(transcript["stderr"]), 2)  # noise is recorded but not part of the result
+
+        replayed = self.run_client({"FAKE_GEMINI_TRANSCRIPTS": str(record_dir), "FAKE_GEMINI_FALLBACK": "error"})
+        self.assertEqual(replayed, recorded)
+
+    def test_missing_transcript_without_fallback_fails(self):
+        result = self.run_client({"FAKE_GEMINI_TRANSCRIPTS": self.dir, "FAKE_GEMINI_FALLBACK": "error"})
+        self.assertEqual(result, "Error: Gemini CLI failed with code 1")
+
+    def test_injected_failures(self):
+        failed = self.run_client({"FAKE_GEMINI_FAILURE_RATE": "1", "FAKE_GEMINI_FAILURE_MODES": "exit"})
+        self.assertEqual(failed, "Error: Gemini CLI failed with code 1")
+        hung = self.run_client({"FAKE_GEMINI_FAILURE_RATE": "1", "FAKE_GEMINI_FAILURE_MODES": "hang"}, timeout=1)
+        self.assertEqual(hung, "Error: Gemini CLI timed out after 1s")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from src.gemini_client import GeminiClient
+from src.gemini_pool import GeminiProcessPool
+from tests.test_hedging import alive
+
+# Echoes the prompt length and its own pid; exits with an error for prompts starting with "fail"
+ECHO = [sys.executable, "-c",
+        "import os, sys; p = sys.stdin.read(); print(len(p), os.getpid()); sys.exit(3 if p.startswith('fail') else 0)"]
+
+# A standby that went bad: starts a grandchild, closes its stdin and hangs
+BROKEN = [sys.executable, "-c",
+          "import os, subprocess, sys, time\n"
+          "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'], stdin=subprocess.DEVNULL)\n"
+          "print(child.pid, flush=True); os.close(0); time.sleep(60)"]
+
+def run_job(process, prompt):
+    process.stdin.write(prompt)
+    process.stdin.close()
+    out = process.stdout.read()
+    process.wait()
+    return out
+
+class TestGeminiProcessPool(unittest.TestCase):
+
+    def test_warm_then_replaced(self):
+        pool = GeminiProcessPool(ECHO, size=1)
+        pool.fill()
+        standby = pool._idle[0][0]
+        process, warm = pool.acquire()
+        self.assertTrue(warm)
+        self.assertIs(process, standby)
+        self.assertEqual(run_job(process, "abc").split()[0], "3")
+        # A fresh standby was started for the next job
+        self.assertEqual(pool.stats()["idle"], 1)
+        self.assertIsNot(pool._idle[0][0], standby)
+        pool.close()
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_dead_or_stale_standby_is_recycled(self):
+        pool = GeminiProcessPool(ECHO, size=1)
+        pool.fill()
+        run_job(pool._idle[0][0], "x")  # standby exits on its own
+        process, warm = pool.acquire()
+        self.assertFalse(warm)
+        self.assertEqual(pool.discarded, 1)
+        run_job(process, "x")
+
+        pool.max_idle_seconds = 0.05
+        time.sleep(0.1)
+        pool.fill()
+        self.assertEqual(pool.discarded, 2)
+        self.assertEqual(pool.stats()["idle"], 1)
+        pool.close()
+
+    def test_cold_when_size_zero(self):
+        pool = GeminiProcessPool(ECHO, size=0)
+        process, warm = pool.acquire()
+        self.assertFalse(warm)
+        run_job(process, "x")
+        self.assertEqual(pool.stats(), {"size": 0, "idle": 0, "warm_hits": 0, "cold_spawns": 1, "discarded": 0})
+
+@unittest.skipIf(os.name == 'nt', "uses a POSIX shebang script as the gemini executable")
+class TestGeminiClientPool(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.exe = Path(tmp.name) / "gemini"
+        self.exe.write_text(f"#!{sys.executable}\n" + ECHO[2].replace("; ", "\n"))
+        self.exe.chmod(self.exe.stat().st_mode | stat.S_IEXEC)
+        self.prompt = Path(tmp.name) / "prompt.md"
+        self.prompt.write_text("PROMPT")
+
+    def test_prompt_goes_over_stdin_to_warm_process(self):
+        client = GeminiClient(user_prompt_path=str(self.prompt), pool_size=1)
+        with patch.object(client, "_find_executable", return_value=str(self.exe)):
+            client.start_pool()
+            standby_pid = client._pool._idle[0][0].pid
+            result = client.run_inference(context_header="Current Price: 5000")
+            self.assertEqual(result.split(), [str(len("Current Price: 5000\n\nPROMPT")), str(standby_pid)])
+            self.assertEqual(client.pool_stats()["warm_hits"], 1)
+
+            failed = client.run_inference(context_header="fail")
+            self.assertTrue(failed.strip())  # output is returned even on a non-zero exit
+        client.close()
+
+@unittest.skipIf(os.name == 'nt', "process groups are POSIX")
+class TestUnusableStandby(unittest.TestCase):
+
+    def test_replaced_and_its_process_tree_killed(self):
+        pipes = dict(stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        broken = subprocess.Popen(BROKEN, start_new_session=True, **pipes)
+        grandchild = int(broken.stdout.readline())
+        fresh = subprocess.Popen(ECHO, start_new_session=True, **pipes)
+
+        class Pool:
+            handed_out = iter([(broken, True), (fresh, False)])
+            def acquire(self):
+                return next(self.handed_out)
+
+        client = GeminiClient(user_prompt_path="unused.md")
+        process = client._start_process(Pool(), "x" * 100_000)  # more than a pipe buffer
+        self.assertIs(process, fresh)
+        self.assertEqual(process.stdout.read().split()[0], "100000")
+        process.wait()
+        for _ in range(50):
+            if not alive(grandchild):
+                break
+            time.sleep(0.05)
+        self.assertFalse(alive(grandchild))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from src.gemini_client import GeminiClient
+from src.hedging import CallPolicy, HedgedCall, LatencyTracker
+from src.inference import InferenceJob, JobPriority, run_inference
+from src.state import InferenceStatus, app_state
+from benchmarks.fixtures import make_setup
+
+# Starts a grandchild that would outlive a plain kill, prints its pid, then hangs
+HANG = """import subprocess, sys, time
+sys.stdin.read()
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+print(child.pid, flush=True)
+time.sleep(60)
+"""
+
+def alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+def slow_unless_cancelled(result, seconds=5.0):
+    def fn(attempt):
+        if attempt.cancel.wait(seconds):
+            return "Error: cancelled"
+        return result
+    return fn
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_quantile_needs_samples(self):
+        tracker = LatencyTracker(window=10)
+        for s in range(1, 5):
+            tracker.record("main", float(s))
+        self.assertIsNone(tracker.quantile("main", 0.9))
+        for s in range(5, 15):
+            tracker.record("main", float(s))  # window keeps 5..14
+        self.assertEqual(tracker.quantile("main", 0.9), 13.0)
+        self.assertEqual(tracker.quantile("main", 0.5), 9.0)
+        self.assertIsNone(tracker.quantile("alt", 0.9))
+
+class TestHedgedCall(unittest.TestCase):
+
+    def test_hedge_wins_and_cancels_primary(self):
+        started = []
+
+        def fn(attempt):
+            started.append(attempt)
+            if attempt.hedge:
+                return "hedge"
+            return slow_unless_cancelled("primary")(attempt)
+
+        t0 = time.monotonic()
+        winner = HedgedCall(fn, hedge_after=0.1).run()
+        self.assertEqual(winner.result, "hedge")
+        self.assertLess(time.monotonic() - t0, 2)
+        self.assertTrue(started[0].cancel.is_set())
+
+    def test_no_hedge_when_primary_is_fast(self):
+        call = HedgedCall(lambda attempt: "primary", hedge_after=1.0)
+        self.assertEqual(call.run().result, "primary")
+        self.assertEqual(len(call.attempts), 1)
+
+    def test_early_primary_error_is_not_retried(self):
+        call = HedgedCall(lambda attempt: "ok" if attempt.hedge else "Error: boom", hedge_after=5.0,
+                          is_error=lambda r: r.startswith("Error"))
+        t0 = time.monotonic()
+        self.assertEqual(call.run().result, "Error: boom")
+        self.assertEqual(len(call.attempts), 1)
+        self.assertLess(time.monotonic() - t0, 2)
+
+    def test_failed_claimant_falls_back_to_other_attempt(self):
+        def fn(attempt):
+            if attempt.hedge:
+                attempt.claim()  # streamed a setup, then the CLI failed
+                time.sleep(0.1)
+                return "Error: boom"
+            time.sleep(0.3)
+            return "primary"
+
+        call = HedgedCall(fn, hedge_after=0.05, is_error=lambda r: r.startswith("Error"))
+        winner = call.run()
+        self.assertEqual(winner.result, "primary")
+        self.assertIs(call.winner, call.attempts[1])
+        self.assertFalse(call.attempts[0].cancel.is_set())
+
+    def test_claim_blocks_hedge(self):
+        def fn(attempt):
+            attempt.claim()  # e.g. streamed a setup
+            time.sleep(0.3)
+            return f"attempt {attempt.index}"
+
+        call = HedgedCall(fn, hedge_after=0.05)
+        self.assertEqual(call.run().result, "attempt 0")
+        self.assertEqual(len(call.attempts), 1)
+
+@unittest.skipIf(os.name == 'nt', "uses a POSIX shebang script as the gemini executable")
+class TestDeadline(unittest.TestCase):
+
+    def test_timeout_kills_process_tree(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        exe = Path(tmp.name) / "gemini"
+        exe.write_text(f"#!{sys.executable}\n" + HANG)
+        exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+        prompt = Path(tmp.name) / "prompt.md"
+        prompt.write_text("PROMPT")
+
+        lines = []
+        client = GeminiClient(user_prompt_path=str(prompt))
+        with patch.object(client, "_find_executable", return_value=str(exe)):
+            t0 = time.monotonic()
+            result = client.run_inference(on_line=lines.append, timeout=1.0)
+        self.assertEqual(result, "Error: Gemini CLI timed out after 1s")
+        self.assertLess(time.monotonic() - t0, 10)
+        grandchild = int(lines[0])
+        for _ in range(50):
+            if not alive(grandchild):
+                break
+            time.sleep(0.05)
+        self.assertFalse(alive(grandchild))
+
+class HangingThenFastClient:
+    """First call hangs until cancelled; later calls answer immediately."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = threading.Event()
+
+    def run_inference(self, context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                      timeout=None, cancel=None):
+        self.calls += 1
+        if self.calls == 1:
+            cancel.wait(5)
+            self.cancelled.set()
+            return "Error: Gemini CLI cancelled"
+        setup = make_setup("h1", "LONG", 5000.0, 4990.0, [5010.0])
+        output = '{"setups": [' + setup.model_dump_json() + ']}'
+        on_line(output)
+        return output
+
+class SlowThenFailingHedgeClient:
+    """First call answers after a while; the hedge streams a setup, then fails."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run_inference(self, context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                      timeout=None, cancel=None):
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.5)
+            setup = make_setup("p1", "LONG", 5000.0, 4990.0, [5010.0])
+            return '{"setups": [' + setup.model_dump_json() + ']}'
+        setup = make_setup("h1", "LONG", 5000.0, 4990.0, [5010.0])
+        on_line('{"setups": [' + setup.model_dump_json() + ',')
+        return "Error: Gemini CLI failed with code 1"
+
+class TestHedgedInference(unittest.TestCase):
+
+    def tearDown(self):
+        app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+        app_state.inference.status = InferenceStatus.NONE
+
+    def test_hedge_past_rolling_p90(self):
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("main", 0.1)
+        client = HangingThenFastClient()
+        with patch("src.inference.latency_tracker", tracker), \
+                patch("src.inference.call_policy", CallPolicy(timeout=30, hedging=True)):
+            run_inference(client, InferenceJob(priority=JobPriority.MANUAL))
+        self.assertEqual(client.calls, 2)
+        self.assertTrue(client.cancelled.wait(2))
+        self.assertIn("h1", app_state.trade_manager.setups)
+        strategy = app_state.get_inference_snapshot()["strategies"]["main"]
+        self.assertTrue(strategy["hedged"])
+        self.assertEqual(strategy["status"], "complete")
+
+    def test_failed_streaming_hedge_falls_back_to_primary(self):
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("main", 0.1)
+        client = SlowThenFailingHedgeClient()
+        with patch("src.inference.latency_tracker", tracker), \
+                patch("src.inference.call_policy", CallPolicy(timeout=30, hedging=True)):
+            run_inference(client, InferenceJob(priority=JobPriority.MANUAL))
+        self.assertEqual(client.calls, 2)
+        self.assertNotIn("h1", app_state.trade_manager.setups)
+        self.assertIn("p1", app_state.trade_manager.setups)
+        self.assertEqual(app_state.get_inference_snapshot()["strategies"]["main"]["status"], "complete")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,17 +38,31 @@ def test_trigger_inference_success(client):
     assert data['status'] == InferenceStatus.COMPLETE.value
     assert data['result'] == "Success Result"
 
-def test_trigger_inference_already_running(client):
-    """Test triggering inference while already running returns 409."""
-    # Force running state
-    app_state.start_inference()
-    
-    response = client.post('/api/inference')
-    assert response.status_code == 409
-    
-    # Reset state
+def test_trigger_inference_queues_behind_running_job(client):
+    """A manual request during a run is queued (202) with its position, not rejected."""
+    release = threading.Event()
+    mock_gemini = MagicMock()
+    mock_gemini.run_inference.side_effect = lambda *args, **kwargs: release.wait(5) and "Done"
+    set_gemini_client(mock_gemini)
     app_state.inference.status = InferenceStatus.NONE
 
+    assert client.post('/api/inference').status_code == 202
+    for _ in range(50):
+        if mock_gemini.run_inference.called:
+            break
+        time.sleep(0.02)
+    response = client.post('/api/inference', json={'strategy': 'alt'})
+    release.set()
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'queued'
+    assert response.get_json()['position'] == 1
+
+    for _ in range(100):
+        if mock_gemini.run_inference.call_count == 2 and app_state.inference.status == InferenceStatus.COMPLETE:
+            break
+        time.sleep(0.05)
+    assert mock_gemini.run_inference.call_count == 2
+
 def test_trigger_inference_failure(client):
     """Test inference failure handling."""
     mock_gemini = MagicMock()
@@ -81,3 +95,37 @@ def test_auto_inference_endpoints(client):
     # Disable
     response = client.post('/api/auto-inference', json={'interval': 0})
     assert response.get_json()['interval'] == 0
+
+def test_run_all_strategies_in_parallel(client):
+    """Run All runs every strategy concurrently and merges their tagged setups."""
+    def fake_run(context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                 timeout=None, cancel=None):
+        time.sleep(0.3)
+        if prompt_path:  # alt strategy
+            return "No JSON here"
+        return ('{"market_overview": "Range day", "setups": [{"id": "s1", "direction": "LONG", '
+                '"entry": {"price": 5000, "condition": "price <= 5000"}, "stop_loss": {"price": 4990}, '
+                '"targets": [{"price": 5020}], "rules_text": "buy dip"}]}')
+
+    mock_gemini = MagicMock()
+    mock_gemini.run_inference.side_effect = fake_run
+    set_gemini_client(mock_gemini)
+    app_state.inference.status = InferenceStatus.NONE
+
+    response = client.post('/api/inference', json={'strategy': 'all'})
+    assert response.status_code == 202
+
+    deadline = time.time() + 2
+    while time.time() < deadline and client.get('/api/inference').get_json()['status'] != 'complete':
+        time.sleep(0.05)
+    data = client.get('/api/inference').get_json()
+
+    assert data['status'] == InferenceStatus.COMPLETE.value
+    assert set(data['strategies']) == {'main', 'alt'}
+    assert data['strategies']['main']['setups'] == 1
+    # Wall clock is the slowest strategy, not the sum
+    assert data['duration_seconds'] < 0.55
+    setup = app_state.trade_manager.setups['main:s1']
+    assert setup.strategy == 'main'
+    assert '[main] Range day' in data['result']
+    app_state.trade_manager.prune_backlog(max_age_minutes=-1)
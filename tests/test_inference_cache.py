@@ -0,0 +1,86 @@
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from src.inference import InferenceJob, JobPriority, run_inference
+from src.inference_cache import InferenceCache, market_fingerprint, session_phase
+from src.market import NY_TZ
+from src.models import TradeStatus
+from src.state import app_state
+from benchmarks.fixtures import make_setup
+
+NOON = NY_TZ.localize(datetime(2024, 3, 4, 12, 0))
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_sensitive_to_inputs_that_matter(self):
+        setup = make_setup("a", "LONG", 5000.0, 4990.0, [5010.0])
+        base = market_fingerprint("main", 5004.25, [], [setup], NOON)
+        self.assertEqual(base, market_fingerprint("main", 5005.75, [], [setup], NOON))   # same 2-pt bucket
+        self.assertNotEqual(base, market_fingerprint("main", 5006.0, [], [setup], NOON))
+        self.assertNotEqual(base, market_fingerprint("alt", 5004.25, [], [setup], NOON))
+        self.assertNotEqual(base, market_fingerprint("main", 5004.25, [], [], NOON))
+
+        setup.status = TradeStatus.TRADING
+        self.assertNotEqual(base, market_fingerprint("main", 5004.25, [], [setup], NOON))
+        # Finished setups are ignored
+        setup.status = TradeStatus.CANCELED
+        self.assertEqual(market_fingerprint("main", 5004.25, [], [], NOON),
+                         market_fingerprint("main", 5004.25, [], [setup], NOON))
+
+    def test_session_phase(self):
+        self.assertEqual(session_phase(NOON), "midday")
+        self.assertEqual(session_phase(NOON.replace(hour=9, minute=45)), "open")
+        self.assertEqual(session_phase(NOON.replace(hour=16, minute=1)), "post")
+
+class TestInferenceCache(unittest.TestCase):
+
+    def test_ttl_and_lru(self):
+        cache = InferenceCache(ttl_seconds=0.2, max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        self.assertEqual(cache.get("a").result, "A")  # a is now most recent
+        cache.put("c", "C")                           # evicts b
+        self.assertIsNone(cache.get("b"))
+        time.sleep(0.25)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_disabled(self):
+        cache = InferenceCache(ttl_seconds=0)
+        cache.put("a", "A")
+        self.assertIsNone(cache.get("a"))
+
+class TestCachedInference(unittest.TestCase):
+
+    def setUp(self):
+        self.running = app_state.is_running
+        self.price = app_state.last_price
+        app_state.set_running(True)
+        app_state.last_price = 5001.0
+
+    def tearDown(self):
+        app_state.set_running(self.running)
+        app_state.last_price = self.price
+
+    def test_unchanged_market_skips_scheduled_run(self):
+        client = MagicMock()
+        client.run_inference.return_value = '{"setups": []}'
+        cache = InferenceCache()
+        with patch("src.inference.inference_cache", cache), patch("src.inference.is_market_open", return_value=True):
+            run_inference(client, InferenceJob(priority=JobPriority.SCHEDULED))
+            run_inference(client, InferenceJob(priority=JobPriority.SCHEDULED))
+            self.assertEqual(client.run_inference.call_count, 1)
+            self.assertEqual(cache.stats()["hits"], 1)
+
+            # Manual runs always go to the model
+            run_inference(client, InferenceJob(priority=JobPriority.MANUAL))
+            self.assertEqual(client.run_inference.call_count, 2)
+
+            app_state.last_price = 5011.0
+            run_inference(client, InferenceJob(priority=JobPriority.TRIGGER, reasons=["near support"]))
+            self.assertEqual(client.run_inference.call_count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
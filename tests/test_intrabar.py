@@ -0,0 +1,69 @@
+import random
+import unittest
+import numpy as np
+from src.intrabar import BarReplayer, bar_points
+from src.models import TradeStatus
+from src.trade_manager import TradeManager
+from benchmarks.fixtures import make_setup, random_setups
+
+def bar(minute, o, h, l, c):
+    return {"timestamp": 1_700_000_000 + minute * 60, "open": o, "high": h, "low": l, "close": c}
+
+class TestIntrabar(unittest.TestCase):
+
+    def test_bar_points_order(self):
+        points = bar_points([10.0], [12.0], [9.5], [11.0], order="nearest")
+        np.testing.assert_array_equal(points[0], [10.0, 9.5, 12.0, 11.0])
+        points = bar_points([10.0], [12.0], [9.5], [11.0], order="ohlc")
+        np.testing.assert_array_equal(points[0], [10.0, 12.0, 9.5, 11.0])
+
+    def test_path_matches_sequential_updates(self):
+        """Vectorized replay must equal feeding the same prices one at a time."""
+        rng = random.Random(11)
+        setups = random_setups(rng, 300)
+        batch = TradeManager()
+        sequential = TradeManager()
+        batch.add_setups([s.model_copy(deep=True) for s in setups])
+        sequential.add_setups([s.model_copy(deep=True) for s in setups])
+
+        # First look at a single price, as the daemon does for newly added setups
+        batch.update_setups_path([5000.0])
+        sequential.update_setups(5000.0)
+
+        price = 5000.0
+        for _ in range(100):
+            path = []
+            for _ in range(rng.randint(1, 3)):
+                price = round((price + rng.gauss(0, 3)) * 4) / 4
+                path.append(price)
+            batch.update_setups_path(path)
+            for p in path:
+                sequential.update_setups(p)
+
+        for s in setups:
+            self.assertEqual(batch.setups[s.id].status, sequential.setups[s.id].status, s.id)
+
+    def test_wick_between_polls_is_seen(self):
+        """A low wick through entry and stop fills and stops the setup even though the close recovered."""
+        manager = TradeManager()
+        manager.add_setups([make_setup("long", "LONG", 5000.0, 4995.0, [5015.0])])
+        replayer = BarReplayer(order="ohlc")
+
+        manager.update_setups_path(replayer.path([bar(0, 5008, 5009, 5006, 5008)]))
+        self.assertEqual(manager.setups["long"].status, TradeStatus.MONITORING)
+
+        path = replayer.path([bar(0, 5008, 5009, 5006, 5008), bar(1, 5008, 5010, 4994, 5007)])
+        manager.update_setups_path(path)
+        self.assertEqual(manager.setups["long"].status, TradeStatus.STOP_LOSS)
+
+    def test_forming_bar_replays_only_new_extremes(self):
+        replayer = BarReplayer(order="ohlc")
+        replayer.path([bar(0, 10, 11, 9, 10)])
+        np.testing.assert_array_equal(replayer.path([bar(1, 10, 10.5, 9.75, 10.25)]), [10, 10.5, 9.75, 10.25])
+        # Same bar re-fetched with a new low only
+        np.testing.assert_array_equal(replayer.path([bar(1, 10, 10.5, 9.5, 9.75)]), [9.5, 9.75])
+        # Same bar with new high and low
+        np.testing.assert_array_equal(replayer.path([bar(1, 10, 11, 9, 10)]), [11, 9, 10])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from src.journal import Journal
+from src.models import TradeStatus
+from src.trade_manager import TradeManager
+from benchmarks.fixtures import make_setup, random_setups
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "state", "journal.db")
+
+    def journaled_manager(self, journal):
+        manager = TradeManager()
+        journal.open(self.path, snapshot_source=manager.get_active_setups)
+        manager.add_listener(journal.on_setup_change)
+        return manager
+
+    def test_restart_recovers_book_and_last_inference(self):
+        journal = Journal(flush_interval=0.05)
+        manager = self.journaled_manager(journal)
+        manager.add_setups([make_setup("long", "LONG", 5000.0, 4990.0, [5010.0]),
+                            make_setup("short", "SHORT", 5020.0, 5030.0, [5005.0])])
+        manager.update_setups_path([5003.0, 4999.5])  # long fills
+        journal.record_inference("complete", '{"setups": []}', None, "main")
+        self.assertTrue(journal.flush())
+        # Crash: no close(), so no final snapshot — recovery replays the journal
+        restored = Journal().restore(self.path)
+        journal.close()
+
+        by_id = {s.id: s for s in restored.setups}
+        self.assertEqual(by_id["long"].status, TradeStatus.TRADING)
+        self.assertEqual(by_id["short"].status, TradeStatus.MONITORING)
+        self.assertEqual(restored.replayed, 5)
+        self.assertEqual(restored.inference["result"], '{"setups": []}')
+        self.assertEqual(restored.inference["strategy"], "main")
+
+    def test_prune_is_recorded_and_snapshot_shortens_replay(self):
+        journal = Journal(flush_interval=0.05, snapshot_every=3)
+        manager = self.journaled_manager(journal)
+        manager.add_setups([make_setup(str(i), "LONG", 5000.0 + i, 4990.0, [5100.0]) for i in range(4)])
+        self.assertTrue(journal.flush())
+        manager.prune_backlog(max_age_minutes=-1)
+        manager.add_setups([make_setup("late", "LONG", 5000.0, 4990.0, [5100.0])])
+        journal.close()  # final snapshot
+
+        restored = Journal().restore(self.path)
+        self.assertEqual([s.id for s in restored.setups], ["late"])
+        self.assertEqual(restored.replayed, 0)
+
+    def test_writer_survives_snapshot_errors(self):
+        journal = Journal(flush_interval=0.05, snapshot_every=1)
+        manager = TradeManager()
+        calls = []
+
+        def failing_source():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError("unserializable setup")
+            return manager.get_active_setups()
+
+        journal.open(self.path, snapshot_source=failing_source)
+        manager.add_listener(journal.on_setup_change)
+        with self.assertLogs("src.journal", level="ERROR"):
+            manager.add_setups([make_setup("first", "LONG", 5000.0, 4990.0, [5010.0])])
+            self.assertTrue(journal.flush())
+        self.assertEqual(journal.stats()["write_errors"], 1)
+        manager.add_setups([make_setup("second", "LONG", 5001.0, 4990.0, [5010.0])])
+        self.assertTrue(journal.flush())
+        self.assertTrue(journal._thread.is_alive())
+        self.assertEqual(journal.rows_written, 2)
+        journal.close()
+
+        restored = Journal().restore(self.path)
+        self.assertEqual(sorted(s.id for s in restored.setups), ["first", "second"])
+
+    def test_restore_is_fast(self):
+        journal = Journal(flush_interval=0.05, snapshot_every=10**9)
+        manager = self.journaled_manager(journal)
+        rng = random.Random(7)
+        manager.add_setups(random_setups(rng, 2000))
+        price = 5000.0
+        for _ in range(2000):
+            price += rng.uniform(-2, 2)
+            manager.update_setups(price)
+        journal.close()
+        self.assertGreater(journal.rows_written, 2000)
+
+        # Worst case: replay the whole journal without a snapshot
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DELETE FROM snapshots")
+        restored = Journal().restore(self.path)
+        self.assertEqual(len(restored.setups), 2000)
+        self.assertLess(restored.seconds, 1.0)
+        current = {s.id: s.status for s in manager.get_active_setups()}
+        self.assertEqual({s.id: s.status for s in restored.setups}, current)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+import numpy as np
+from src.bar_store import BarStore
+from src.inference import InferenceJob, JobPriority, run_inference
+from src.state import app_state
+from src.market import NY_TZ
+from src.market_context import ContextStats, adapt_prompt, build_market_context, resample
+from src.trendlines import TrendlineCache
+
+OPEN = NY_TZ.localize(datetime(2024, 3, 4, 9, 30)).timestamp()
+
+def session_bars(count=60):
+    bars = []
+    for i in range(count):
+        c = 5000 + i * 0.25
+        bars.append({"timestamp": OPEN + 60 * i, "open": c - 0.25, "high": c + 1, "low": c - 1, "close": c, "volume": 100})
+    return bars
+
+def trendlines(ticker, timeframes):
+    return {"timeframes": {"5min": {"trendlines": [
+        {"type": "support", "slope": 0.5, "anchor": {"timestamp": OPEN, "price": 5008.0}, "touch_count": 4, "score": 0.9},
+        {"type": "resistance", "slope": 0.0, "anchor": {"timestamp": OPEN, "price": 5100.0}, "touch_count": 2, "score": 0.4},
+    ]}}}
+
+class TestMarketContext(unittest.TestCase):
+
+    def test_resample_matches_manual_groups(self):
+        bars = session_bars(60)
+        t, o, h, l, c = (np.array([b[k] for b in bars], dtype=float) for k in ("timestamp", "open", "high", "low", "close"))
+        rt, ro, rh, rl, rc = resample(t, o, h, l, c, 5)
+        self.assertEqual(len(rt), 12)
+        self.assertEqual((ro[1], rh[1], rl[1], rc[1]), (o[5], h[5:10].max(), l[5:10].min(), c[9]))
+
+    def test_build_context(self):
+        store = BarStore(fetcher=lambda ticker, tf, n: session_bars(60), capacity=500)
+        store.refresh()
+        fetches, clock = [], [OPEN + 3600]
+        cache = TrendlineCache(fetcher=lambda **kwargs: fetches.append(1) or trendlines(**kwargs),
+                               timeframes=(5,), clock=lambda: clock[0])
+        cache.refresh()
+        clock[0] += 600  # a refresh is due, but that is the scheduler's job
+        text = build_market_context(price=5014.75, store=store, cache=cache, now=OPEN + 3600)
+        self.assertEqual(len(fetches), 1)  # reads the cached geometry, never fetches
+
+        self.assertIn("time=10:30ET px=5014.75", text)
+        self.assertIn("session: open=4999.75 high=5015.75 low=4999", text)
+        self.assertIn("5m bars time,o,h,l,c (oldest first):\n09:30,4999.75,5002,4999,5001", text)
+        # Support at 5008 + 0.5 * 12 bars = 5014 -> 0.75 below price
+        self.assertIn("5,support,5014,0.5,4,0.9,0.75,at", text)
+        self.assertIn("5,resistance,5100,0,2,0.4,-85.25,far", text)
+        self.assertLess(len(text), 1500)
+
+    def test_empty_store_gives_no_context(self):
+        store = BarStore(fetcher=lambda *args: [])
+        self.assertEqual(build_market_context(store=store), "")
+
+    def test_adapt_prompt(self):
+        for path in ("prompts/user-prompt.md", "prompts/user-prompt-alt.md"):
+            with open(path, encoding="utf-8") as f:
+                adapted = adapt_prompt(f.read())
+            self.assertNotIn("get_market_state", adapted)
+            self.assertIn("MARKET STATE above", adapted)
+
+    def test_stats_delta(self):
+        stats = ContextStats()
+        stats.record("tool", 1500, 40.0, 35.0)
+        stats.record("tool", 1500, 50.0, None)
+        stats.record("prefetched", 3000, 20.0, 12.0)
+        summary = stats.summary()
+        self.assertEqual(summary["tool"]["duration_seconds"], 45.0)
+        self.assertEqual(summary["delta"], {"prompt_chars": 1500, "duration_seconds": -25.0, "first_setup_seconds": -23.0})
+
+class PromptRecorder:
+    def __init__(self):
+        self.calls = []
+
+    def run_inference(self, context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                      timeout=None, cancel=None):
+        prompt = prompt_transform("Analyze using the `get_market_state` tool.\n\nCall `get_market_state`.\n")
+        self.calls.append((context_header, prompt))
+        return '{"setups": []}'
+
+class TestPrefetchedInference(unittest.TestCase):
+
+    def tearDown(self):
+        app_state.set_context_mode("tool")
+
+    def test_prefetched_mode_injects_state(self):
+        client = PromptRecorder()
+        app_state.set_context_mode("prefetched")
+        with patch("src.inference.build_market_context", return_value="MARKET STATE @ES\npx=5000"), \
+                patch("src.inference.context_stats") as stats:
+            run_inference(client, InferenceJob(priority=JobPriority.MANUAL))
+        context, prompt = client.calls[0]
+        self.assertTrue(context.endswith("MARKET STATE @ES\npx=5000"))
+        self.assertNotIn("get_market_state", prompt)
+        self.assertEqual(stats.record.call_args[0][:2], ("prefetched", len(context) + len(prompt)))
+        self.assertEqual(app_state.get_inference_snapshot()["strategies"]["main"]["mode"], "prefetched")
+
+    def test_falls_back_to_tool_without_bars(self):
+        client = PromptRecorder()
+        app_state.set_context_mode("prefetched")
+        with patch("src.inference.build_market_context", return_value=""):
+            run_inference(client, InferenceJob(priority=JobPriority.MANUAL))
+        self.assertIn("get_market_state", client.calls[0][1])
+
+if __name__ == '__main__':
+    unittest.main()
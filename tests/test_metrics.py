@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from src import metrics
+from src.gemini_client import GEMINI_CLI_ENV, GeminiClient
+from src.inference import _run_strategy
+from src.metrics import Counter, Histogram, inference_labels, inference_phase_seconds, reason_label
+from src.state import app_state
+from src.web_server import app
+from tests.test_fake_gemini import FAKE_CLI
+from tests.test_stream_parser import FakeStreamingClient
+
+class TestExposition(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        h = Histogram("t_seconds", "Test.", ("phase",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            h.observe(value, phase="a")
+        lines = h.render()
+        self.assertEqual(lines[:2], ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"])
+        self.assertIn('t_seconds_bucket{phase="a",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{phase="a",le="1"} 3', lines)
+        self.assertIn('t_seconds_bucket{phase="a",le="+Inf"} 4', lines)
+        self.assertIn('t_seconds_sum{phase="a"} 4.05', lines)
+        self.assertIn('t_seconds_count{phase="a"} 4', lines)
+        with self.assertRaises(ValueError):
+            h.observe(1.0, stage="a")
+
+    def test_counter_escapes_label_values(self):
+        c = Counter("t_total", "Test.", ("reason",))
+        c.inc(2, reason='say "hi"')
+        self.assertEqual(c.render()[-1], 't_total{reason="say \\"hi\\""} 2')
+
+    def test_reason_label(self):
+        self.assertEqual(reason_label(["Price near Trendline: 5m support @ 5000.25"], "trigger"), "price_near_trendline")
+        self.assertEqual(reason_label([], "scheduled"), "scheduled")
+
+    def test_metrics_endpoint(self):
+        metrics.job_duration_seconds.observe(0.002, job="monitor")
+        response = app.test_client().get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn("# TYPE inference_phase_seconds histogram", body)
+        self.assertIn('daemon_job_duration_seconds_count{job="monitor"}', body)
+        self.assertIn("# TYPE data_service_request_seconds histogram", body)
+
+class TestInferencePhases(unittest.TestCase):
+
+    def tearDown(self):
+        app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+
+    def test_strategy_phases_carry_strategy_and_reason(self):
+        labels = {"strategy": "metrics-test", "reason": "price_near_trendline"}
+        _run_strategy(FakeStreamingClient(), "metrics-test", "Current Price: 5005", trigger="price_near_trendline")
+        # Two setups streamed, then one final parse
+        self.assertEqual(inference_phase_seconds.count(phase="add_setups", **labels), 2)
+        self.assertEqual(inference_phase_seconds.count(phase="json_extraction", **labels), 1)
+        self.assertEqual(inference_phase_seconds.count(phase="validation", **labels), 1)
+
+    def test_cli_phases(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        prompt = Path(directory) / "prompt.md"
+        prompt.write_text("Find setups.", encoding="utf-8")
+        labels = {"strategy": "metrics-cli", "reason": "manual"}
+        with patch.dict(os.environ, {GEMINI_CLI_ENV: FAKE_CLI}), inference_labels(**labels):
+            GeminiClient(user_prompt_path=str(prompt)).run_inference(context_header="Current Price: 5000.00")
+        for phase in ("prompt_build", "spawn", "first_byte", "exit"):
+            self.assertEqual(inference_phase_seconds.count(phase=phase, **labels), 1, phase)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from benchmarks import microbench
+
+class TestMicrobench(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def run_suite(self, *args) -> int:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return microbench.main(["--quick", "--filter", "get_active_setups[10]", "--repeats", "1", *args])
+
+    def test_compare_flags_cases_past_the_threshold(self):
+        baseline = {"a": {"best_us": 10.0}, "b": {"best_us": 10.0}}
+        results = {"a": {"best_us": 12.4}, "b": {"best_us": 12.6}, "new": {"best_us": 1.0}}
+        self.assertEqual(microbench.compare(results, baseline, 0.25), ["b"])
+
+    def test_baseline_round_trip_and_regression_exit_code(self):
+        self.assertEqual(self.run_suite("--save", self.path), 0)
+        with open(self.path, encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertIn("python", saved["machine"])
+        self.assertEqual(set(saved["results"]), {"get_active_setups[10]"})
+
+        # Against itself with generous headroom, then against an impossibly fast baseline
+        self.assertEqual(self.run_suite("--compare", self.path, "--threshold", "10"), 0)
+        saved["results"]["get_active_setups[10]"]["best_us"] = 1e-6
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        self.assertEqual(self.run_suite("--compare", self.path), 1)
+
+    def test_refuses_a_baseline_from_another_python(self):
+        self.assertEqual(self.run_suite("--save", self.path), 0)
+        with open(self.path, encoding="utf-8") as f:
+            saved = json.load(f)
+        saved["machine"]["python"] = "2.7.18"
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        self.assertEqual(self.run_suite("--compare", self.path, "--threshold", "10"), 2)
+        self.assertEqual(self.run_suite("--compare", self.path, "--threshold", "10", "--allow-mismatch"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
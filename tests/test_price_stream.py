@@ -0,0 +1,119 @@
+import json
+import queue
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.bar_store import BarStore
+from src.price_stream import PriceStream, parse_price_event
+
+class StreamServer:
+    """Local stand-in for data-service's /stream/{ticker} SSE endpoint."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _chunk(self, text):
+                data = text.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                server.connections += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._chunk(":connected\n\n")
+                while True:
+                    event = server.events.get()
+                    if event is None:  # drop the connection
+                        self.wfile.write(b"0\r\n\r\n")
+                        self.close_connection = True
+                        return
+                    self._chunk(f"data: {json.dumps(event)}\n\n")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.events.put(None)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+class TestPriceStream(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StreamServer()
+        self.prices = []
+        self.stream = PriceStream(on_price=lambda p, t: self.prices.append((p, t)), base_url=self.server.url,
+                                  backoff_initial=0.05, backoff_max=0.1)
+
+    def tearDown(self):
+        self.server.close()
+        self.stream.stop(timeout=1)
+
+    def test_delivers_each_update(self):
+        self.stream.start()
+        self.assertTrue(self.stream.wait_connected(5))
+        sent = time.time()
+        for p in (5000.25, 5000.5, 5000.0):
+            self.server.events.put({"price": p, "timestamp": 1_700_000_000})
+        self.assertTrue(wait_for(lambda: len(self.prices) == 3))
+        # Delivered as they arrive, not on a poll interval
+        self.assertLess(time.time() - sent, 1.0)
+        self.assertEqual(self.prices, [(5000.25, 1_700_000_000.0), (5000.5, 1_700_000_000.0), (5000.0, 1_700_000_000.0)])
+
+    def test_reconnects_after_drop(self):
+        self.stream.start()
+        self.assertTrue(self.stream.wait_connected(5))
+        self.server.events.put(None)
+        self.assertTrue(wait_for(lambda: self.server.connections == 2 and self.stream.is_connected))
+        self.server.events.put({"close": 4999.75})
+        self.assertTrue(wait_for(lambda: self.prices == [(4999.75, None)]))
+        self.assertGreaterEqual(self.stream.reconnects, 1)
+
+    def test_unreachable_server_stays_disconnected(self):
+        stream = PriceStream(on_price=lambda p, t: None, base_url="http://127.0.0.1:9", backoff_initial=0.05)
+        stream.start()
+        self.assertFalse(stream.wait_connected(0.3))
+        stream.stop(timeout=1)
+
+class TestStreamHelpers(unittest.TestCase):
+
+    def test_parse_price_event(self):
+        self.assertEqual(parse_price_event('{"price": 5001.5}'), (5001.5, None))
+        self.assertEqual(parse_price_event('5001.5'), (5001.5, None))
+        with self.assertRaises(ValueError):
+            parse_price_event('{"volume": 3}')
+
+    def test_ticks_update_forming_bar(self):
+        store = BarStore(fetcher=lambda *args: [{"timestamp": 600, "open": 10, "high": 11, "low": 9, "close": 10}])
+        self.assertFalse(store.apply_tick(10.5, 610))  # not backfilled yet
+        store.refresh()
+        store.apply_tick(12.0, 630)
+        store.apply_tick(10.75, 650)
+        store.apply_tick(11.0, 665)  # next minute
+        bars = store.recent_bars(count=2)
+        self.assertEqual([(b["high"], b["low"], b["close"]) for b in bars], [(12.0, 9.0, 10.75), (11.0, 11.0, 11.0)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+import unittest
+from datetime import datetime
+from src.market import NY_TZ, seconds_until_market_open
+from src.scheduler import OVERRUN_CATCH_UP, OVERRUN_DELAY, Job, Scheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.until_open = 0.0
+        self.sched = Scheduler(clock=self.clock, until_open=lambda: self.until_open, rng=random.Random(1))
+        self.calls = []
+
+    def job(self, name, interval, cost=0.0, **kwargs):
+        def fn():
+            self.calls.append((name, self.clock.now))
+            self.clock.now += cost
+        return self.sched.add(Job(name, fn, interval, **kwargs))
+
+    def advance(self, seconds, step=0.5):
+        end = self.clock.now + seconds
+        while self.clock.now < end:
+            self.clock.now = min(end, self.clock.now + step)
+            self.sched.run_pending()
+
+    def test_jobs_keep_independent_cadences_without_drift(self):
+        self.job("fast", 5)
+        self.job("slow", 60)
+        self.sched.run_pending()
+        self.advance(120)
+        fast = [t - 1000 for name, t in self.calls if name == "fast"]
+        self.assertEqual(fast, [5.0 * i for i in range(25)])
+        self.assertEqual(len([c for c in self.calls if c[0] == "slow"]), 3)
+
+    def test_overrun_skips_missed_slots(self):
+        job = self.job("slow", 5, cost=12)
+        self.sched.run_pending()
+        self.advance(10)
+        self.assertEqual([t - 1000 for _, t in self.calls], [0.0, 15.0])
+        self.assertEqual(job.missed, 4)
+
+    def test_catch_up_and_delay_policies(self):
+        costs = iter([12.0])
+        def slow_once():
+            self.calls.append(("catch_up", self.clock.now))
+            self.clock.now += next(costs, 0.0)
+        catch_up = self.sched.add(Job("catch_up", slow_once, 5, overrun=OVERRUN_CATCH_UP))
+        self.sched.run_pending()  # the first run ends at 12, so slots 5 and 10 run back to back
+        self.assertEqual([t - 1000 for _, t in self.calls], [0.0, 12.0, 12.0])
+        self.assertEqual(catch_up.missed, 0)
+        self.assertEqual(catch_up.due, 1015.0)
+        self.sched.remove("catch_up")
+
+        always_slow = self.job("always_slow", 5, cost=12, overrun=OVERRUN_CATCH_UP)
+        self.sched.run_pending()  # bounded: never runs back to back forever
+        self.assertGreater(always_slow.missed, 0)
+        self.sched.remove("always_slow")
+
+        self.calls.clear()
+        self.job("delay", 5, cost=2, overrun=OVERRUN_DELAY)
+        self.sched.run_pending()
+        self.advance(20)
+        starts = [t for _, t in self.calls]
+        self.assertEqual([b - a for a, b in zip(starts, starts[1:])], [7.0, 7.0, 7.0])
+
+    def test_market_hours_jobs_sleep_until_open(self):
+        job = self.job("poll", 5, market_hours=True)
+        self.until_open = 3600.0
+        self.sched.run_pending()
+        self.assertEqual(self.calls, [])
+        self.assertTrue(job.parked)
+        self.assertEqual(job.due, self.clock.now + 3600)
+
+        self.until_open = 0.0
+        self.advance(3600, step=60)
+        self.assertEqual(len(self.calls), 1)
+        self.assertFalse(job.parked)
+
+    def test_reschedule_reads_new_interval(self):
+        interval = [600]
+        self.sched.add(Job("auto", lambda: self.calls.append(self.clock.now), lambda: interval[0]), delay=None)
+        self.advance(30)
+        interval[0] = 20
+        self.sched.reschedule("auto")
+        self.sched.run_pending()
+        self.assertEqual(self.calls, [1030.0])
+
+    def test_jitter_delays_within_bound(self):
+        job = self.job("jittered", 10, jitter=2.0)
+        self.assertTrue(job.slot <= job.due <= job.slot + 2.0)
+
+    def test_failing_job_keeps_its_schedule(self):
+        def boom():
+            raise RuntimeError("boom")
+        job = self.sched.add(Job("boom", boom, 5))
+        self.advance(10)
+        self.assertEqual(job.errors, 3)
+
+    def test_run_sleeps_until_due_and_stops(self):
+        sched = Scheduler(until_open=lambda: 0.0)
+        ran = threading.Event()
+        sched.add(Job("once", ran.set, 3600), delay=0.05)
+        thread = threading.Thread(target=sched.run)
+        thread.start()
+        self.assertTrue(ran.wait(2))
+        sched.stop()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+
+class TestDaemonJobs(unittest.TestCase):
+
+    def parked_jobs(self, config):
+        from src.main import build_jobs
+        clock = FakeClock()
+        sched = build_jobs(config, Scheduler(clock=clock, until_open=lambda: 3600.0))
+        sched.run_pending()
+        clock.now += 600  # auto-inference first runs one interval after startup
+        sched.run_pending()
+        return sorted(name for name, stats in sched.stats().items() if stats["parked"])
+
+    def test_price_monitoring_runs_outside_market_hours(self):
+        self.assertEqual(self.parked_jobs({"market_hours_enabled": True}), ["auto_inference", "trendlines"])
+        self.assertEqual(self.parked_jobs({"market_hours_enabled": True, "monitor_market_hours_only": True}),
+                         ["auto_inference", "monitor", "prune", "trendlines"])
+        self.assertEqual(self.parked_jobs({"market_hours_enabled": False}), [])
+
+class TestMarketOpen(unittest.TestCase):
+
+    def test_seconds_until_open(self):
+        friday_evening = NY_TZ.localize(datetime(2024, 3, 8, 17, 0))
+        self.assertEqual(seconds_until_market_open(friday_evening), (2 * 24 + 16.5) * 3600 - 3600)  # DST starts Sunday
+        self.assertEqual(seconds_until_market_open(NY_TZ.localize(datetime(2024, 3, 12, 8, 30))), 3600)
+        self.assertEqual(seconds_until_market_open(NY_TZ.localize(datetime(2024, 3, 12, 12, 0))), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
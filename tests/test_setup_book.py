@@ -0,0 +1,83 @@
+import random
+import unittest
+from benchmarks.fixtures import make_setup, random_setups
+from src.models import TradeStatus
+from src.setup_book import SetupBook
+from src.trade_manager import TradeManager
+
+class TestSetupBook(unittest.TestCase):
+
+    def test_matches_linear_scan(self):
+        """Indexed evaluation must produce exactly the statuses of a full scan."""
+        rng = random.Random(7)
+        setups = random_setups(rng, 400)
+
+        manager = TradeManager()
+        manager.add_setups([s.model_copy(deep=True) for s in setups])
+        reference = {s.id: s.model_copy(deep=True) for s in setups}
+
+        price = 5000.0
+        for _ in range(1500):
+            price = round((price + rng.gauss(0, 1.5)) * 4) / 4
+            manager.update_setups(price)
+            for s in reference.values():
+                manager._check_setup(s, price)
+
+        for setup_id, expected in reference.items():
+            self.assertEqual(manager.setups[setup_id].status, expected.status, setup_id)
+
+        statuses = {s.status for s in reference.values()}
+        self.assertTrue({TradeStatus.PROFIT, TradeStatus.STOP_LOSS, TradeStatus.MONITORING} <= statuses)
+
+    def test_candidates_are_local(self):
+        """Far-away setups are not visited once they settle into MONITORING."""
+        book = SetupBook()
+        manager = TradeManager()
+        far = [make_setup(f"far{i}", "LONG", 4000.0 - i, 3990.0 - i, [4100.0]) for i in range(100)]
+        near = make_setup("near", "LONG", 5001.0, 4995.0, [5010.0])
+        for s in far + [near]:
+            s.status = TradeStatus.MONITORING
+            book.add(s)
+
+        self.assertEqual(book.candidates(5003.0), ["near"])
+        self.assertEqual(book.candidates(5050.0), [])
+
+        manager.add_setups(far + [near])
+        manager.update_setups(5002.0)
+        self.assertEqual(manager.setups["near"].status, TradeStatus.CLOSE_TO_ENTRY)
+        self.assertEqual(manager.setups["far0"].status, TradeStatus.MONITORING)
+
+    def test_symbol_filter(self):
+        manager = TradeManager()
+        manager.add_setups([
+            make_setup("es", "LONG", 5000.0, 4990.0, [5010.0], symbol="@ES"),
+            make_setup("nq", "LONG", 5000.0, 4990.0, [5010.0], symbol="@NQ"),
+        ])
+        manager.update_setups(5000.0, symbol="@ES")
+        self.assertEqual(manager.setups["es"].status, TradeStatus.TRADING)
+        self.assertEqual(manager.setups["nq"].status, TradeStatus.NEW)
+
+    def test_replace_and_prune_keep_index_consistent(self):
+        manager = TradeManager()
+        manager.add_setups([make_setup("a", "LONG", 5000.0, 4990.0, [5010.0])])
+        manager.update_setups(5020.0)
+
+        # Re-plan moves the entry; the old level must not linger in the index
+        manager.add_setups([make_setup("a", "LONG", 5030.0, 5020.0, [5040.0])])
+        manager.update_setups(5031.0)
+        manager.update_setups(5000.0)
+        self.assertEqual(manager.setups["a"].status, TradeStatus.STOP_LOSS)
+        self.assertEqual(len(manager._books["@ES"]), 1)
+
+    def test_remove_setups_keeps_filled_ones(self):
+        manager = TradeManager()
+        manager.add_setups([make_setup("filled", "LONG", 5000.0, 4990.0, [5010.0]),
+                            make_setup("waiting", "LONG", 4950.0, 4940.0, [4960.0])])
+        manager.update_setups(5005.0)
+        manager.update_setups(5000.0)
+        self.assertEqual(manager.remove_setups(["filled", "waiting", "unknown"]), ["waiting"])
+        self.assertEqual(set(manager.setups), {"filled"})
+        self.assertEqual(len(manager._books["@ES"]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from datetime import date, datetime
+from src.clock import SystemClock, VirtualClock, clock
+from src.executor import inference_executor
+from src.market import NY_TZ, is_market_open
+from src.models import TradeStatus
+from src.simulate import random_walk_session, simulate
+from src.state import app_state
+from benchmarks.fixtures import make_setup
+
+class TestVirtualClock(unittest.TestCase):
+
+    def test_installed_clock_drives_market_hours_and_setup_ages(self):
+        virtual = VirtualClock(NY_TZ.localize(datetime(2024, 3, 12, 9, 0)).timestamp())
+        previous = clock.install(virtual)
+        try:
+            self.assertFalse(is_market_open())
+            virtual.advance(45 * 60)
+            self.assertTrue(is_market_open())
+            setup = make_setup("s", "LONG", 5000.0, 4990.0, [5010.0])
+            self.assertEqual(setup.created_at, virtual.now(NY_TZ))
+            with self.assertRaises(ValueError):
+                virtual.set(0)
+        finally:
+            clock.install(previous)
+        self.assertIsInstance(clock.source, SystemClock)
+
+class TestSimulation(unittest.TestCase):
+
+    def tearDown(self):
+        app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+        app_state.trade_manager.set_expiry_policy()
+
+    def test_full_session_replays_in_seconds(self):
+        bars = random_walk_session(date(2024, 3, 12), seed=1)
+        summary = simulate(bars, {"market_hours_enabled": True}, auto_inference_interval=600)
+
+        self.assertEqual(summary["bars"], 390)
+        self.assertLess(summary["wall_seconds"], 10)
+        self.assertGreater(summary["inferences"], 30)
+        self.assertEqual(summary["setups_added"], 2 * summary["inferences"])
+        self.assertGreater(summary["transitions"].get(TradeStatus.TRADING.value, 0), 0)
+        self.assertEqual(summary["jobs"]["monitor"]["errors"], 0)
+        # Global wiring is restored afterwards
+        self.assertIsInstance(clock.source, SystemClock)
+        self.assertFalse(inference_executor.inline)
+        self.assertFalse(app_state.is_running)
+
+if __name__ == '__main__':
+    unittest.main()
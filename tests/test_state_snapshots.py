@@ -0,0 +1,67 @@
+import json
+import unittest
+from unittest.mock import patch
+from src.scheduler import Job, scheduler
+from src.state import DaemonState, app_state
+from src.web_server import app
+from benchmarks.fixtures import make_setup
+
+class TestVersionedSnapshots(unittest.TestCase):
+
+    def test_json_rebuilt_only_on_change(self):
+        state = DaemonState()
+        version, body = state.get_snapshot_json()
+        self.assertIs(state.get_snapshot_json()[1], body)
+
+        state.trade_manager.add_setups([make_setup("a", "LONG", 5000.0, 4990.0, [5010.0])])
+        version2, body2 = state.get_snapshot_json()
+        self.assertGreater(version2, version)
+        self.assertEqual(json.loads(body2)["active_setups"][0]["id"], "a")
+
+        state.set_price(5001.0)
+        state.set_price(5001.0)  # unchanged price is not a new version
+        self.assertEqual(state.version, version2 + 1)
+        self.assertEqual(json.loads(state.get_inference_json()[1])["current_price"], 5001.0)
+
+class TestETags(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_status_not_modified_until_state_changes(self):
+        first = self.client.get('/api/status')
+        etag = first.headers["ETag"]
+        self.assertNotIn("monitor_gap_max", first.get_json())
+
+        again = self.client.get('/api/status', headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+
+        app_state.set_interval(app_state.current_interval + 1)
+        changed = self.client.get('/api/status', headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_status_not_modified_while_jobs_run(self):
+        job = scheduler.add(Job("etag-test", lambda: None, 60.0), delay=None)
+        self.addCleanup(scheduler.remove, "etag-test")
+        etag = self.client.get('/api/status').headers["ETag"]
+        job.runs += 1  # a monitor pass
+        app_state.record_monitor_tick()
+        app_state.record_monitor_tick()
+        self.assertEqual(self.client.get('/api/status', headers={"If-None-Match": etag}).status_code, 304)
+        jobs = self.client.get('/api/jobs').get_json()
+        self.assertEqual(jobs["etag-test"]["runs"], 1)
+        self.assertIn("monitor_gap_last", jobs["monitor"])
+
+    def test_inference_etag_covers_live_stats(self):
+        etag = self.client.get('/api/inference').headers["ETag"]
+        self.assertEqual(self.client.get('/api/inference', headers={"If-None-Match": etag}).status_code, 304)
+        with patch("src.web_server.inference_executor.pending_jobs", return_value=[{"priority": "MANUAL"}]):
+            response = self.client.get('/api/inference', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["pending_jobs"], [{"priority": "MANUAL"}])
+
+if __name__ == '__main__':
+    unittest.main()
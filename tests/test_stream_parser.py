@@ -0,0 +1,93 @@
+import json
+import unittest
+from src.inference import _run_strategy
+from src.state import app_state
+from src.stream_parser import SetupStreamParser
+
+def setup_json(setup_id, entry, rules="wait for {reclaim} of \"VWAP\""):
+    return {"id": setup_id, "direction": "LONG", "entry": {"price": entry, "condition": f"price <= {entry}"},
+            "stop_loss": {"price": entry - 10}, "targets": [{"price": entry + 10}, {"price": entry + 20}],
+            "rules_text": rules}
+
+RESPONSE = json.dumps({
+    "inference_time": "10:15",
+    "market_overview": "Choppy [range] with {braces} in text",
+    "setups": [setup_json("a", 5000), {"id": "broken"}, setup_json("b", 5010)],
+}, indent=2)
+OUTPUT = "Here is my analysis.\n```json\n" + RESPONSE + "\n```\nDone.\n"
+
+class TestSetupStreamParser(unittest.TestCase):
+
+    def test_char_by_char(self):
+        seen = []
+        parser = SetupStreamParser(lambda s: seen.append((s.id, len(parser_input))))
+        parser_input = ""
+        for ch in OUTPUT:
+            parser_input += ch
+            parser.feed(ch)
+        self.assertEqual([s for s, _ in seen], ["a", "b"])
+        self.assertEqual(parser.setups[0].rules_text, 'wait for {reclaim} of "VWAP"')
+        # Each setup is emitted as soon as its closing brace arrives, before the output ends
+        self.assertLess(seen[0][1], OUTPUT.index('"broken"'))
+        self.assertLess(seen[1][1], len(OUTPUT))
+
+    def test_line_by_line_ignores_text_after_array(self):
+        parser = SetupStreamParser(lambda s: None)
+        for line in (OUTPUT + '{"setups": [' + json.dumps(setup_json("late", 1)) + "]}").splitlines(True):
+            parser.feed(line)
+        self.assertEqual([s.id for s in parser.setups], ["a", "b"])
+
+class FakeStreamingClient:
+    """Streams OUTPUT line by line, recording which setups TradeManager had at each line."""
+
+    def __init__(self):
+        self.seen_in_manager = []
+
+    def run_inference(self, context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                      timeout=None, cancel=None):
+        for line in OUTPUT.splitlines(True):
+            on_line(line)
+            self.seen_in_manager.append(set(app_state.trade_manager.setups))
+        return OUTPUT
+
+class FailingStreamingClient:
+    """Streams OUTPUT up to the end of setup "a", then fails with `error`."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def run_inference(self, context_header="", prompt_path=None, on_line=None, prompt_transform=None,
+                      timeout=None, cancel=None):
+        partial = OUTPUT[:OUTPUT.index('"broken"')]
+        for line in partial.splitlines(True):
+            on_line(line)
+        return self.error.format(partial=partial)
+
+class TestStreamingInference(unittest.TestCase):
+
+    def tearDown(self):
+        app_state.trade_manager.prune_backlog(max_age_minutes=-1)
+
+    def test_setups_reach_trade_manager_before_exit(self):
+        client = FakeStreamingClient()
+        result = _run_strategy(client, "main", "Current Price: 5005")
+        # "a" was being monitored while the CLI was still writing output
+        first_line_with_a = next(i for i, ids in enumerate(client.seen_in_manager) if "a" in ids)
+        self.assertLess(first_line_with_a, len(client.seen_in_manager) - 5)
+        self.assertEqual(result.streamed, {"a", "b"})
+        self.assertEqual(result.unstreamed_setups(), [])
+        self.assertIsNotNone(result.first_setup_after)
+
+    def test_failed_run_withdraws_streamed_setups(self):
+        removed = []
+        listener = lambda kind, setup: removed.append(setup.id) if kind == "removed" else None
+        app_state.trade_manager.add_listener(listener)
+        self.addCleanup(app_state.trade_manager.remove_listener, listener)
+        # Hung and killed at the deadline; exited non-zero partway through the output
+        for error in ("Error: Gemini CLI timed out after 1s", "{partial}\nError: Gemini CLI failed with code 1"):
+            removed.clear()
+            result = _run_strategy(FailingStreamingClient(error), "main", "Current Price: 5005")
+            self.assertIsNotNone(result.error)
+            self.assertEqual(removed, ["a"])
+            self.assertNotIn("a", app_state.trade_manager.setups)
+            self.assertEqual(result.streamed, set())
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+from src.trendlines import TrendlineCache, next_bar_close, proximity_of, set_proximity_thresholds
+from src.triggers import TrendlineTrigger
+
+T0 = 1_700_000_100.0  # 100s past a 5-minute boundary
+
+class FakeService:
+    """Serves one flat support at 5000 (5m) and one rising resistance (15m)."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, ticker, timeframes):
+        self.requests.append(list(timeframes))
+        return {"timeframes": {
+            "5min": {"trendlines": [
+                {"type": "support", "slope": 0.0, "anchor": {"timestamp": T0 - 3000, "price": 5000.0},
+                 "touch_count": 3, "score": 0.8},
+            ]},
+            "15min": {"trendlines": [
+                {"type": "resistance", "start": {"timestamp": T0 - 1800, "price": 5020.0},
+                 "end": {"timestamp": T0 - 900, "price": 5021.0}},
+            ]},
+        }}
+
+class TestTrendlineCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = T0
+        self.service = FakeService()
+        self.cache = TrendlineCache(fetcher=self.service, timeframes=(5, 15), clock=lambda: self.now)
+
+    def test_single_batched_request_per_bar_close(self):
+        self.assertTrue(self.cache.refresh_if_due())
+        self.assertEqual(self.service.requests, [[5, 15]])
+
+        # Ticks within the same bar use the cache
+        for dt in range(0, 190, 5):
+            self.now = T0 + dt
+            self.assertFalse(self.cache.refresh_if_due())
+        self.assertEqual(len(self.service.requests), 1)
+
+        self.now = next_bar_close(T0, (5, 15)) + 5
+        self.assertTrue(self.cache.refresh_if_due())
+        self.assertEqual(len(self.service.requests), 2)
+
+    def test_geometry_and_proximity(self):
+        self.cache.refresh()
+        resistance = self.cache.lines(15)[0]
+        self.assertEqual(resistance.slope, 1.0)
+        self.assertAlmostEqual(resistance.price_at(T0, 15), 5022.0)
+
+        relations = self.cache.relations(5000.5)
+        self.assertEqual([(r.timeframe, r.proximity) for r in relations], [(5, "at")])
+        relations = self.cache.relations(5019.5)
+        self.assertEqual([(r.timeframe, r.proximity) for r in relations], [(15, "near")])
+        self.assertEqual(self.cache.relations(5010.0), [])
+
+    def test_failed_refresh_keeps_previous_lines(self):
+        self.cache.refresh()
+        self.cache._fetcher = lambda **kwargs: {}
+        self.now += 400
+        self.assertTrue(self.cache.refresh_if_due())
+        self.assertEqual(len(self.cache.lines(5)), 1)
+
+class TestTrendlineTrigger(unittest.TestCase):
+
+    def test_fires_on_entry_only(self):
+        cache = TrendlineCache(fetcher=FakeService(), timeframes=(5, 15), clock=lambda: T0)
+        cache.refresh()  # done by the scheduler's trendlines job in the daemon
+        trigger = TrendlineTrigger(cache, timeframes=(5,))
+        with patch("src.triggers.inference_executor") as executor:
+            self.assertIsNone(trigger.check(5010.0))
+            self.assertIn("Support Trendline 5m (near", trigger.check(5002.5))
+            self.assertIsNone(trigger.check(5002.0))          # still near
+            self.assertIn("(at", trigger.check(5000.25))      # moved closer
+            self.assertIsNone(trigger.check(5001.5))          # back to near
+            self.assertIsNone(trigger.check(5008.0))          # left
+            self.assertIsNotNone(trigger.check(5001.0))       # re-entered
+            self.assertEqual(executor.submit.call_count, 3)
+        self.assertEqual(cache.fetch_count, 1)  # checks only read cached geometry
+
+    def test_suppressed_entry_does_not_fire_later(self):
+        cache = TrendlineCache(fetcher=FakeService(), timeframes=(5, 15), clock=lambda: T0)
+        cache.refresh()
+        trigger = TrendlineTrigger(cache, timeframes=(5,))
+        with patch("src.triggers.inference_executor") as executor:
+            self.assertIsNone(trigger.check(5002.5, submit=False))  # entered during an inference
+            self.assertIsNone(trigger.check(5002.0))                # run over, still near
+            self.assertIsNotNone(trigger.check(5000.25))            # a real move to 'at'
+            self.assertEqual(executor.submit.call_count, 1)
+
+    def test_configurable_thresholds(self):
+        self.addCleanup(set_proximity_thresholds)
+        set_proximity_thresholds(at=0.5, near=5.0)
+        self.assertEqual((proximity_of(0.75), proximity_of(4.5), proximity_of(5.5)), ("near", "near", None))
+        with self.assertRaises(ValueError):
+            set_proximity_thresholds(at=4.0, near=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
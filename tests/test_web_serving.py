@@ -0,0 +1,71 @@
+import builtins
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import requests
+from src import web_server
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class TestServingModes(unittest.TestCase):
+
+    def test_falls_back_to_dev_server_without_waitress(self):
+        real_import = builtins.__import__
+
+        def no_waitress(name, *args, **kwargs):
+            if name == "waitress":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        with patch("builtins.__import__", no_waitress), patch.object(web_server.app, "run") as run:
+            web_server.run_web_server(port=1234, mode="production")
+        run.assert_called_once()
+        self.assertEqual(run.call_args.kwargs["port"], 1234)
+
+    def test_production_server_keeps_connections_alive(self):
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            self.skipTest("waitress not installed")
+        port = free_port()
+        self.addCleanup(setattr, web_server.event_stream_slots, "limit", web_server.event_stream_slots.limit)
+        threading.Thread(target=web_server.run_web_server, daemon=True,
+                         kwargs={"port": port, "mode": "production", "threads": 4, "host": "127.0.0.1"}).start()
+        session = requests.Session()
+        url = f"http://127.0.0.1:{port}/api/status"
+        for _ in range(50):
+            try:
+                first = session.get(url, timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        second = session.get(url, headers={"If-None-Match": first.headers["ETag"]}, timeout=1)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(second.status_code, (200, 304))
+        self.assertNotEqual(first.headers.get("Connection", "").lower(), "close")
+
+class TestEventStreamCap(unittest.TestCase):
+
+    def test_streams_over_the_cap_are_turned_away(self):
+        self.assertEqual(web_server.max_event_streams(32), 24)
+        self.assertEqual(web_server.max_event_streams(4), 2)
+        slots = web_server.event_stream_slots
+        self.addCleanup(setattr, slots, "limit", slots.limit)
+        slots.limit = slots.open + 1
+        client = web_server.app.test_client()
+        first = client.get('/api/events')
+        rejected = client.get('/api/events')
+        self.assertEqual(rejected.status_code, 503)
+        self.assertEqual(rejected.headers["Retry-After"], "30")
+        first.close()
+        again = client.get('/api/events')
+        self.assertEqual(again.status_code, 200)
+        again.close()
+
+if __name__ == '__main__':
+    unittest.main()